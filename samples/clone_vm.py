@@ -6,23 +6,19 @@ Email: dannbohn@gmail.com
 
 Clone a VM from template example
 """
-from pyVmomi import vim
-from tools import cli, service_instance, pchelper
+from pyVmomi import vim, vmodl
+from tools import cli, service_instance, pchelper, tasks
 
 from add_nic_to_vm import add_nic
 
 
 def wait_for_task(task):
     """ wait for a vCenter task to finish """
-    task_done = False
-    while not task_done:
-        if task.info.state == 'success':
-            return task.info.result
-
-        if task.info.state == 'error':
-            print("there was an error")
-            print(task.info.error)
-            task_done = True
+    try:
+        return tasks.wait_for_task(task)
+    except vmodl.MethodFault as error:
+        print("there was an error")
+        print(error)
 
 
 def clone_vm(
@@ -33,28 +29,38 @@ def clone_vm(
     cluster_name, resource_pool, and power_on are all optional.
     """
 
-    # if none git the first one
-    datacenter = pchelper.get_obj(content, [vim.Datacenter], datacenter_name)
+    # resolve every named object with a single PropertyCollector round trip
+    found = pchelper.resolve_many(content, {
+        vim.Datacenter: [datacenter_name],
+        vim.Folder: [vm_folder],
+        vim.Datastore: [datastore_name],
+        vim.ClusterComputeResource: [cluster_name],
+        vim.ResourcePool: [resource_pool],
+        vim.StoragePod: [datastorecluster_name],
+    })
 
     if vm_folder:
-        destfolder = pchelper.search_for_obj(content, [vim.Folder], vm_folder)
+        destfolder = found[vim.Folder][vm_folder]
     else:
+        # if none get the first one
+        datacenter = found[vim.Datacenter].get(datacenter_name)
+        if not datacenter:
+            datacenter = list(pchelper.get_all_obj(content, [vim.Datacenter]))[0]
         destfolder = datacenter.vmFolder
 
     if datastore_name:
-        datastore = pchelper.search_for_obj(content, [vim.Datastore], datastore_name)
+        datastore = found[vim.Datastore][datastore_name]
     else:
-        datastore = pchelper.get_obj(
-            content, [vim.Datastore], template.datastore[0].info.name)
+        datastore = template.datastore[0]
 
     # if None, get the first one
-    cluster = pchelper.search_for_obj(content, [vim.ClusterComputeResource], cluster_name)
+    cluster = found[vim.ClusterComputeResource].get(cluster_name)
     if not cluster:
         clusters = pchelper.get_all_obj(content, [vim.ResourcePool])
         cluster = list(clusters)[0]
 
     if resource_pool:
-        resource_pool = pchelper.search_for_obj(content, [vim.ResourcePool], resource_pool)
+        resource_pool = found[vim.ResourcePool][resource_pool]
     else:
         resource_pool = cluster.resourcePool
 
@@ -62,8 +68,7 @@ def clone_vm(
 
     if datastorecluster_name:
         podsel = vim.storageDrs.PodSelectionSpec()
-        pod = pchelper.get_obj(content, [vim.StoragePod], datastorecluster_name)
-        podsel.storagePod = pod
+        podsel.storagePod = found[vim.StoragePod][datastorecluster_name]
 
         storagespec = vim.storageDrs.StoragePlacementSpec()
         storagespec.podSelectionSpec = podsel
@@ -8,13 +8,14 @@ names using the Marvel Comics API
 """
 
 
+import functools
 import hashlib
 import json
 import random
 import time
 import requests
 from pyVmomi import vim
-from tools import cli, service_instance, tasks, pchelper
+from tools import cli, service_instance, pchelper, executor
 from add_nic_to_vm import add_nic
 
 try:
@@ -65,14 +66,11 @@ def get_marvel_characters(number_of_characters, marvel_public_key,
     return characters
 
 
-def create_dummy_vm(vm_name, si, vm_folder, resource_pool,
-                    datastore):
-    """Creates a dummy VirtualMachine with 1 vCpu, 128MB of RAM.
+def dummy_vm_config(vm_name, datastore):
+    """Returns the ConfigSpec of a dummy VirtualMachine with 1 vCpu, 128MB
+    of RAM.
 
-    :param name: String Name for the VirtualMachine
-    :param si: ServiceInstance connection
-    :param vm_folder: Folder to place the VirtualMachine in
-    :param resource_pool: ResourcePool to place the VirtualMachine in
+    :param vm_name: String Name for the VirtualMachine
     :param datastore: DataStrore to place the VirtualMachine on
     """
     datastore_path = '[' + datastore + '] ' + vm_name
@@ -83,13 +81,9 @@ def create_dummy_vm(vm_name, si, vm_folder, resource_pool,
                                suspendDirectory=None,
                                vmPathName=datastore_path)
 
-    config = vim.vm.ConfigSpec(name=vm_name, memoryMB=128, numCPUs=1,
-                               files=vmx_file, guestId='dosGuest',
-                               version='vmx-07')
-
-    print("Creating VM {}...".format(vm_name))
-    task = vm_folder.CreateVM_Task(config=config, pool=resource_pool)
-    tasks.wait_for_tasks(si, [task])
+    return vim.vm.ConfigSpec(name=vm_name, memoryMB=128, numCPUs=1,
+                             files=vmx_file, guestId='dosGuest',
+                             version='vmx-07')
 
 
 def main():
@@ -106,6 +100,11 @@ def main():
                                required=True,
                                action='store',
                                help='Number of VMs to create')
+    parser.add_custom_argument('--max_tasks',
+                               type=int,
+                               default=4,
+                               action='store',
+                               help='Number of VMs to create concurrently')
     # NOTE (hartsock): as a matter of good security practice, never ever
     # save a credential of any kind in the source code of a file. As a
     # matter of policy we want to show people good programming practice in
@@ -151,13 +150,20 @@ def main():
                                        marvel_public_key,
                                        marvel_private_key)
 
-    for name in characters:
-        vm_name = 'MARVEL-' + name
-        create_dummy_vm(vm_name, si, vmfolder, resource_pool,
-                        args.datastore_name)
+    # create the VMs --max_tasks at a time instead of one after the other
+    vm_names = ['MARVEL-' + name for name in characters]
+    operations = (functools.partial(vmfolder.CreateVM_Task,
+                                    config=dummy_vm_config(vm_name, args.datastore_name),
+                                    pool=resource_pool)
+                  for vm_name in vm_names)
+    vm_executor = executor.TaskExecutor(si, max_tasks=args.max_tasks)
+    for vm_name, outcome in zip(vm_names, vm_executor.map(operations)):
+        if outcome.error is not None:
+            print("Creating VM {} failed: {}".format(vm_name, outcome.error))
+            continue
+        print("Created VM {}".format(vm_name))
         if args.opaque_network_name:
-            vm = pchelper.get_obj(content, [vim.VirtualMachine], vm_name)
-            add_nic(si, vm, args.opaque_network_name)
+            add_nic(si, outcome.result, args.opaque_network_name)
     return 0
 
 
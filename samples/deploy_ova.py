@@ -15,13 +15,14 @@ import os
 import os.path
 import ssl
 import sys
-import tarfile
+import threading
 import time
 
+from concurrent import futures
 from threading import Timer
 from six.moves.urllib.request import Request, urlopen
 
-from tools import cli, service_instance
+from tools import cli, remote_file, service_instance, tar_index
 
 from pyVmomi import vim, vmodl
 
@@ -32,6 +33,11 @@ def main():
     parser = cli.Parser()
     parser.add_optional_arguments(cli.Argument.OVA_PATH, cli.Argument.DATACENTER_NAME,
                                   cli.Argument.RESOURCE_POOL, cli.Argument.DATASTORE_NAME)
+    parser.add_custom_argument('--upload-workers',
+                               type=int,
+                               default=4,
+                               action='store',
+                               help='Number of disks to upload concurrently')
     args = parser.get_args()
     si = service_instance.connect(args)
 
@@ -83,7 +89,7 @@ def main():
         return 0
 
     print("Starting deploy...")
-    return ovf_handle.upload_disks(lease, args.host)
+    return ovf_handle.upload_disks(lease, args.host, max_workers=args.upload_workers)
 
 
 def get_dc(si, name):
@@ -164,19 +170,6 @@ def get_largest_free_ds(datacenter):
     return largest
 
 
-def get_tarfile_size(tarfile):
-    """
-    Determine the size of a file inside the tarball.
-    If the object has a size attribute, use that. Otherwise seek to the end
-    and report that.
-    """
-    if hasattr(tarfile, 'size'):
-        return tarfile.size
-    size = tarfile.seek(0, 2)
-    tarfile.seek(0, 0)
-    return size
-
-
 class OvfHandler(object):
     """
     OvfHandler handles most of the OVA operations.
@@ -188,12 +181,14 @@ class OvfHandler(object):
         Performs necessary initialization, opening the OVA file,
         processing the files and reading the embedded ovf file.
         """
+        self.ovafile = ovafile
         self.handle = self._create_file_handle(ovafile)
-        self.tarfile = tarfile.open(fileobj=self.handle)
-        ovffilename = list(filter(lambda x: x.endswith(".ovf"),
-                                  self.tarfile.getnames()))[0]
-        ovffile = self.tarfile.extractfile(ovffilename)
-        self.descriptor = ovffile.read().decode()
+        # name -> (offset, size) of the tar members. A repeat deploy of the
+        # same OVA finds it in the cache and reads no tar headers at all.
+        self.index = tar_index.load_index(self.handle, self.handle.cache_key())
+        ovffilename = [name for name in self.index if name.endswith(".ovf")][0]
+        offset, size = self.index[ovffilename]
+        self.descriptor = MemberReader(self.handle, offset, size).read().decode()
 
     def _create_file_handle(self, entry):
         """
@@ -214,13 +209,15 @@ class OvfHandler(object):
         """
         self.spec = spec
 
-    def get_disk(self, file_item):
+    def get_disk(self, file_item, handle=None, on_read=None):
         """
-        Does translation for disk key to file name, returning a file handle.
+        Does translation for disk key to file name, returning a file handle,
+        or None if the OVA has no such file.
         """
-        ovffilename = list(filter(lambda x: x == file_item.path,
-                                  self.tarfile.getnames()))[0]
-        return self.tarfile.extractfile(ovffilename)
+        if file_item.path not in self.index:
+            return None
+        offset, size = self.index[file_item.path]
+        return MemberReader(handle or self.handle, offset, size, on_read)
 
     def get_device_url(self, file_item, lease):
         for device_url in lease.info.deviceUrl:
@@ -228,15 +225,26 @@ class OvfHandler(object):
                 return device_url
         raise Exception("Failed to find deviceUrl for file %s" % file_item.path)
 
-    def upload_disks(self, lease, host):
+    def upload_disks(self, lease, host, max_workers=4):
         """
-        Uploads all the disks, with a progress keep-alive.
+        Uploads all the disks, up to max_workers at a time, with a progress
+        keep-alive.
         """
         self.lease = lease
+        self.bytes_sent = 0
+        self.bytes_total = sum(self.index[file_item.path][1]
+                               for file_item in self.spec.fileItem
+                               if file_item.path in self.index)
+        self._progress_lock = threading.Lock()
+        executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+        uploads = []
         try:
             self.start_timer()
-            for fileItem in self.spec.fileItem:
-                self.upload_disk(fileItem, lease, host)
+            uploads = [executor.submit(self.upload_disk, file_item, lease, host)
+                       for file_item in self.spec.fileItem]
+            for upload in futures.as_completed(uploads):
+                # the first failure aborts the lease, which ends the others
+                upload.result()
             lease.Complete()
             print("Finished deploy successfully.")
             return 0
@@ -247,25 +255,47 @@ class OvfHandler(object):
             print("Lease: %s" % lease.info)
             print("Hit an error in upload: %s" % ex)
             lease.Abort(vmodl.fault.SystemError(reason=str(ex)))
+        finally:
+            for upload in uploads:
+                upload.cancel()
+            executor.shutdown(wait=False)
         return 1
 
     def upload_disk(self, file_item, lease, host):
         """
-        Upload an individual disk. Passes the file handle of the
-        disk directly to the urlopen request.
+        Upload an individual disk. Each upload reads the tar member of its
+        disk through a file handle of its own, so that disks can be uploaded
+        in parallel, and passes it directly to the urlopen request.
         """
-        ovffile = self.get_disk(file_item)
-        if ovffile is None:
+        if file_item.path not in self.index:
             return
-        device_url = self.get_device_url(file_item, lease)
-        url = device_url.url.replace('*', host)
-        headers = {'Content-length': get_tarfile_size(ovffile)}
-        if hasattr(ssl, '_create_unverified_context'):
-            ssl_context = ssl._create_unverified_context()
-        else:
-            ssl_context = None
-        req = Request(url, ovffile, headers)
-        urlopen(req, context=ssl_context)
+        # for a URL the handle holds a connection and a prefetch thread
+        handle = self._create_file_handle(self.ovafile)
+        try:
+            ovffile = self.get_disk(file_item, handle, self._sent)
+            device_url = self.get_device_url(file_item, lease)
+            url = device_url.url.replace('*', host)
+            headers = {'Content-length': ovffile.size}
+            if hasattr(ssl, '_create_unverified_context'):
+                ssl_context = ssl._create_unverified_context()
+            else:
+                ssl_context = None
+            req = Request(url, ovffile, headers)
+            urlopen(req, context=ssl_context).close()
+        finally:
+            handle.close()
+
+    def _sent(self, amount):
+        with self._progress_lock:
+            self.bytes_sent += amount
+
+    def progress(self):
+        """
+        Percentage of the bytes of all disks that were sent.
+        """
+        if not self.bytes_total:
+            return 0
+        return int(100.0 * self.bytes_sent / self.bytes_total)
 
     def start_timer(self):
         """
@@ -278,7 +308,7 @@ class OvfHandler(object):
         Update the progress and reschedule the timer if not complete.
         """
         try:
-            prog = self.handle.progress()
+            prog = self.progress()
             self.lease.Progress(prog)
             if self.lease.state not in [vim.HttpNfcLease.State.done,
                                         vim.HttpNfcLease.State.error]:
@@ -288,6 +318,32 @@ class OvfHandler(object):
             pass
 
 
+class MemberReader(object):
+    """
+    Reads the 'size' bytes at 'offset' of a file handle, as a file of its own,
+    reporting the amount read to 'on_read', if given.
+    """
+    def __init__(self, handle, offset, size, on_read=None):
+        self.handle = handle
+        self.offset = offset
+        self.size = size
+        self.position = 0
+        self.on_read = on_read
+
+    def read(self, amount=-1):
+        remaining = self.size - self.position
+        if amount is None or amount < 0 or amount > remaining:
+            amount = remaining
+        if not amount:
+            return b''
+        self.handle.seek(self.offset + self.position)
+        result = self.handle.read(amount)
+        self.position += len(result)
+        if self.on_read is not None:
+            self.on_read(len(result))
+        return result
+
+
 class FileHandle(object):
     def __init__(self, filename):
         self.filename = filename
@@ -297,8 +353,19 @@ class FileHandle(object):
         self.offset = 0
 
     def __del__(self):
+        self.close()
+
+    def close(self):
         self.fh.close()
 
+    def cache_key(self):
+        """
+        Identifies this version of the file for the tar index cache.
+        """
+        stat = os.stat(self.filename)
+        return 'file:%s:%d:%d' % (os.path.abspath(self.filename), stat.st_mtime_ns,
+                                  stat.st_size)
+
     def tell(self):
         return self.fh.tell()
 
@@ -325,55 +392,24 @@ class FileHandle(object):
         return int(100.0 * self.offset / self.st_size)
 
 
-class WebHandle(object):
+class WebHandle(remote_file.RemoteFile):
+    """
+    An OVA on a web server. Reads go through a buffered reader with one
+    kept-alive connection, rather than a range request for every read.
+    """
     def __init__(self, url):
-        self.url = url
-        r = urlopen(url)
-        if r.code != 200:
-            raise FileNotFoundError(url)
-        self.headers = self._headers_to_dict(r)
-        if 'accept-ranges' not in self.headers:
-            raise Exception("Site does not accept ranges")
-        self.st_size = int(self.headers['content-length'])
-        self.offset = 0
-
-    def _headers_to_dict(self, r):
-        result = {}
-        if hasattr(r, 'getheaders'):
-            for n, v in r.getheaders():
-                result[n.lower()] = v.strip()
-        else:
-            for line in r.info().headers:
-                if line.find(':') != -1:
-                    n, v = line.split(': ', 1)
-                    result[n.lower()] = v.strip()
-        return result
+        super(WebHandle, self).__init__(url)
+        self.st_size = self.size
 
-    def tell(self):
-        return self.offset
-
-    def seek(self, offset, whence=0):
-        if whence == 0:
-            self.offset = offset
-        elif whence == 1:
-            self.offset += offset
-        elif whence == 2:
-            self.offset = self.st_size - offset
-        return self.offset
-
-    def seekable(self):
-        return True
-
-    def read(self, amount):
-        start = self.offset
-        end = self.offset + amount - 1
-        req = Request(self.url,
-                      headers={'Range': 'bytes=%d-%d' % (start, end)})
-        r = urlopen(req)
-        self.offset += amount
-        result = r.read(amount)
-        r.close()
-        return result
+    def cache_key(self):
+        """
+        Identifies this version of the file for the tar index cache, or None
+        if the server does not tell versions apart.
+        """
+        validator = self.headers.get('etag') or self.headers.get('last-modified')
+        if validator is None:
+            return None
+        return '%s %s' % (self.url, validator)
 
     # A slightly more accurate percentage
     def progress(self):
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+"""
+Example for parallel, resumable file download from datastore
+"""
+
+import requests
+from pyVmomi import vim, vmodl
+from tools import cli, datastore_transfer, service_instance
+
+
+def main():
+    parser = cli.Parser()
+    parser.add_required_arguments(cli.Argument.DATASTORE_NAME, cli.Argument.REMOTE_FILE_PATH,
+                                  cli.Argument.LOCAL_FILE_PATH)
+    parser.add_custom_argument('--segments',
+                               type=int,
+                               default=4,
+                               action='store',
+                               help='Number of byte ranges to download concurrently')
+    parser.add_custom_argument('--retries',
+                               type=int,
+                               default=3,
+                               action='store',
+                               help='Attempts to continue a range after a failure')
+    args = parser.get_args()
+
+    if args.disable_ssl_verification:
+        # disable urllib3 warnings
+        requests.packages.urllib3.disable_warnings(
+            requests.packages.urllib3.exceptions.InsecureRequestWarning)
+
+    try:
+        si = service_instance.connect(args)
+        content = si.RetrieveContent()
+
+        # Find the datastore and datacenter we are using
+        datacenter = None
+        datastore = None
+        datacenters_object_view = content.viewManager.CreateContainerView(
+            content.rootFolder, [vim.Datacenter], True)
+        for dc_obj in datacenters_object_view.view:
+            for ds_obj in dc_obj.datastore:
+                if ds_obj.info.name == args.datastore_name:
+                    datacenter = dc_obj
+                    datastore = ds_obj
+        datacenters_object_view.Destroy()
+        if not datacenter or not datastore:
+            print("Could not find the datastore specified")
+            raise SystemExit(-1)
+
+        # The file is fetched as --segments byte ranges at once. If the
+        # download is interrupted, running the sample again continues it.
+        downloader = datastore_transfer.DatastoreDownloader(si, datacenter, datastore.info.name,
+                                                            max_workers=args.segments,
+                                                            retries=args.retries)
+        result = downloader.download_file(args.remote_file_path, args.local_file_path)
+        if result.error is not None:
+            print("failed to download %s: %s" % (args.remote_file_path, result.error))
+            raise SystemExit(-1)
+        print("downloaded %d bytes in %.1fs, %.1f MB/s"
+              % (downloader.bytes_transferred, result.seconds,
+                 downloader.throughput / 2 ** 20))
+
+    except vmodl.MethodFault as ex:
+        print("Caught vmodl fault : " + ex.msg)
+        raise SystemExit(-1)
+
+    raise SystemExit(0)
+
+
+if __name__ == "__main__":
+    main()
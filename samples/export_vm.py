@@ -18,7 +18,7 @@ import threading
 from time import sleep
 import requests
 from pyVmomi import vim
-from tools import cli, service_instance, pchelper
+from tools import cli, service_instance, pchelper, progress, transfer
 
 # disable  urllib3 warnings
 requests.packages.urllib3.disable_warnings(
@@ -49,30 +49,19 @@ def print_http_nfc_lease_info(info):
         print('No devices were found.')
 
 
-def break_down_cookie(cookie):
-    """ Breaks down vSphere SOAP cookie
-    :param cookie: vSphere SOAP cookie
-    :type cookie: str
-    :return: Dictionary with cookie_name: cookie_value
-    """
-    cookie_a = cookie.split(';')
-    cookie_name = cookie_a[0].split('=')[0]
-    cookie_text = ' {0}; ${1}'.format(cookie_a[0].split('=')[1],
-                                      cookie_a[1].lstrip())
-    return {cookie_name: cookie_text}
-
-
 class LeaseProgressUpdater(threading.Thread):
     """
         Lease Progress Updater & keep alive
         thread
     """
-    def __init__(self, http_nfc_lease, update_interval):
+    def __init__(self, http_nfc_lease, update_interval, total_bytes=None):
         threading.Thread.__init__(self)
         self._running = True
         self.httpNfcLease = http_nfc_lease
         self.updateInterval = update_interval
         self.progressPercent = 0
+        self.totalBytes = total_bytes
+        self.tracker = progress.ProgressTracker()
 
     def set_progress_pct(self, progress_pct):
         self.progressPercent = progress_pct
@@ -85,7 +74,16 @@ class LeaseProgressUpdater(threading.Thread):
             try:
                 if self.httpNfcLease.state == vim.HttpNfcLease.State.done:
                     return
-                print('Updating HTTP NFC Lease Progress to {}%'.format(self.progressPercent))
+                event = self.tracker.update(self.httpNfcLease, self.progressPercent,
+                                            total=self.totalBytes)
+                details = ''
+                if event.rate is not None:
+                    details = ' ({}'.format(progress.format_rate(event))
+                    if event.eta is not None:
+                        details += ', ETA {}'.format(progress.format_duration(event.eta))
+                    details += ')'
+                print('Updating HTTP NFC Lease Progress to {}%{}'.format(
+                    self.progressPercent, details))
                 self.httpNfcLease.HttpNfcLeaseProgress(self.progressPercent)
                 sleep(self.updateInterval)
             except Exception as ex:
@@ -95,7 +93,8 @@ class LeaseProgressUpdater(threading.Thread):
 
 def download_device(headers, cookies, temp_target_disk,
                     device_url, lease_updater,
-                    total_bytes_written, total_bytes_to_write):
+                    total_bytes_written, total_bytes_to_write,
+                    transfer_session=None):
     """ Download disk device of HttpNfcLease.info.deviceUrl
     list of devices
     :param headers: Request headers
@@ -112,12 +111,15 @@ def download_device(headers, cookies, temp_target_disk,
     :type total_bytes_to_write: long
     :param total_bytes_to_write: VM unshared storage
     :type total_bytes_to_write: long
+    :param transfer_session: keeps the connections open between devices
+    :type transfer_session: tools.transfer.TransferSession
     :return:
     """
+    http = transfer_session or requests
     with open(temp_target_disk, 'wb') as handle:
-        response = requests.get(device_url, stream=True,
-                                headers=headers,
-                                cookies=cookies, verify=False)
+        response = http.get(device_url, stream=True,
+                            headers=headers,
+                            cookies=cookies, verify=False)
         # response other than 200
         if not response.ok:
             response.raise_for_status()
@@ -167,10 +169,11 @@ def main():
         print('VM {} must be powered off'.format(vm_obj.name))
         sys.exit(1)
 
-    # Breaking down SOAP Cookie &
+    # Session cookie for the device URLs, which point to the ESXi hosts,
+    # and one keep-alive session for all the downloads &
     # creating Header
-    soap_cookie = si._stub.cookie
-    cookies = break_down_cookie(soap_cookie)
+    transfer_session = transfer.get_transfer_session(si)
+    cookies = transfer_session.cookies()
     headers = {'Accept': 'application/x-vnd.vmware-streamVmdk'}  # not required
 
     # checking if working directory exists
@@ -188,10 +191,6 @@ def main():
     # Getting HTTP NFC Lease
     http_nfc_lease = vm_obj.ExportVm()
 
-    # starting lease updater
-    lease_updater = LeaseProgressUpdater(http_nfc_lease, 60)
-    lease_updater.start()
-
     # Creating list for ovf files which will be value of
     # ovfFiles parameter in vim.OvfManager.CreateDescriptorParams
     ovf_files = list()
@@ -199,6 +198,10 @@ def main():
     # http_nfc_lease.info.totalDiskCapacityInKB not real
     # download size
     total_bytes_to_write = vm_obj.summary.storage.unshared
+
+    # starting lease updater
+    lease_updater = LeaseProgressUpdater(http_nfc_lease, 60, total_bytes_to_write)
+    lease_updater.start()
     try:
         while True:
             if http_nfc_lease.state == vim.HttpNfcLease.State.ready:
@@ -223,7 +226,8 @@ def main():
                         device_url=device_url.url,
                         lease_updater=lease_updater,
                         total_bytes_written=total_bytes_written,
-                        total_bytes_to_write=total_bytes_to_write)
+                        total_bytes_to_write=total_bytes_to_write,
+                        transfer_session=transfer_session)
                     # Adding up file written bytes to total
                     total_bytes_written += current_bytes_written
                     print('Creating OVF file for {}'.format(temp_target_disk))
@@ -12,9 +12,8 @@ for a large amount of objects with fewer round trips that iterating.
 This sample shows how it could be used to fetch the power state of
 all the VMs and post-process filter on them.
 
-Note the printing vm.name does cause round-trip per-VM, so it could
-be extended in a real script/product to fetch the name property as
-well.
+The VM names printed come from pchelper.get_all_obj, which fetches
+them in bulk as well, so printing does not cost a round-trip per-VM.
 
 I used the ViewManager to gather VMs as it seems easier than making
 a traverse spec go through all the datacenters to gather VMs that
@@ -59,16 +58,16 @@ def main():
     # Start with all the VMs from container, which is easier to write than
     # PropertyCollector to retrieve them.
     content = si.RetrieveContent()
-    vms = pchelper.get_all_obj(content, [vim.VirtualMachine])
+    names = pchelper.get_all_obj(content, [vim.VirtualMachine])
 
     prop_collector = content.propertyCollector
-    filter_spec = create_filter_spec(vms, args.property)
+    filter_spec = create_filter_spec(names, args.property)
     options = vmodl.query.PropertyCollector.RetrieveOptions()
     result = prop_collector.RetrievePropertiesEx([filter_spec], options)
     vms = filter_results(result, args.value)
     print("VMs with %s = %s" % (args.property, args.value))
     for vm in vms:
-        print(vm.name)
+        print(names[vm])
 
 
 if __name__ == '__main__':
@@ -20,7 +20,7 @@ Python program for listing the VMs on an ESX / vCenter host
 
 import re
 from pyVmomi import vmodl, vim
-from tools import cli, service_instance
+from tools import cli, service_instance, prefetch
 
 
 def print_vm_info(virtual_machine):
@@ -75,7 +75,9 @@ def main():
         container_view = content.viewManager.CreateContainerView(
             container, view_type, recursive)
 
-        children = container_view.view
+        # the properties print_vm_info reads on the first VM are fetched for
+        # all the others in a single PropertyCollector call
+        children = prefetch.PrefetchList(si, container_view.view)
         if args.find is not None:
             pat = re.compile(args.find, re.IGNORECASE)
         for child in children:
@@ -21,7 +21,7 @@ import urllib.parse
 import base64
 from pyVim.connect import Disconnect
 from pyVmomi import vmodl, vim
-from tools import cli, service_instance
+from tools import cli, service_instance, tasks
 
 
 VMX_PATH = []
@@ -84,12 +84,9 @@ def find_vmx(ds_browser, ds_name, datacenter, full_ds_name):
     search = vim.HostDatastoreBrowserSearchSpec()
     search.matchPattern = "*.vmx"
     search_ds = ds_browser.SearchDatastoreSubFolders_Task(ds_name, search)
-    while search_ds.info.state != "success":
-        pass
-    # results = search_ds.info.result
-    # print(results)
+    results = tasks.wait_for_task(search_ds)
 
-    for sub_folder in search_ds.info.result:
+    for sub_folder in results:
         ds_folder = sub_folder.folderPath
         for file in sub_folder.file:
             try:
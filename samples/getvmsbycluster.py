@@ -6,7 +6,7 @@ Example: Get guest info with folder and host placement
 
 """
 import json
-from tools import cli, service_instance
+from tools import cli, service_instance, prefetch
 
 
 data = {}
@@ -96,7 +96,8 @@ def main():
                 hostname = host.summary.config.name
                 # Add VMs to data dict by config name
                 data[datacenter.name][cluster.name][hostname] = {}
-                vms = host.vm
+                # one PropertyCollector call per host instead of one per VM
+                vms = prefetch.PrefetchList(si, host.vm)
                 for vm in vms:  # Iterate through each VM on the host
                     vmname = vm.summary.config.name
                     data[datacenter.name][cluster.name][hostname][vmname] = {}
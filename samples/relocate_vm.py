@@ -10,7 +10,7 @@
 #
 
 from pyVmomi import vim, vmodl
-from tools import cli, service_instance
+from tools import cli, service_instance, tasks
 
 
 def get_object(content, vimtype, name, disp=False):
@@ -32,6 +32,7 @@ def get_object(content, vimtype, name, disp=False):
         if c.name == name:
             obj = c
             break
+    container.Destroy()
     return obj
 
 
@@ -132,8 +133,7 @@ def relocate_vm(vm_name, content, host_dest, datastore_dest=None):
 
         print("relocate_vm spec:" + str(spec))
         task = vm.RelocateVM_Task(spec)
-        while task.info.state == vim.TaskInfo.State.running:
-            continue
+        tasks.wait_for_task(task)
         relocation_status = True
     except Exception as e:
         message = "relocate_vm failed for vm:" + vm_name \
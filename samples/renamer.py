@@ -21,8 +21,9 @@ of tasks in an asynchronous way.
 
 import sys
 import time
+from concurrent import futures
 from pyVmomi import vim
-from tools import cli, service_instance
+from tools import cli, service_instance, tasks
 
 
 parser = cli.Parser()
@@ -74,16 +75,14 @@ print("\n")
 # rename creates a task...
 task = obj.Rename(new_name)
 
-# Did you know that task objects in pyVmomi get updates automatically?
-# Check this out... it's not super efficient but here's how you could
-# have a script that looped waiting on a task but still had the
-# chance to periodically check other things or do other actions...
+# The shared task monitor gets task changes pushed by the server, so a
+# script can loop waiting on a task, and still periodically check other
+# things or do other actions, without polling task.info...
 print("rename task state:")
-count = 0
-state = task.info.state
-while task.info.state != vim.TaskInfo.State.success:
-    sys.stdout.write("\r\t" + str(time.time()) + "\t: " + task.info.state)
+future = tasks.get_task_monitor(si).watch(task)
+while not futures.wait([future], timeout=1).done:
+    sys.stdout.write("\r\t" + str(time.time()) + "\t: running")
     sys.stdout.flush()
-    count += 1
+future.result()
 
 print("\nrename finished\n")
@@ -33,6 +33,7 @@ def main():
                                                       [vim.VirtualMachine],
                                                       True)
     vms = [vm for vm in view.view if vm.name == args.vm_name]
+    view.Destroy()
 
     if not vms:
         print('VM not found')
@@ -0,0 +1,170 @@
+import asyncio
+import threading
+from concurrent import futures
+from unittest import TestCase
+from mock import Mock, patch
+
+from pyVmomi import vim, vmodl
+
+from samples.tools import aio
+from samples.tools.aio import AsyncUpdateLoop
+
+
+def _filter_update(filter_id, obj, version, **props):
+    changes = []
+    for name, val in props.items():
+        change = Mock()
+        change.name = 'info.' + name
+        change.val = val
+        changes.append(change)
+    object_set = Mock()
+    object_set.obj = obj
+    object_set.changeSet = changes
+    filter_set = Mock()
+    filter_set.filter._moId = filter_id
+    filter_set.objectSet = [object_set]
+    update = Mock()
+    update.filterSet = [filter_set]
+    update.version = version
+    return update
+
+
+class FakeCollector:
+    """
+    Serves queued updates to WaitForUpdatesEx until CancelWaitForUpdates
+    """
+
+    def __init__(self, updates):
+        self.updates = list(updates)
+        self.cancelled = threading.Event()
+        self.filters = 0
+        self.destroyed = False
+
+    def CreateFilter(self, spec, partial_updates):
+        self.filters += 1
+        pc_filter = Mock()
+        pc_filter._moId = 'filter-%d' % self.filters
+        return pc_filter
+
+    def WaitForUpdatesEx(self, version, options):
+        if self.updates:
+            return self.updates.pop(0)
+        self.cancelled.wait()
+        raise vmodl.fault.RequestCanceled()
+
+    def CancelWaitForUpdates(self):
+        self.cancelled.set()
+
+    def DestroyPropertyCollector(self):
+        self.destroyed = True
+
+
+class LateCollector(FakeCollector):
+    """
+    Holds back one update until `release` is set, then reports `drained`
+    once the update loop waits again
+    """
+
+    def __init__(self, updates, late):
+        super().__init__(updates)
+        self.late = late
+        self.release = threading.Event()
+        self.drained = threading.Event()
+
+    def WaitForUpdatesEx(self, version, options):
+        if self.updates:
+            return self.updates.pop(0)
+        if self.late is not None:
+            self.release.wait()
+            late, self.late = self.late, None
+            return late
+        self.drained.set()
+        return super().WaitForUpdatesEx(version, options)
+
+
+class AsyncUpdateLoopTests(TestCase):
+
+    def run_with(self, updates, coroutine_factory, collector=None):
+        si = Mock()
+        collector = collector or FakeCollector(updates)
+        si.content.propertyCollector.CreatePropertyCollector.return_value = collector
+
+        async def main():
+            async with AsyncUpdateLoop(si) as loop:
+                return await coroutine_factory(loop)
+
+        result = asyncio.run(main())
+        self.assertTrue(collector.destroyed)
+        return result
+
+    @patch.object(aio.tasks, 'get_task_monitor')
+    def test_should_await_tasks_through_task_monitor(self, get_task_monitor):
+        ok_task, failed_task = vim.Task('task-1'), vim.Task('task-2')
+        error = vim.fault.NoDiskSpace()
+        outcomes = {ok_task: ('done', None), failed_task: (None, error)}
+
+        def watch(task):
+            # settled later from another thread, as the monitor thread does
+            future = futures.Future()
+            result, task_error = outcomes[task]
+            threading.Timer(0.01, lambda: future.set_exception(task_error) if task_error
+                            else future.set_result(result)).start()
+            return future
+        get_task_monitor.return_value.watch.side_effect = watch
+
+        results = self.run_with([], lambda loop: asyncio.gather(
+            loop.wait_for_task(ok_task), loop.wait_for_task(failed_task),
+            return_exceptions=True))
+
+        self.assertEqual(results, ['done', error])
+
+    def test_should_raise_update_thread_error_for_new_filters(self):
+        lost = vim.fault.NotAuthenticated()
+
+        async def collect(loop):
+            loop._thread.join()
+            with self.assertRaises(vim.fault.NotAuthenticated):
+                async for _ in loop.changes(vmodl.query.PropertyCollector.FilterSpec()):
+                    pass
+            return loop.error
+
+        si = Mock()
+        collector = FakeCollector([])
+        collector.WaitForUpdatesEx = Mock(side_effect=lost)
+        si.content.propertyCollector.CreatePropertyCollector.return_value = collector
+
+        async def main():
+            async with AsyncUpdateLoop(si) as loop:
+                return await collect(loop)
+
+        self.assertIs(asyncio.run(main()), lost)
+        self.assertEqual(collector.filters, 0)
+
+    def test_should_iterate_over_change_sets(self):
+        vm = vim.VirtualMachine('vm-1')
+        updates = [_filter_update('filter-1', vm, str(i), state=i) for i in range(3)]
+
+        async def collect(loop):
+            seen = []
+            async for object_set in loop.changes(vmodl.query.PropertyCollector.FilterSpec()):
+                seen.append(object_set.changeSet[0].val)
+                if len(seen) == 3:
+                    break
+            return seen
+
+        self.assertEqual(self.run_with(updates, collect), [0, 1, 2])
+
+    def test_should_drop_updates_for_destroyed_filters(self):
+        vm = vim.VirtualMachine('vm-1')
+        collector = LateCollector([_filter_update('filter-1', vm, '1', state=0)],
+                                  _filter_update('filter-1', vm, '2', state=1))
+
+        async def collect(loop):
+            changes = loop.changes(vmodl.query.PropertyCollector.FilterSpec())
+            await changes.__anext__()
+            await changes.aclose()
+            collector.release.set()
+            await asyncio.get_running_loop().run_in_executor(None, collector.drained.wait)
+            return dict(loop._unclaimed)
+
+        self.assertEqual(self.run_with([], collect, collector), {})
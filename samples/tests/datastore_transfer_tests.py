@@ -0,0 +1,177 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from mock import Mock
+
+from samples.tools import datastore_transfer
+
+
+class DatastoreUploaderTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.sent = {}
+        self.statuses = []
+        self.transfer_session = Mock()
+        self.transfer_session.url.side_effect = lambda path: 'https://vcenter' + path
+        self.transfer_session.put.side_effect = self.put
+        self.si = Mock()
+        datacenter = Mock()
+        datacenter.name = 'DC'
+        self.uploader = datastore_transfer.DatastoreUploader(
+            self.si, datacenter, 'datastore1', max_workers=2, retries=1, retry_delay=0,
+            transfer_session=self.transfer_session)
+
+    def put(self, url, params, data, headers):
+        self.assertEqual(params, {'dsName': 'datastore1', 'dcPath': 'DC'})
+        self.sent[url] = data.read()
+        # a known length makes requests send a Content-Length, not chunks
+        self.assertEqual(len(data), len(self.sent[url]))
+        status = self.statuses.pop(0) if self.statuses else 201
+        return Mock(ok=status < 400, status_code=status, reason='')
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file_data:
+            file_data.write(content)
+        return path
+
+    def test_should_upload_tree_to_relative_paths(self):
+        self.write('a.iso', b'aaaa')
+        self.write(os.path.join('sub', 'b.iso'), b'bb')
+
+        results = list(self.uploader.upload_tree(self.directory, '/iso/'))
+
+        self.assertEqual(sorted(result.remote_path for result in results),
+                         ['iso/a.iso', 'iso/sub/b.iso'])
+        self.assertEqual(self.sent, {'https://vcenter/folder/iso/a.iso': b'aaaa',
+                                     'https://vcenter/folder/iso/sub/b.iso': b'bb'})
+        make_directory = self.si.content.fileManager.MakeDirectory
+        made = [call[1]['name'] for call in make_directory.call_args_list]
+        self.assertEqual(made, ['[datastore1] iso', '[datastore1] iso/sub'])
+        self.assertEqual(self.uploader.bytes_transferred, 6)
+
+    def test_should_retry_server_error(self):
+        path = self.write('a.iso', b'aaaa')
+        self.statuses = [503]
+
+        result = self.uploader.upload_file(path, 'a.iso')
+
+        self.assertIsNone(result.error)
+        self.assertEqual(result.attempts, 2)
+        self.assertEqual(self.uploader.bytes_transferred, 4)
+
+    def test_should_not_retry_client_error(self):
+        path = self.write('a.iso', b'aaaa')
+        self.statuses = [404, 201]
+
+        result = self.uploader.upload_file(path, 'a.iso')
+
+        self.assertEqual(result.error.status_code, 404)
+        self.assertEqual(result.attempts, 1)
+        self.assertEqual(self.uploader.bytes_transferred, 0)
+
+    def test_should_give_up_after_retries(self):
+        path = self.write('a.iso', b'aaaa')
+        self.transfer_session.put.side_effect = IOError('connection reset')
+
+        result = self.uploader.upload_file(path, 'a.iso')
+
+        self.assertIsInstance(result.error, IOError)
+        self.assertEqual(result.attempts, 2)
+
+
+class DatastoreDownloaderTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.local_path = os.path.join(self.directory, 'disk-flat.vmdk')
+        self.content = bytes(range(256)) * 40
+        self.etag = '"1"'
+        self.ranges = []
+        self.fail_after = None
+        self.ignore_ranges = False
+        self.transfer_session = Mock()
+        self.transfer_session.url.side_effect = lambda path: 'https://vcenter' + path
+        self.transfer_session.request.side_effect = self.head
+        self.transfer_session.get.side_effect = self.get
+        datacenter = Mock()
+        datacenter.name = 'DC'
+        self.downloader = datastore_transfer.DatastoreDownloader(
+            Mock(), datacenter, 'datastore1', max_workers=4, retries=0, retry_delay=0,
+            transfer_session=self.transfer_session)
+        self.downloader.MIN_SEGMENT_SIZE = 1000
+        self.downloader.CHUNK_SIZE = 100
+
+    def head(self, method, url, params):
+        self.assertEqual(method, 'HEAD')
+        headers = {'Content-Length': str(len(self.content)), 'ETag': self.etag}
+        if not self.ignore_ranges:
+            headers['Accept-Ranges'] = 'bytes'
+        return Mock(ok=True, headers=headers)
+
+    def get(self, url, params, headers, stream):
+        if self.ignore_ranges:
+            self.ranges.append(headers.get('Range'))
+            chunks = [self.content[offset:offset + 100]
+                      for offset in range(0, len(self.content), 100)]
+            return Mock(status_code=200, iter_content=Mock(return_value=iter(chunks)))
+        first, last = [int(bound) for bound in headers['Range'][6:].split('-')]
+        self.ranges.append((first, last))
+        data = self.content[first:last + 1]
+        chunks = [data[offset:offset + 100] for offset in range(0, len(data), 100)]
+        if self.fail_after is not None and first == 0:
+            # the stream of the first segment breaks
+            chunks = chunks[:self.fail_after]
+        return Mock(status_code=206, iter_content=Mock(return_value=iter(chunks)))
+
+    def test_should_download_ranges_in_parallel(self):
+        result = self.downloader.download_file('vm/disk-flat.vmdk', self.local_path)
+
+        self.assertIsNone(result.error)
+        self.assertEqual(sorted(self.ranges), [(0, 2559), (2560, 5119), (5120, 7679),
+                                               (7680, 10239)])
+        with open(self.local_path, 'rb') as local_file:
+            self.assertEqual(local_file.read(), self.content)
+        self.assertFalse(os.path.exists(self.local_path + '.part.json'))
+
+    def test_should_resume_interrupted_download(self):
+        self.fail_after = 3
+        result = self.downloader.download_file('vm/disk-flat.vmdk', self.local_path)
+        self.assertIsInstance(result.error, IOError)
+        self.assertTrue(os.path.exists(self.local_path + '.part.json'))
+
+        self.fail_after = None
+        self.ranges = []
+        result = self.downloader.download_file('vm/disk-flat.vmdk', self.local_path)
+
+        self.assertIsNone(result.error)
+        self.assertEqual(self.ranges, [(300, 2559)])
+        with open(self.local_path, 'rb') as local_file:
+            self.assertEqual(local_file.read(), self.content)
+
+    def test_should_start_over_when_remote_file_changed(self):
+        self.fail_after = 3
+        self.downloader.download_file('vm/disk-flat.vmdk', self.local_path)
+
+        self.fail_after = None
+        self.ranges = []
+        self.etag = '"2"'
+        self.downloader.download_file('vm/disk-flat.vmdk', self.local_path)
+
+        self.assertEqual(len(self.ranges), 4)
+        self.assertIn((0, 2559), self.ranges)
+
+    def test_should_fall_back_to_one_stream_when_ranges_are_ignored(self):
+        self.ignore_ranges = True
+        result = self.downloader.download_file('vm/disk-flat.vmdk', self.local_path)
+
+        self.assertIsNone(result.error)
+        self.assertEqual(self.ranges.count(None), 1)
+        with open(self.local_path, 'rb') as local_file:
+            self.assertEqual(local_file.read(), self.content)
+        self.assertEqual(self.downloader.bytes_transferred, len(self.content))
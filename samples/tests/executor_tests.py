@@ -0,0 +1,116 @@
+import random
+import threading
+from concurrent import futures
+from unittest import TestCase
+from mock import Mock, patch
+
+from pyVmomi import vim
+
+from samples.tools import tasks
+from samples.tools.executor import Operation, TaskExecutor
+
+
+class FakeMonitor:
+    """
+    Settles every watched task shortly after it was submitted
+    """
+
+    def __init__(self):
+        self.outcomes = {}
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+
+    def submit(self, moid, keys, error=None, result=None):
+        def submit():
+            with self.lock:
+                for key in keys:
+                    self.active[key] = self.active.get(key, 0) + 1
+                    self.peak[key] = max(self.peak.get(key, 0), self.active[key])
+            self.outcomes[moid] = (keys, error, result)
+            return vim.Task(moid)
+        return submit
+
+    def watch(self, task, on_complete=None, on_progress=None):
+        future = futures.Future()
+        future.add_done_callback(on_complete)
+        keys, error, result = self.outcomes[task._moId]
+
+        def settle():
+            with self.lock:
+                for key in keys:
+                    self.active[key] -= 1
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        threading.Timer(random.uniform(0, 0.01), settle).start()
+        return future
+
+
+class TaskExecutorTests(TestCase):
+
+    def setUp(self):
+        self.monitor = FakeMonitor()
+        patcher = patch.object(tasks, 'get_task_monitor', return_value=self.monitor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_should_yield_in_order_within_limits(self):
+        hosts = [vim.HostSystem('host-1'), vim.HostSystem('host-2')]
+        operations = [Operation(self.monitor.submit('task-%d' % index,
+                                                    ['all', hosts[index % 2]._moId],
+                                                    result=index),
+                                host=hosts[index % 2])
+                      for index in range(12)]
+
+        executor = TaskExecutor(Mock(), max_tasks=3, max_per_host=1)
+        outcomes = list(executor.map(operations))
+
+        self.assertEqual([outcome.result for outcome in outcomes], list(range(12)))
+        self.assertEqual(self.monitor.peak['host-1'], 1)
+        self.assertEqual(self.monitor.peak['host-2'], 1)
+        self.assertLessEqual(self.monitor.peak['all'], 3)
+
+    def test_should_retry_transient_faults_only(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                return self.monitor.submit('task-1', [], error=vim.fault.TaskInProgress())()
+            return self.monitor.submit('task-2', [], result='done')()
+
+        def rejected():
+            raise vim.fault.InvalidName()
+
+        operations = [flaky,
+                      self.monitor.submit('task-3', [], error=vim.fault.NoDiskSpace()),
+                      rejected]
+
+        executor = TaskExecutor(Mock(), max_tasks=2, retry_delay=0)
+        outcomes = list(executor.map(operations))
+
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(outcomes[0].result, 'done')
+        self.assertIsInstance(outcomes[1].error, vim.fault.NoDiskSpace)
+        self.assertIsNone(outcomes[2].task)
+        self.assertIsInstance(outcomes[2].error, vim.fault.InvalidName)
+
+    def test_should_free_the_slot_when_watching_fails(self):
+        watch = self.monitor.watch
+        lost = IOError('connection reset')
+
+        def flaky_watch(task, on_complete=None, on_progress=None):
+            if task._moId == 'task-1':
+                raise lost
+            return watch(task, on_complete, on_progress)
+        self.monitor.watch = flaky_watch
+
+        operations = [self.monitor.submit('task-1', [], result='lost'),
+                      self.monitor.submit('task-2', [], result='done')]
+        outcomes = list(TaskExecutor(Mock(), max_tasks=1).map(operations))
+
+        self.assertEqual(outcomes[0].task, vim.Task('task-1'))
+        self.assertIs(outcomes[0].error, lost)
+        self.assertEqual(outcomes[1].result, 'done')
@@ -0,0 +1,132 @@
+from unittest import TestCase
+from mock import Mock, patch
+
+from pyVmomi import vim, vmodl
+
+from samples.tools.inventory import InventoryMirror
+
+
+def _change(name, val=None, op='assign'):
+    change = Mock()
+    change.name = name
+    change.val = val
+    change.op = op
+    return change
+
+
+def _update(kind, obj, *changes, **kwargs):
+    object_set = Mock()
+    object_set.kind = kind
+    object_set.obj = obj
+    object_set.changeSet = list(changes)
+    filter_set = Mock()
+    filter_set.objectSet = [object_set]
+    update = Mock()
+    update.filterSet = [filter_set]
+    update.version = kwargs.get('version', '1')
+    update.truncated = kwargs.get('truncated', False)
+    return update
+
+
+class InventoryMirrorTests(TestCase):
+
+    def setUp(self):
+        self.si = Mock()
+        self.collector = self.si.content.propertyCollector.CreatePropertyCollector.return_value
+        self.mirror = InventoryMirror(self.si, [(vim.VirtualMachine, ['name'])],
+                                      container=vim.Folder('group-d1'))
+        self.vm = vim.VirtualMachine('vm-1')
+
+    def test_should_apply_enter_modify_and_leave(self):
+        self.mirror.apply(_update('enter', self.vm, _change('name', 'a'),
+                                  _change('runtime.powerState', 'poweredOff')))
+        self.mirror.apply(_update('modify', self.vm, _change('name', 'b'),
+                                  _change('runtime.powerState', op='remove')))
+
+        self.assertEqual(self.mirror.get(self.vm), {'name': 'b'})
+        self.assertEqual(self.mirror.find(vim.VirtualMachine, 'name', 'b'), self.vm)
+
+        self.mirror.apply(_update('leave', self.vm))
+
+        self.assertNotIn(self.vm, self.mirror)
+        self.assertIsNone(self.mirror.get(self.vm))
+
+    def test_should_drain_truncated_initial_load(self):
+        other = vim.VirtualMachine('vm-2')
+        self.collector.WaitForUpdatesEx.side_effect = [
+            _update('enter', self.vm, _change('name', 'a'), version='1', truncated=True),
+            _update('enter', other, _change('name', 'b'), version='2'),
+        ]
+
+        self.mirror.load()
+
+        self.assertEqual(len(self.mirror), 2)
+        self.assertEqual(self.mirror.version, '2')
+        self.assertEqual([call[0][0] for call in self.collector.WaitForUpdatesEx.call_args_list],
+                         ['', '1'])
+
+    def test_should_scan_with_type_and_predicate(self):
+        self.mirror.apply(_update('enter', self.vm, _change('name', 'a')))
+        self.mirror.apply(_update('enter', vim.HostSystem('host-1'), _change('name', 'a')))
+
+        found = self.mirror.scan(vim.VirtualMachine, lambda props: props['name'] == 'a')
+
+        self.assertEqual(found, [(self.vm, {'name': 'a'})])
+
+    def test_should_drop_objects_deleted_while_stopped(self):
+        other = vim.VirtualMachine('vm-2')
+        self.collector.WaitForUpdatesEx.side_effect = [
+            _update('enter', self.vm, _change('name', 'a'), version='1', truncated=True),
+            _update('enter', other, _change('name', 'b'), version='2'),
+        ]
+        self.mirror.load()
+        self.mirror.stop()
+        self.collector.WaitForUpdatesEx.side_effect = [
+            _update('enter', self.vm, _change('name', 'a'), version='1'),
+        ]
+
+        self.mirror.load()
+
+        self.assertEqual(len(self.mirror), 1)
+        self.assertNotIn(other, self.mirror)
+
+    def test_should_refuse_lookups_after_update_thread_failed(self):
+        self.collector.WaitForUpdatesEx.side_effect = [
+            _update('enter', self.vm, _change('name', 'a')),
+            vim.fault.NotAuthenticated(),
+        ]
+        self.mirror.start()
+        self.mirror._thread.join()
+
+        self.assertIsInstance(self.mirror.error, vim.fault.NotAuthenticated)
+        self.assertRaises(RuntimeError, self.mirror.get, self.vm)
+        self.assertRaises(RuntimeError, self.mirror.scan)
+
+        self.mirror.stop()
+        self.collector.WaitForUpdatesEx.side_effect = [
+            _update('enter', self.vm, _change('name', 'b')),
+        ]
+        self.mirror.load()
+
+        self.assertEqual(self.mirror.get(self.vm, 'name'), 'b')
+
+    def test_should_destroy_previous_collector_when_loading_again(self):
+        first, second = Mock(), Mock()
+        for collector in (first, second):
+            collector.WaitForUpdatesEx.return_value = _update('enter', self.vm, version='1')
+        self.si.content.propertyCollector.CreatePropertyCollector.side_effect = [first, second]
+
+        self.mirror.load()
+        self.mirror.load()
+
+        first.DestroyPropertyCollector.assert_called_once_with()
+        self.assertFalse(second.DestroyPropertyCollector.called)
+
+    @patch('samples.tools.pchelper.make_property_collector')
+    def test_should_destroy_collector_when_filter_creation_fails(self, make_property_collector):
+        make_property_collector.side_effect = vmodl.query.InvalidProperty()
+
+        self.assertRaises(vmodl.query.InvalidProperty, self.mirror.load)
+
+        self.collector.DestroyPropertyCollector.assert_called_once_with()
+        self.assertFalse(self.mirror.loaded)
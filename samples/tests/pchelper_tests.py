@@ -0,0 +1,264 @@
+from unittest import TestCase
+from mock import Mock
+
+from pyVmomi import vim
+
+from samples.tools import pchelper
+
+
+def _object_content(moid, **props):
+    obj = Mock()
+    obj.obj = vim.VirtualMachine(moid)
+    obj.propSet = []
+    for name, val in props.items():
+        prop = Mock()
+        prop.name = name
+        prop.val = val
+        obj.propSet.append(prop)
+    return obj
+
+
+def _page(objects, token=None):
+    page = Mock()
+    page.objects = objects
+    page.token = token
+    return page
+
+
+class IterCollectPropertiesTests(TestCase):
+
+    def setUp(self):
+        self.si = Mock()
+        self.collector = self.si.content.propertyCollector
+        self.view = vim.view.ContainerView('view-1')
+
+    def test_should_follow_continuation_tokens(self):
+        self.collector.RetrievePropertiesEx.return_value = _page(
+            [_object_content('vm-1', name='a')], token='t1')
+        self.collector.ContinueRetrievePropertiesEx.return_value = _page(
+            [_object_content('vm-2', name='b')])
+
+        rows = list(pchelper.iter_collect_properties(
+            self.si, self.view, vim.VirtualMachine, ['name'], page_size=1))
+
+        self.assertEqual([row['name'] for row in rows], ['a', 'b'])
+        self.collector.ContinueRetrievePropertiesEx.assert_called_once_with('t1')
+        self.assertFalse(self.collector.CancelRetrievePropertiesEx.called)
+        options = self.collector.RetrievePropertiesEx.call_args[0][1]
+        self.assertEqual(options.maxObjects, 1)
+
+    def test_should_cancel_token_when_consumer_stops_early(self):
+        self.collector.RetrievePropertiesEx.return_value = _page(
+            [_object_content('vm-1', name='a')], token='t1')
+
+        rows = pchelper.iter_collect_properties(
+            self.si, self.view, vim.VirtualMachine, ['name'])
+        next(rows)
+        rows.close()
+
+        self.collector.CancelRetrievePropertiesEx.assert_called_once_with('t1')
+        self.assertFalse(self.collector.ContinueRetrievePropertiesEx.called)
+
+    def test_should_yield_nothing_for_empty_result(self):
+        self.collector.RetrievePropertiesEx.return_value = None
+
+        self.assertEqual(pchelper.collect_properties(
+            self.si, self.view, vim.VirtualMachine, ['name']), [])
+
+    def test_should_include_mors_when_requested(self):
+        self.collector.RetrievePropertiesEx.return_value = _page(
+            [_object_content('vm-1', name='a')])
+
+        rows = pchelper.collect_properties(
+            self.si, self.view, vim.VirtualMachine, ['name'], include_mors=True)
+
+        self.assertEqual(rows[0]['obj'], vim.VirtualMachine('vm-1'))
+
+
+class NameIndexTests(TestCase):
+
+    def setUp(self):
+        pchelper.invalidate_name_index()
+        self.content = Mock()
+        self.content.viewManager.CreateContainerView.return_value = \
+            vim.view.ContainerView('view-1', Mock())
+        self.collector = self.content.propertyCollector
+        self.collector.RetrievePropertiesEx.return_value = _page(
+            [_object_content('vm-1', name='a'), _object_content('vm-2', name='b')])
+
+    def test_should_resolve_names_with_one_retrieval(self):
+        vm = pchelper.get_obj(self.content, [vim.VirtualMachine], 'b', use_index=True)
+        again = pchelper.get_obj(self.content, [vim.VirtualMachine], 'a', use_index=True)
+
+        self.assertEqual(vm, vim.VirtualMachine('vm-2'))
+        self.assertEqual(again, vim.VirtualMachine('vm-1'))
+        self.assertEqual(self.collector.RetrievePropertiesEx.call_count, 1)
+
+    def test_should_rebuild_index_on_miss(self):
+        self.assertIsNone(pchelper.search_for_obj(
+            self.content, [vim.VirtualMachine], 'c', use_index=True))
+        self.assertEqual(self.collector.RetrievePropertiesEx.call_count, 2)
+
+    def test_should_rebuild_index_after_invalidation(self):
+        pchelper.get_all_obj(self.content, [vim.VirtualMachine], use_index=True)
+        pchelper.invalidate_name_index(self.content)
+        names = pchelper.get_all_obj(self.content, [vim.VirtualMachine], use_index=True)
+
+        self.assertEqual(names, {vim.VirtualMachine('vm-1'): 'a',
+                                 vim.VirtualMachine('vm-2'): 'b'})
+        self.assertEqual(self.collector.RetrievePropertiesEx.call_count, 2)
+
+    def test_should_expire_after_ttl(self):
+        index = pchelper.NameIndex([], ttl=0)
+        self.assertTrue(index.expired)
+        self.assertFalse(pchelper.NameIndex([], ttl=None).expired)
+
+
+class ResolveManyTests(TestCase):
+
+    def setUp(self):
+        self.content = Mock()
+        self.content.viewManager.CreateContainerView.return_value = \
+            vim.view.ContainerView('view-1', Mock())
+        datastore = _object_content('ds-1', name='shared')
+        datastore.obj = vim.Datastore('ds-1')
+        self.collector = self.content.propertyCollector
+        self.collector.RetrievePropertiesEx.return_value = _page(
+            [_object_content('vm-1', name='shared'), datastore])
+
+    def test_should_resolve_names_per_type(self):
+        found = pchelper.resolve_many(self.content, {vim.VirtualMachine: ['shared'],
+                                                     vim.Datastore: ['shared', None]})
+
+        self.assertEqual(found[vim.VirtualMachine]['shared'], vim.VirtualMachine('vm-1'))
+        self.assertEqual(found[vim.Datastore]['shared'], vim.Datastore('ds-1'))
+        self.assertEqual(self.collector.RetrievePropertiesEx.call_count, 1)
+
+    def test_should_report_all_misses_together(self):
+        with self.assertRaises(RuntimeError) as ctx:
+            pchelper.resolve_many(self.content, {vim.VirtualMachine: ['x', 'shared'],
+                                                 vim.Datastore: ['y']})
+        self.assertIn("'x'", str(ctx.exception))
+        self.assertIn("'y'", str(ctx.exception))
+
+    def test_should_skip_retrieval_without_names(self):
+        found = pchelper.resolve_many(self.content, {vim.Datacenter: [None]})
+
+        self.assertEqual(found, {vim.Datacenter: {}})
+        self.assertFalse(self.collector.RetrievePropertiesEx.called)
+
+
+class GetAllObjTests(TestCase):
+
+    def setUp(self):
+        self.content = Mock()
+        self.content.viewManager.CreateContainerView.return_value = \
+            vim.view.ContainerView('view-1', Mock())
+        self.collector = self.content.propertyCollector
+        self.collector.RetrievePropertiesEx.return_value = _page(
+            [_object_content('vm-1', name='a', **{'runtime.powerState': 'poweredOn'})])
+
+    def test_should_fetch_names_in_bulk(self):
+        names = pchelper.get_all_obj(self.content, [vim.VirtualMachine])
+
+        self.assertEqual(names, {vim.VirtualMachine('vm-1'): 'a'})
+        filter_spec = self.collector.RetrievePropertiesEx.call_args[0][0][0]
+        self.assertEqual(list(filter_spec.propSet[0].pathSet), ['name'])
+
+    def test_should_return_extra_properties(self):
+        props = pchelper.get_all_obj(self.content, [vim.VirtualMachine],
+                                     properties=['runtime.powerState'])
+
+        self.assertEqual(props[vim.VirtualMachine('vm-1')],
+                         {'name': 'a', 'runtime.powerState': 'poweredOn'})
+
+
+class ViewCacheTests(TestCase):
+
+    def setUp(self):
+        self.si = Mock()
+        self.view_manager = self.si.content.viewManager
+        self.view_manager.CreateContainerView.side_effect = lambda *args: Mock()
+
+    def test_should_reuse_live_views(self):
+        with pchelper.ViewCache(self.si) as views:
+            first = views.get([vim.VirtualMachine])
+            second = views.get([vim.VirtualMachine])
+
+            self.assertIs(first, second)
+            self.assertEqual(views.live_views, 1)
+        first.Destroy.assert_called_once_with()
+        self.assertEqual(views.live_views, 0)
+
+    def test_should_destroy_least_recently_used_view(self):
+        views = pchelper.ViewCache(self.si, max_views=2)
+        vms = views.get([vim.VirtualMachine])
+        hosts = views.get([vim.HostSystem])
+        views.get([vim.VirtualMachine])
+        views.get([vim.Datastore])
+
+        hosts.Destroy.assert_called_once_with()
+        self.assertFalse(vms.Destroy.called)
+        self.assertEqual(views.live_views, 2)
+
+    def test_should_not_destroy_cached_views_in_helpers(self):
+        view = vim.view.ContainerView('view-1', Mock())
+        self.view_manager.CreateContainerView.side_effect = None
+        self.view_manager.CreateContainerView.return_value = view
+        self.si.content.propertyCollector.RetrievePropertiesEx.return_value = None
+        views = pchelper.ViewCache(self.si)
+
+        pchelper.get_all_obj(self.si.content, [vim.VirtualMachine], view_cache=views)
+        pchelper.get_all_obj(self.si.content, [vim.VirtualMachine], view_cache=views)
+
+        self.assertEqual(self.view_manager.CreateContainerView.call_count, 1)
+        self.assertFalse(view._stub.InvokeMethod.called)
+
+
+class CollectPropertiesShardedTests(TestCase):
+
+    def setUp(self):
+        self.si = Mock()
+        self.si._stub = Mock()
+        self.vms = [vim.VirtualMachine('vm-%d' % i) for i in range(5)]
+        view = vim.view.ContainerView('view-1', Mock())
+        self.si.content.viewManager.CreateContainerView.return_value = view
+        self.collector = self.si.content.propertyCollector
+
+        def retrieve(filter_specs, options):
+            objects = [spec.obj for spec in filter_specs[0].objectSet]
+            if objects == [view]:
+                return _page([_object_content(vm._moId, name=vm._moId) for vm in self.vms])
+            return _page([_object_content(vm._moId, name=vm._moId) for vm in objects])
+        self.collector.RetrievePropertiesEx.side_effect = retrieve
+
+    def test_should_split_into_partitions(self):
+        planning_view = Mock()
+        planning_view.view = self.vms
+        self.si.content.viewManager.CreateContainerView.return_value = planning_view
+
+        rows = list(pchelper.collect_properties_sharded(
+            self.si, vim.VirtualMachine, ['name'], shard_by=2, max_workers=2))
+
+        self.assertEqual(sorted(row['name'] for row in rows), [vm._moId for vm in self.vms])
+        self.assertEqual(self.collector.RetrievePropertiesEx.call_count, 2)
+        planning_view.Destroy.assert_called_once_with()
+
+    def test_should_use_session_factory_per_worker(self):
+        # every 'datacenter' shard of the fake inventory returns all five VMs
+        sessions = []
+
+        def factory():
+            sessions.append(self.si)
+            return self.si
+
+        rows = list(pchelper.collect_properties_sharded(
+            self.si, vim.VirtualMachine, ['name'], max_workers=1, session_factory=factory))
+
+        self.assertEqual(len(rows), 5 * 5)
+        self.assertEqual(len(sessions), 1)
+
+    def test_should_reject_unknown_shard_mode(self):
+        with self.assertRaises(ValueError):
+            list(pchelper.collect_properties_sharded(self.si, vim.VirtualMachine,
+                                                     shard_by='host'))
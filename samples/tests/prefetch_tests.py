@@ -0,0 +1,64 @@
+from unittest import TestCase
+from mock import Mock
+
+from pyVmomi import vim
+
+from samples.tools.prefetch import PrefetchList
+
+
+def _object_content(obj, **props):
+    object_content = Mock()
+    object_content.obj = obj
+    object_content.propSet = []
+    for name, val in props.items():
+        prop = Mock()
+        prop.name = name
+        prop.val = val
+        object_content.propSet.append(prop)
+    return object_content
+
+
+class PrefetchListTests(TestCase):
+
+    def setUp(self):
+        self.si = Mock()
+        self.collector = self.si.content.propertyCollector
+        self.vms = [vim.VirtualMachine('vm-1'), vim.VirtualMachine('vm-2')]
+        result = Mock()
+        result.token = None
+        result.objects = [
+            _object_content(self.vms[0], **{'summary.config.name': 'a'}),
+            _object_content(self.vms[1], **{'summary.config.name': 'b',
+                                            'summary.guest': 'guest-b'}),
+        ]
+        self.collector.RetrievePropertiesEx.return_value = result
+
+    def test_should_prefetch_declared_paths_in_one_call(self):
+        vms = PrefetchList(self.si, self.vms,
+                           paths=['summary.config.name', 'summary.guest.ipAddress'])
+
+        self.assertEqual([vm.summary.config.name for vm in vms], ['a', 'b'])
+        self.assertIsNone(vms[0].summary.guest)
+        self.assertEqual(vms[1].summary.guest, 'guest-b')
+        self.assertEqual(self.collector.RetrievePropertiesEx.call_count, 1)
+        filter_spec = self.collector.RetrievePropertiesEx.call_args[0][0][0]
+        self.assertEqual(sorted(filter_spec.propSet[0].pathSet),
+                         ['summary.config.name', 'summary.guest'])
+
+    def test_should_record_paths_touched_on_first_element(self):
+        self.vms[0]._stub = Mock()
+        self.vms[0]._stub.InvokeAccessor.return_value = vim.vm.Summary(
+            config=vim.vm.Summary.ConfigSummary(name='a'))
+        vms = PrefetchList(self.si, self.vms)
+
+        names = [vm.summary.config.name for vm in vms]
+
+        self.assertEqual(names, ['a', 'b'])
+        self.assertEqual(vms.paths, set(['summary.config.name']))
+        self.assertEqual(self.collector.RetrievePropertiesEx.call_count, 1)
+
+    def test_should_keep_methods_and_private_attributes_live(self):
+        vms = PrefetchList(self.si, self.vms, paths=['summary.config.name'])
+
+        self.assertEqual(vms[1]._moId, 'vm-2')
+        self.assertEqual(vms[1].managed_object, self.vms[1])
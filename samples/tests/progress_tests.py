@@ -0,0 +1,119 @@
+import io
+from concurrent import futures
+from unittest import TestCase
+from mock import Mock, patch
+
+from pyVmomi import vim
+
+from samples.tools import progress, tasks
+
+
+class ProgressTrackerTests(TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.tracker = progress.ProgressTracker(clock=lambda: self.now)
+
+    def test_should_estimate_rate_and_eta(self):
+        task = vim.Task('task-1')
+        self.tracker.update(task, 0)
+        self.now += 10
+        event = self.tracker.update(task, 20)
+
+        self.assertEqual(event.rate, 2)
+        self.assertEqual(event.eta, 40)
+
+        self.now += 30
+        event = self.tracker.events()[0]
+        self.assertEqual(event.idle, 30)
+
+        self.assertEqual(self.tracker.finish(task).percent, 100)
+
+    def test_should_report_bytes_per_second_with_a_total(self):
+        self.tracker.update('disk-0', 0, total=1000)
+        self.now += 2
+        event = self.tracker.update('disk-0', 10, total=1000)
+
+        self.assertEqual(event.rate, 50)
+        self.assertEqual(progress.format_rate(event), '50.0 B/s')
+
+
+class ProgressRendererTests(TestCase):
+
+    def test_should_summarize_and_list_stalled_tasks_first(self):
+        out = io.StringIO()
+        renderer = progress.ProgressRenderer(out=out, max_rows=2, stall_after=60,
+                                             labels={'t1': 'vm-a'})
+        running = vim.TaskInfo.State.running
+        for event in [
+                progress.ProgressEvent('t1', 50, 1.0, 50, running, 0, None),
+                progress.ProgressEvent('t2', 10, 0.1, 900, running, 0, None),
+                progress.ProgressEvent('t3', 30, 1.0, 70, running, 300, None),
+                progress.ProgressEvent('t4', 100, None, 0, vim.TaskInfo.State.success, 0, None),
+        ]:
+            renderer.update(event)
+
+        lines = renderer.lines()
+
+        self.assertEqual(lines[0], '3 running, 0 queued, 1 done, 0 failed, 1 stalled'
+                                   ' |  47% | ETA 15m00s')
+        self.assertTrue(lines[1].startswith('  t3 '))
+        self.assertIn('STALLED 5m00s', lines[1])
+        self.assertTrue(lines[2].startswith('  t2 '))
+        self.assertEqual(lines[3], '  ... 1 more running')
+        self.assertTrue(out.getvalue().startswith('1 running'))
+
+
+class StreamTests(TestCase):
+
+    def test_should_stream_progress_and_completion(self):
+        monitor = Mock()
+
+        def watch(task, on_complete=None, on_progress=None, on_state=None):
+            on_progress(task, 40)
+            future = futures.Future()
+            future.add_done_callback(on_complete)
+            if task._moId == 'task-2':
+                future.set_exception(vim.fault.NoDiskSpace())
+            else:
+                future.set_result(None)
+            return future
+        monitor.watch.side_effect = watch
+
+        task_list = [vim.Task('task-1'), vim.Task('task-2')]
+        with patch.object(tasks, 'get_task_monitor', return_value=monitor):
+            events = list(progress.stream(Mock(), task_list))
+
+        self.assertEqual([(e.task._moId, e.percent, e.state) for e in events],
+                         [('task-1', 40, 'running'), ('task-1', 100, 'success'),
+                          ('task-2', 40, 'running'), ('task-2', 40, 'error')])
+
+    def test_should_report_queued_tasks(self):
+        monitor = Mock()
+        pending = []
+
+        def watch(task, on_complete=None, on_progress=None, on_state=None):
+            on_state(task, vim.TaskInfo.State.queued)
+            if task._moId == 'task-2':
+                on_state(task, vim.TaskInfo.State.running)
+            future = futures.Future()
+            future.add_done_callback(on_complete)
+            pending.append(future)
+            return future
+        monitor.watch.side_effect = watch
+
+        renderer = progress.ProgressRenderer(out=io.StringIO())
+        task_list = [vim.Task('task-1'), vim.Task('task-2')]
+        with patch.object(tasks, 'get_task_monitor', return_value=monitor):
+            events = progress.stream(Mock(), task_list)
+            # task-1 queued, task-2 queued, task-2 running
+            for _ in range(3):
+                renderer.update(next(events))
+            self.assertTrue(renderer.lines()[0].startswith('1 running, 1 queued'))
+
+            for future in pending:
+                future.set_result(None)
+            for event in events:
+                renderer.update(event)
+
+        self.assertTrue(renderer.lines()[0].startswith('0 running, 0 queued, 2 done'))
@@ -0,0 +1,44 @@
+import io
+import json
+from unittest import TestCase
+
+from samples.tools.proptable import PropertyTable
+
+
+class PropertyTableTests(TestCase):
+
+    def setUp(self):
+        self.table = PropertyTable()
+        self.table.append({'name': 'vm-a', 'config.hardware.numCPU': 2})
+        self.table.append({'name': 'vm-b', 'guest.guestState': 'running'})
+
+    def test_should_behave_like_dict_rows(self):
+        first, second = list(self.table)
+
+        self.assertEqual(first['name'], 'vm-a')
+        self.assertEqual(dict(first), {'name': 'vm-a', 'config.hardware.numCPU': 2})
+        self.assertNotIn('config.hardware.numCPU', second)
+        self.assertIsNone(second.get('config.hardware.numCPU'))
+        self.assertRaises(KeyError, lambda: second['config.hardware.numCPU'])
+
+    def test_should_backfill_columns_added_later(self):
+        self.assertEqual(self.table.keys,
+                         ['name', 'config.hardware.numCPU', 'guest.guestState'])
+        self.assertEqual(self.table.column('guest.guestState'), [None, 'running'])
+
+    def test_should_project_columns(self):
+        projected = self.table.select('name')
+
+        self.assertEqual(len(projected), 2)
+        self.assertEqual(dict(projected[-1]), {'name': 'vm-b'})
+
+    def test_should_export_csv_and_ndjson(self):
+        csv_out = io.StringIO()
+        self.table.to_csv(csv_out, keys=['name', 'guest.guestState'])
+        ndjson_out = io.StringIO()
+        self.table.to_ndjson(ndjson_out)
+
+        self.assertEqual(csv_out.getvalue().splitlines(),
+                         ['name,guest.guestState', 'vm-a,', 'vm-b,running'])
+        rows = [json.loads(line) for line in ndjson_out.getvalue().splitlines()]
+        self.assertEqual(rows[1], {'name': 'vm-b', 'guest.guestState': 'running'})
@@ -0,0 +1,97 @@
+import io
+import os
+import tarfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+from samples.tools import remote_file
+
+CONTENT = os.urandom(3 * 2 ** 20 + 123)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path != '/appliance.ova':
+            self.send_response(302)
+            self.send_header('Location', '/appliance.ova')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.server.ranges.append(self.headers['Range'])
+        self.server.clients.add(self.client_address)
+        first, _, last = self.headers['Range'][6:].partition('-')
+        first = int(first)
+        last = int(last) if last else len(self.server.content) - 1
+        self.send_response(206)
+        self.send_header('Content-Range', 'bytes %d-%d/%d'
+                         % (first, last, len(self.server.content)))
+        self.send_header('Content-Length', str(last - first + 1))
+        self.end_headers()
+        self.wfile.write(self.server.content[first:last + 1])
+
+    def log_message(self, *args):
+        pass
+
+
+class RemoteFileTests(TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        self.server.content = CONTENT
+        self.server.ranges = []
+        self.server.clients = set()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = 'http://127.0.0.1:%d/appliance.ova' % self.server.server_address[1]
+
+    def test_should_stream_sequential_reads_over_one_connection(self):
+        with remote_file.RemoteFile(self.url, stream_after=2) as remote:
+            data = b''.join(iter(lambda: remote.read(16 * 2 ** 10), b''))
+
+        self.assertEqual(data, CONTENT)
+        self.assertEqual(remote.size, len(CONTENT))
+        # probe, two growing windows, their prefetch, then one open ended GET
+        self.assertLessEqual(len(self.server.ranges), 6)
+        self.assertTrue(self.server.ranges[-1].endswith('-'))
+
+    def test_should_serve_small_scattered_reads_from_windows(self):
+        with remote_file.RemoteFile(self.url) as remote:
+            for offset in (2 ** 20, 100, 3 * 2 ** 20):
+                remote.seek(offset)
+                self.assertEqual(remote.read(512), CONTENT[offset:offset + 512])
+                self.assertEqual(remote.read(512), CONTENT[offset + 512:offset + 1024])
+            remote.seek(-10, 2)
+            self.assertEqual(remote.read(), CONTENT[-10:])
+
+        self.assertEqual(self.server.ranges[1], 'bytes=1048576-%d'
+                         % (2 ** 20 + remote_file.MIN_WINDOW_SIZE - 1))
+        self.assertEqual(len(self.server.clients), 1)
+
+    def test_should_read_tar_members(self):
+        self.server.content = io.BytesIO()
+        with tarfile.open(fileobj=self.server.content, mode='w') as archive:
+            for name, data in (('a.ovf', b'<ovf/>'), ('disk.vmdk', CONTENT)):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        self.server.content = self.server.content.getvalue()
+
+        with remote_file.RemoteFile(self.url) as remote:
+            archive = tarfile.open(fileobj=remote)
+            self.assertEqual(archive.getnames(), ['a.ovf', 'disk.vmdk'])
+            self.assertEqual(archive.extractfile('disk.vmdk').read(), CONTENT)
+
+    def test_should_follow_redirects(self):
+        with remote_file.RemoteFile(self.url.replace('appliance.ova', 'download?id=1')) as remote:
+            self.assertEqual(remote.size, len(CONTENT))
+            remote.seek(2 ** 20)
+            self.assertEqual(remote.read(512), CONTENT[2 ** 20:2 ** 20 + 512])
+
+        # only the probe was redirected, the read went to the final URL
+        self.assertEqual(remote.requests, 3)
+        self.assertEqual(len(self.server.clients), 1)
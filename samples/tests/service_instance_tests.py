@@ -0,0 +1,162 @@
+import argparse
+import os
+import shutil
+import stat
+import tempfile
+import threading
+from unittest import TestCase
+from mock import Mock, patch
+
+from pyVmomi import vim
+
+from samples.tools import service_instance
+
+
+class SessionCacheTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.args = argparse.Namespace(
+            host='vcenter', port=443, user='admin', password='secret',
+            disable_ssl_verification=False,
+            session_cache=os.path.join(self.directory, 'cache', 'sessions.json'))
+        self.logged_in = Mock()
+        self.logged_in._stub.cookie = 'vmware_soap_session="abc"'
+        self.logged_in._stub.version = 'vim.version.version13'
+
+    @patch.object(service_instance, 'atexit')
+    @patch.object(service_instance, 'SmartConnect')
+    def test_should_cache_fresh_login_without_logout(self, smart_connect, atexit):
+        smart_connect.return_value = self.logged_in
+
+        self.assertIs(service_instance.connect(self.args), self.logged_in)
+
+        mode = os.stat(self.args.session_cache).st_mode
+        self.assertEqual(stat.S_IMODE(mode), 0o600)
+        atexit.register.assert_not_called()
+
+    @patch.object(service_instance, 'vim')
+    @patch.object(service_instance, 'SoapStubAdapter')
+    @patch.object(service_instance, 'SmartConnect')
+    def test_should_reattach_cached_session(self, smart_connect, stub_adapter, fake_vim):
+        smart_connect.return_value = self.logged_in
+        service_instance.connect(self.args)
+        smart_connect.reset_mock()
+
+        reattached = service_instance.connect(self.args)
+
+        self.assertIs(reattached, fake_vim.ServiceInstance.return_value)
+        smart_connect.assert_not_called()
+        self.assertEqual(stub_adapter.call_args[1]['version'], 'vim.version.version13')
+        self.assertEqual(stub_adapter.return_value.cookie, 'vmware_soap_session="abc"')
+
+    @patch.object(service_instance, 'vim')
+    @patch.object(service_instance, 'SoapStubAdapter')
+    @patch.object(service_instance, 'SmartConnect')
+    def test_should_log_in_again_when_session_expired(self, smart_connect, stub_adapter,
+                                                      fake_vim):
+        smart_connect.return_value = self.logged_in
+        service_instance.connect(self.args)
+        content = fake_vim.ServiceInstance.return_value.content
+        type(content.sessionManager).currentSession = property(
+            Mock(side_effect=vim.fault.NotAuthenticated()))
+
+        self.assertIs(service_instance.connect(self.args), self.logged_in)
+        self.assertEqual(smart_connect.call_count, 2)
+
+    @patch.object(service_instance, 'atexit')
+    @patch.object(service_instance, 'SmartConnect')
+    def test_should_log_out_at_exit_when_cache_cannot_be_written(self, smart_connect, atexit):
+        smart_connect.return_value = self.logged_in
+        # a file where the cache directory should be
+        open(os.path.dirname(self.args.session_cache), 'w').close()
+
+        self.assertIs(service_instance.connect(self.args), self.logged_in)
+
+        atexit.register.assert_called_once_with(service_instance.Disconnect, self.logged_in)
+
+    def test_should_save_concurrently_without_clashing(self):
+        errors = []
+
+        def save(user):
+            args = argparse.Namespace(**vars(self.args))
+            args.user = user
+            for _ in range(20):
+                if not service_instance._save_session(args, self.args.session_cache,
+                                                      self.logged_in):
+                    errors.append(user)
+        threads = [threading.Thread(target=save, args=('user%d' % i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(os.listdir(os.path.dirname(self.args.session_cache)),
+                         ['sessions.json'])
+
+
+class ServiceInstancePoolTests(TestCase):
+
+    def setUp(self):
+        self.created = []
+
+        def factory():
+            self.created.append(Mock())
+            return self.created[-1]
+        self.factory = factory
+        self.pool = service_instance.ServiceInstancePool(factory, size=2)
+
+    def test_should_create_lazily_up_to_size(self):
+        first = self.pool.checkout()
+        second = self.pool.checkout()
+
+        self.assertRaises(RuntimeError, self.pool.checkout, timeout=0.01)
+
+        self.pool.checkin(first)
+        self.assertIs(self.pool.checkout(), first)
+        self.assertEqual(self.created, [first, second])
+
+    def test_should_retry_call_on_new_session_after_not_authenticated(self):
+        def current_time(si):
+            if si is self.created[0]:
+                raise vim.fault.NotAuthenticated()
+            return 'now'
+
+        self.assertEqual(self.pool.call(current_time), 'now')
+        self.assertEqual(len(self.created), 2)
+        self.assertIs(self.pool.checkout(), self.created[1])
+
+    @patch('samples.tools.service_instance.is_healthy')
+    @patch('samples.tools.service_instance.clone_session')
+    def test_should_relogin_shared_session_after_not_authenticated(self, clone_session,
+                                                                   is_healthy):
+        expired, renewed = Mock(), Mock()
+        clone_session.side_effect = lambda si: Mock(origin=si)
+        is_healthy.return_value = True
+        pool = service_instance.ServiceInstancePool.sharing_session(
+            expired, size=2, relogin=lambda: renewed)
+        clones = [pool.checkout(), pool.checkout()]
+        for clone in clones:
+            pool.checkin(clone)
+        is_healthy.side_effect = lambda si: si is not expired
+
+        def current_time(si):
+            if si.origin is expired:
+                raise vim.fault.NotAuthenticated()
+            return 'now'
+
+        self.assertEqual(pool.call(current_time), 'now')
+        self.assertIs(pool.checkout().origin, renewed)
+        self.assertIs(pool.checkout().origin, renewed)
+
+    def test_should_replace_unhealthy_idle_session(self):
+        pool = service_instance.ServiceInstancePool(self.factory, size=1,
+                                                    health_check_interval=0)
+        stale = pool.checkout()
+        stale.content.sessionManager.currentSession = None
+        pool.checkin(stale)
+
+        self.assertIsNot(pool.checkout(), stale)
+        self.assertEqual(len(self.created), 2)
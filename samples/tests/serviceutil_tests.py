@@ -0,0 +1,85 @@
+from unittest import TestCase
+
+from pyVmomi import vim
+
+from samples.tools import serviceutil
+
+
+def _walk(root, inventory, specs):
+    """
+    The objects a PropertyCollector would reach from 'root' with 'specs',
+    over an inventory of {object: {property path: [objects]}}
+    """
+    by_name = dict((spec.name, spec) for spec in specs)
+    reached = set()
+    pending = [(root, list(by_name))]
+    while pending:
+        obj, names = pending.pop()
+        reached.add(obj)
+        for name in names:
+            spec = by_name[name]
+            if not isinstance(obj, spec.type):
+                continue
+            for child in inventory.get(obj, {}).get(spec.path, []):
+                pending.append((child, [selected.name for selected in spec.selectSet]))
+    return reached
+
+
+class TraversalTests(TestCase):
+
+    def test_should_memoize_full_traversal(self):
+        self.assertIs(serviceutil.build_full_traversal(), serviceutil.build_full_traversal())
+        self.assertEqual(len(serviceutil.build_full_traversal()), 10)
+
+    def test_should_only_walk_vm_branch_for_vms(self):
+        specs = dict((spec.name, spec)
+                     for spec in serviceutil.build_traversal([vim.VirtualMachine]))
+
+        self.assertNotIn('dcToHf', specs)
+        self.assertEqual(sorted(spec.name for spec in specs['visitFolders'].selectSet),
+                         ['crToRp', 'dcToVmf', 'rpToRp', 'rpToVm', 'visitFolders'])
+
+    def test_should_reach_vms_in_nested_vapps(self):
+        root, datacenter, vm_folder = (vim.Folder('group-d1'), vim.Datacenter('datacenter-1'),
+                                       vim.Folder('group-v1'))
+        vapp, nested_vapp = vim.VirtualApp('resgroup-v1'), vim.VirtualApp('resgroup-v2')
+        vm, nested_vm = vim.VirtualMachine('vm-1'), vim.VirtualMachine('vm-2')
+        inventory = {
+            root: {'childEntity': [datacenter]},
+            datacenter: {'vmFolder': [vm_folder]},
+            vm_folder: {'childEntity': [vapp]},
+            vapp: {'vm': [vm], 'resourcePool': [nested_vapp]},
+            nested_vapp: {'vm': [nested_vm]},
+        }
+
+        reached = _walk(root, inventory, serviceutil.build_traversal([vim.VirtualMachine]))
+
+        self.assertIn(vm, reached)
+        self.assertIn(nested_vm, reached)
+
+    def test_should_reach_vms_from_a_host_folder(self):
+        host_folder, cluster = vim.Folder('group-h4'), vim.ClusterComputeResource('domain-c7')
+        pool, child_pool = vim.ResourcePool('resgroup-8'), vim.ResourcePool('resgroup-9')
+        vm, child_vm = vim.VirtualMachine('vm-1'), vim.VirtualMachine('vm-2')
+        inventory = {
+            host_folder: {'childEntity': [cluster]},
+            cluster: {'resourcePool': [pool]},
+            pool: {'vm': [vm], 'resourcePool': [child_pool]},
+            child_pool: {'vm': [child_vm]},
+        }
+
+        for traversal in (serviceutil.build_traversal([vim.VirtualMachine]),
+                          serviceutil.build_full_traversal()):
+            reached = _walk(host_folder, inventory, traversal)
+            self.assertIn(vm, reached)
+            self.assertIn(child_vm, reached)
+
+    def test_should_combine_branches_for_several_types(self):
+        names = [spec.name for spec in
+                 serviceutil.build_traversal([vim.ClusterComputeResource, vim.Datastore])]
+
+        self.assertEqual(names, ['visitFolders', 'dcToHf', 'dcToDs'])
+
+    def test_should_fall_back_to_full_traversal_for_other_types(self):
+        self.assertIs(serviceutil.build_traversal([vim.Folder]),
+                      serviceutil.build_full_traversal())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Measures how long each sample takes to import its modules and parse the
+command line, by timing `<sample> --help` in a fresh interpreter.
+
+Not a unit test: run it by hand, or in CI with a baseline to catch startup
+regressions, e.g.
+
+    python samples/tests/startup_benchmark.py --save baseline.json
+    python samples/tests/startup_benchmark.py --baseline baseline.json --tolerance 0.25
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+SAMPLES_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_startup(sample, repeat, timeout):
+    """
+    Best wall clock time in seconds of `sample --help` over 'repeat' runs,
+    or None if it failed
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            result = subprocess.run([sys.executable, sample, '--help'], cwd=SAMPLES_DIR,
+                                    stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.DEVNULL, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return None
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            return None
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('samples', nargs='*',
+                        help='Samples to time, all of samples/*.py by default')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per sample, the best one counts')
+    parser.add_argument('--timeout', type=float, default=30,
+                        help='Seconds after which a sample counts as failed')
+    parser.add_argument('--save', help='Write the timings as JSON to this file')
+    parser.add_argument('--baseline', help='JSON timings to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline, as a fraction')
+    args = parser.parse_args()
+
+    samples = args.samples or sorted(glob.glob(os.path.join(SAMPLES_DIR, '*.py')))
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    timings = {}
+    regressions = []
+    for sample in samples:
+        name = os.path.basename(sample)
+        seconds = time_startup(os.path.abspath(sample), args.repeat, args.timeout)
+        timings[name] = seconds
+        line = '%-45s %s' % (name, 'failed' if seconds is None else '%6.3fs' % seconds)
+        before = baseline.get(name)
+        if seconds is not None and before:
+            line += '  (baseline %6.3fs, %+.0f%%)' % (before, (seconds / before - 1) * 100)
+            if seconds > before * (1 + args.tolerance):
+                regressions.append(name)
+                line += '  SLOWER'
+        print(line)
+
+    measured = [seconds for seconds in timings.values() if seconds is not None]
+    if measured:
+        print('\n%d samples, total %.2fs, median %.3fs, %d failed' % (
+            len(timings), sum(measured), sorted(measured)[len(measured) // 2],
+            len(timings) - len(measured)))
+
+    if args.save:
+        with open(args.save, 'w') as save_file:
+            json.dump(timings, save_file, indent=2, sort_keys=True)
+
+    if regressions:
+        print('Startup got slower for: ' + ', '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
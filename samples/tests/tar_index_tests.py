@@ -0,0 +1,62 @@
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+from unittest import TestCase
+from mock import Mock, patch
+
+from samples.tools import tar_index
+
+
+def make_tar(members):
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode='w') as archive:
+        for name, content in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    data.seek(0)
+    return data
+
+
+class TarIndexTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.cache_path = os.path.join(directory, 'cache', 'tar-index.json')
+        self.ova = make_tar([('vm.ovf', b'<ovf/>'), ('disk.vmdk', b'x' * 1000)])
+
+    def test_should_index_member_offsets(self):
+        index = tar_index.build_index(self.ova)
+
+        offset, size = index['disk.vmdk']
+        self.ova.seek(offset)
+        self.assertEqual(self.ova.read(size), b'x' * 1000)
+        self.assertEqual(sorted(index), ['disk.vmdk', 'vm.ovf'])
+
+    def test_should_reuse_cached_index_without_reading_headers(self):
+        built = tar_index.load_index(self.ova, 'url "etag-1"', self.cache_path)
+
+        unreadable = Mock(side_effect=AssertionError('headers were read'))
+        cached = tar_index.load_index(Mock(read=unreadable, seek=unreadable),
+                                      'url "etag-1"', self.cache_path)
+
+        self.assertEqual(cached, built)
+
+    def test_should_rebuild_for_new_key(self):
+        tar_index.load_index(self.ova, 'url "etag-1"', self.cache_path)
+        changed = make_tar([('other.ovf', b'<ovf/>')])
+
+        index = tar_index.load_index(changed, 'url "etag-2"', self.cache_path)
+
+        self.assertEqual(list(index), ['other.ovf'])
+
+    @patch.object(tar_index, 'MAX_CACHED_INDEXES', 2)
+    def test_should_drop_oldest_indexes(self):
+        for key in ('a', 'b', 'c'):
+            self.ova.seek(0)
+            tar_index.load_index(self.ova, key, self.cache_path)
+
+        self.assertEqual(sorted(tar_index._load_indexes(self.cache_path)), ['b', 'c'])
@@ -0,0 +1,157 @@
+import queue
+import time
+from unittest import TestCase
+from mock import Mock
+
+from pyVmomi import vim, vmodl
+
+from samples.tools import tasks
+
+
+def _update(task, version='1', **props):
+    changes = []
+    for name, val in props.items():
+        change = Mock()
+        change.name = 'info.' + name
+        change.val = val
+        changes.append(change)
+    obj_set = Mock()
+    obj_set.obj = task
+    obj_set.changeSet = changes
+    filter_set = Mock()
+    filter_set.objectSet = [obj_set]
+    update = Mock()
+    update.filterSet = [filter_set]
+    update.version = version
+    return update
+
+
+class WaitForTasksResultsTests(TestCase):
+
+    def setUp(self):
+        self.si = Mock()
+        self.collector = self.si.content.propertyCollector.CreatePropertyCollector.return_value
+        self.tasks = [vim.Task('task-1'), vim.Task('task-2')]
+
+    def test_should_report_every_outcome_without_failing_fast(self):
+        error = vim.fault.NoDiskSpace()
+        self.collector.WaitForUpdatesEx.side_effect = [
+            _update(self.tasks[0], '1', state='error', error=error),
+            None,
+            _update(self.tasks[1], '2', state='running'),
+            _update(self.tasks[1], '3', state='success', result='vm-9'),
+        ]
+
+        outcomes = tasks.wait_for_tasks_results(self.si, self.tasks)
+
+        self.assertEqual(outcomes['task-1'].state, 'error')
+        self.assertIs(outcomes['task-1'].error, error)
+        self.assertEqual(outcomes['task-2'].result, 'vm-9')
+        self.assertEqual([call[0][0] for call in self.collector.WaitForUpdatesEx.call_args_list],
+                         ['', '1', '1', '2'])
+        filter_spec = self.collector.CreateFilter.call_args[0][0]
+        self.assertEqual(sorted(filter_spec.propSet[0].pathSet),
+                         ['info.error', 'info.result', 'info.state'])
+        self.collector.DestroyPropertyCollector.assert_called_once_with()
+
+    def test_should_return_last_state_on_timeout(self):
+        updates = [_update(self.tasks[0], '1', state='success')]
+
+        def wait_for_updates(version, options):
+            self.assertGreaterEqual(options.maxWaitSeconds, 1)
+            if updates:
+                return updates.pop()
+            time.sleep(0.02)
+            return None
+        self.collector.WaitForUpdatesEx.side_effect = wait_for_updates
+
+        outcomes = tasks.wait_for_tasks_results(self.si, self.tasks, timeout=0.01)
+
+        self.assertEqual(outcomes['task-1'].state, 'success')
+        self.assertIsNone(outcomes['task-2'].state)
+
+
+class TaskMonitorTests(TestCase):
+
+    def setUp(self):
+        self.si = Mock()
+        self.collector = self.si.content.propertyCollector.CreatePropertyCollector.return_value
+        self.list_view = Mock(spec=vim.view.ListView('session[1]view-1'))
+        # ModifyListView returns the objects it could not add
+        self.list_view.ModifyListView.return_value = []
+        self.si.content.viewManager.CreateListView.return_value = self.list_view
+        self.updates = queue.Queue()
+
+        def wait_for_updates(version, options):
+            update = self.updates.get(timeout=5)
+            if isinstance(update, Exception):
+                raise update
+            return update
+        self.collector.WaitForUpdatesEx.side_effect = wait_for_updates
+        self.collector.CancelWaitForUpdates.side_effect = \
+            lambda: self.updates.put(vmodl.fault.RequestCanceled())
+        self.monitor = tasks.TaskMonitor(self.si)
+        self.addCleanup(self.monitor.stop)
+
+    def test_should_settle_futures_from_one_list_view_filter(self):
+        task, failing = vim.Task('task-1'), vim.Task('task-2')
+        progress = []
+        future = self.monitor.watch(task, on_progress=lambda t, p: progress.append((t, p)))
+        failed = self.monitor.watch(failing)
+
+        error = vim.fault.NoDiskSpace()
+        self.updates.put(_update(task, '1', state='running', progress=40))
+        self.updates.put(_update(failing, '2', state='error', error=error))
+        self.updates.put(_update(task, '3', state='success', result='vm-9', progress=None))
+
+        self.assertEqual(future.result(timeout=5), 'vm-9')
+        self.assertIs(failed.exception(timeout=5), error)
+        self.assertEqual(progress, [(task, 40)])
+        self.si.content.propertyCollector.CreatePropertyCollector.assert_called_once_with()
+        self.assertEqual(self.collector.CreateFilter.call_count, 1)
+        filter_spec = self.collector.CreateFilter.call_args[0][0]
+        self.assertIs(filter_spec.objectSet[0].obj, self.list_view)
+        added = [call[1]['add'] for call in self.list_view.ModifyListView.call_args_list
+                 if 'add' in call[1]]
+        removed = [call[1]['remove'] for call in self.list_view.ModifyListView.call_args_list
+                   if 'remove' in call[1]]
+        self.assertEqual(added, [[task], [failing]])
+        self.assertEqual(removed, [[failing], [task]])
+
+    def test_should_report_queued_and_running_states(self):
+        task = vim.Task('task-1')
+        states = []
+        future = self.monitor.watch(task, on_state=lambda t, state: states.append(state))
+
+        self.updates.put(_update(task, '1', state='queued'))
+        self.updates.put(_update(task, '2', progress=10))
+        self.updates.put(_update(task, '3', state='running'))
+        self.updates.put(_update(task, '4', state='success', result=None))
+
+        future.result(timeout=5)
+        self.assertEqual(states, ['queued', 'running'])
+
+    def test_should_fail_task_the_view_could_not_add(self):
+        expired = vim.Task('task-1')
+        self.list_view.ModifyListView.return_value = [expired]
+        completed = []
+
+        future = self.monitor.watch(expired, on_complete=completed.append)
+
+        self.assertIsInstance(future.exception(timeout=0), vmodl.fault.ManagedObjectNotFound)
+        self.assertEqual(completed, [future])
+        self.assertEqual(self.monitor._watched, {})
+
+    def test_should_fail_pending_tasks_on_stop(self):
+        future = self.monitor.watch(vim.Task('task-1'))
+
+        self.monitor.stop()
+
+        self.assertIsInstance(future.exception(timeout=5), RuntimeError)
+        self.collector.DestroyPropertyCollector.assert_called_once_with()
+        self.list_view.DestroyView.assert_called_once_with()
+
+    def test_should_share_one_monitor_per_connection(self):
+        si = Mock()
+        self.assertIs(tasks.get_task_monitor(si), tasks.get_task_monitor(si))
+        self.assertIsNot(tasks.get_task_monitor(si), tasks.get_task_monitor(Mock()))
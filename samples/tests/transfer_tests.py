@@ -0,0 +1,47 @@
+import ssl
+from unittest import TestCase
+from mock import Mock
+
+from samples.tools import transfer
+
+
+def _si(host='vcenter:443', context=None):
+    si = Mock()
+    si._stub.host = host
+    si._stub.cookie = 'vmware_soap_session="52ab"; Path=/; HttpOnly; Secure;'
+    si._stub.schemeArgs = {'context': context} if context else {}
+    return si
+
+
+class TransferSessionTests(TestCase):
+
+    def test_should_send_session_cookie_to_connection_host_only(self):
+        transfer_session = transfer.TransferSession(_si())
+        transfer_session.session = Mock()
+
+        transfer_session.put(transfer_session.url('/folder/a.iso'), data=b'')
+        transfer_session.put('https://esx-01/guestFile?id=1', data=b'')
+
+        calls = transfer_session.session.request.call_args_list
+        self.assertEqual(calls[0][0], ('PUT', 'https://vcenter:443/folder/a.iso'))
+        self.assertEqual(calls[0][1]['cookies'], {'vmware_soap_session': '"52ab"'})
+        self.assertNotIn('cookies', calls[1][1])
+
+    def test_should_match_connection_host_case_insensitively(self):
+        transfer_session = transfer.TransferSession(_si(host='VCenter.Example.com:443'))
+        transfer_session.session = Mock()
+
+        transfer_session.get(transfer_session.url('/folder/a.iso'))
+        transfer_session.get('https://vcenter.EXAMPLE.com/folder/b.iso')
+
+        for call in transfer_session.session.request.call_args_list:
+            self.assertEqual(call[1]['cookies'], {'vmware_soap_session': '"52ab"'})
+
+    def test_should_follow_certificate_verification_of_connection(self):
+        self.assertTrue(transfer.TransferSession(_si()).session.verify)
+        unverified = transfer.TransferSession(_si(context=ssl._create_unverified_context()))
+        self.assertFalse(unverified.session.verify)
+
+    def test_should_share_one_session_per_connection(self):
+        si = _si()
+        self.assertIs(transfer.get_transfer_session(si), transfer.get_transfer_session(si))
@@ -0,0 +1,83 @@
+from unittest import TestCase
+from mock import Mock
+
+from pyVmomi import vim, vmodl
+
+from samples.tools.updateloop import ResilientUpdateLoop
+
+
+def _update(version, truncated=False):
+    update = Mock()
+    update.version = version
+    update.truncated = truncated
+    update.filterSet = []
+    return update
+
+
+def _session():
+    si = Mock()
+    si.content.propertyCollector.CreatePropertyCollector.return_value = Mock()
+    return si
+
+
+class ResilientUpdateLoopTests(TestCase):
+
+    def setUp(self):
+        self.si = _session()
+        self.collector = self.si.content.propertyCollector.CreatePropertyCollector.return_value
+        self.new_si = _session()
+        self.new_collector = \
+            self.new_si.content.propertyCollector.CreatePropertyCollector.return_value
+        self.loop = ResilientUpdateLoop(self.si, [(vim.VirtualMachine, ['name'])],
+                                        relogin=lambda: self.new_si,
+                                        container=vim.Folder('group-d1'), retry_delay=0)
+
+    def _take(self, count):
+        events = []
+        for event in self.loop:
+            events.append(event)
+            if len(events) == count:
+                break
+        return events
+
+    def test_should_resume_from_last_version_after_connection_error(self):
+        self.collector.WaitForUpdatesEx.side_effect = [
+            _update('1', truncated=True), _update('2'), ConnectionResetError(), _update('3')]
+
+        events = self._take(3)
+
+        self.assertEqual([event.resync for event in events], [True, True, False])
+        self.assertEqual([call[0][0] for call in self.collector.WaitForUpdatesEx.call_args_list],
+                         ['', '1', '2', '2'])
+        self.assertEqual(self.loop.resyncs, 1)
+        self.assertEqual(self.loop.relogins, 0)
+
+    def test_should_log_in_again_and_report_full_resync(self):
+        self.collector.WaitForUpdatesEx.side_effect = [
+            _update('1'), _update('2'), vim.fault.NotAuthenticated()]
+        self.new_collector.WaitForUpdatesEx.side_effect = [_update('1')]
+
+        events = self._take(3)
+
+        self.assertEqual([event.resync for event in events], [True, False, True])
+        self.assertIs(self.loop.si, self.new_si)
+        self.assertEqual(self.new_collector.WaitForUpdatesEx.call_args[0][0], '')
+        self.assertEqual(self.loop.resyncs, 2)
+        self.new_collector.DestroyPropertyCollector.assert_called_once_with()
+
+    def test_should_recreate_filter_on_invalid_collector_version(self):
+        self.collector.WaitForUpdatesEx.side_effect = [
+            _update('1'), vmodl.query.InvalidCollectorVersion(), _update('1')]
+
+        events = self._take(2)
+
+        self.assertEqual([event.resync for event in events], [True, True])
+        self.assertEqual(self.loop.relogins, 0)
+        self.assertEqual(self.collector.CreateFilter.call_count, 2)
+
+    def test_should_raise_without_relogin(self):
+        loop = ResilientUpdateLoop(self.si, [(vim.VirtualMachine, ['name'])],
+                                   container=vim.Folder('group-d1'))
+        self.collector.WaitForUpdatesEx.side_effect = [vim.fault.NotAuthenticated()]
+
+        self.assertRaises(vim.fault.NotAuthenticated, list, loop)
@@ -12,3 +12,33 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+
+"""
+Helper modules for the samples.
+
+Submodules are imported lazily: `from tools import cli, service_instance`
+only loads a module once one of its attributes is used, so parsing the
+command line, or printing --help, does not wait for pyVmomi, requests and
+friends to be imported.
+"""
+import importlib.util
+import sys
+import threading
+
+_lazy_lock = threading.Lock()
+
+
+def __getattr__(name):
+    with _lazy_lock:
+        if name in globals():
+            return globals()[name]
+        fullname = __name__ + '.' + name
+        spec = None if name.startswith('_') else importlib.util.find_spec(fullname)
+        if spec is None:
+            raise AttributeError('module %r has no attribute %r' % (__name__, name))
+        spec.loader = importlib.util.LazyLoader(spec.loader)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[fullname] = module
+        spec.loader.exec_module(module)
+        globals()[name] = module
+        return module
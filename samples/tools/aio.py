@@ -0,0 +1,195 @@
+# VMware vSphere Python SDK Community Samples Addons
+# Copyright (c) 2014-2021 VMware, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module implements an asyncio facade for waiting on tasks and property
+changes
+"""
+import asyncio
+import threading
+
+from pyVmomi import vmodl
+
+from . import tasks
+
+__author__ = "VMware, Inc."
+
+
+class AsyncUpdateLoop:
+    """
+    Hands vSphere updates to an asyncio event loop, so one session can drive
+    thousands of concurrent operations without blocking the event loop.
+
+    Property changes come from a WaitForUpdatesEx loop on a dedicated thread,
+    over a PropertyCollector of its own. Tasks are awaited through the shared
+    tasks.TaskMonitor of the connection, which follows all of them with one
+    filter from its own thread; adding each task to it is a blocking
+    ModifyListView call, made in the default executor. If the update thread
+    fails, the error is kept in `error` and raised by every later changes().
+
+    Example:
+        async with AsyncUpdateLoop(si) as updates:
+            tasks = [vm.PowerOnVM_Task() for vm in vms]
+            results = await asyncio.gather(*(updates.wait_for_task(t) for t in tasks),
+                                           return_exceptions=True)
+            async for object_set in updates.changes(filter_spec):
+                print(object_set.obj, [(c.name, c.val) for c in object_set.changeSet])
+    """
+
+    def __init__(self, si, max_wait_seconds=30):
+        self._si = si
+        self._max_wait_seconds = max_wait_seconds
+        self._loop = None
+        self._collector = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._handlers = {}
+        # updates that arrived before CreateFilter returned to the caller
+        self._unclaimed = {}
+        # ids of filters destroyed, whose late updates are dropped
+        self._destroyed = set()
+        self._lock = threading.Lock()
+        self.error = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def start(self):
+        """
+        Create the dedicated PropertyCollector and start the update thread
+        """
+        self._loop = asyncio.get_running_loop()
+        self._collector = await self._loop.run_in_executor(
+            None, self._si.content.propertyCollector.CreatePropertyCollector)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='async-update-loop')
+        self._thread.daemon = True
+        self._thread.start()
+
+    async def stop(self):
+        """
+        Stop the update thread and destroy the PropertyCollector, which also
+        destroys every filter still registered
+        """
+        self._stopping.set()
+        await self._loop.run_in_executor(None, self._shutdown)
+        with self._lock:
+            handlers = list(self._handlers.values())
+            self._handlers.clear()
+        for handler in handlers:
+            handler(None, RuntimeError('update loop stopped'))
+
+    def _shutdown(self):
+        if self._thread.is_alive():
+            self._collector.CancelWaitForUpdates()
+        self._thread.join()
+        try:
+            self._collector.DestroyPropertyCollector()
+        except Exception:
+            # the collector may have gone with the session that failed
+            if self.error is None:
+                raise
+
+    def _run(self):
+        wait_options = vmodl.query.PropertyCollector.WaitOptions(
+            maxWaitSeconds=self._max_wait_seconds)
+        version = ''
+        while not self._stopping.is_set():
+            try:
+                update = self._collector.WaitForUpdatesEx(version, wait_options)
+            except Exception as ex:
+                if not self._stopping.is_set():
+                    self._fail_all(ex)
+                return
+            if update is None:
+                continue
+            version = update.version
+            for filter_set in update.filterSet:
+                filter_id = filter_set.filter._moId
+                with self._lock:
+                    if filter_id in self._destroyed:
+                        continue
+                    handler = self._handlers.get(filter_id)
+                    if handler is None:
+                        self._unclaimed.setdefault(filter_id, []).extend(
+                            filter_set.objectSet)
+                        continue
+                for object_set in filter_set.objectSet:
+                    self._loop.call_soon_threadsafe(handler, object_set, None)
+
+    def _fail_all(self, error):
+        with self._lock:
+            # nothing resolves handlers registered after this
+            self.error = error
+            handlers = list(self._handlers.values())
+            self._handlers.clear()
+        for handler in handlers:
+            self._loop.call_soon_threadsafe(handler, None, error)
+
+    async def _create_filter(self, filter_spec, handler):
+        if self.error is not None:
+            raise self.error
+        pc_filter = await self._loop.run_in_executor(
+            None, self._collector.CreateFilter, filter_spec, True)
+        with self._lock:
+            if self.error is not None:
+                raise self.error
+            self._handlers[pc_filter._moId] = handler
+            unclaimed = self._unclaimed.pop(pc_filter._moId, [])
+        for object_set in unclaimed:
+            handler(object_set, None)
+        return pc_filter
+
+    async def _destroy_filter(self, pc_filter):
+        with self._lock:
+            self._destroyed.add(pc_filter._moId)
+            self._unclaimed.pop(pc_filter._moId, None)
+            if self._handlers.pop(pc_filter._moId, None) is None:
+                return
+        await self._loop.run_in_executor(None, pc_filter.Destroy)
+
+    async def wait_for_task(self, task):
+        """
+        Wait for a vim.Task and return its result, or raise its error
+        """
+        monitor = tasks.get_task_monitor(self._si)
+        # watching adds the task to the monitor's view, a blocking call
+        future = await self._loop.run_in_executor(None, monitor.watch, task)
+        return await asyncio.wrap_future(future)
+
+    async def changes(self, filter_spec):
+        """
+        Asynchronously iterate over the object sets (enter/modify/leave with
+        their changeSet) reported for 'filter_spec'. The filter is destroyed
+        when the iteration stops.
+        """
+        queue = asyncio.Queue()
+
+        def on_update(object_set, error):
+            queue.put_nowait((object_set, error))
+
+        pc_filter = await self._create_filter(filter_spec, on_update)
+        try:
+            while True:
+                object_set, error = await queue.get()
+                if error is not None:
+                    raise error
+                yield object_set
+        finally:
+            await self._destroy_filter(pc_filter)
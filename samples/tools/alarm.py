@@ -12,7 +12,9 @@ from xml.etree.ElementTree import Element
 from xml.etree.ElementTree import SubElement
 from xml.etree.ElementTree import tostring
 
-import requests
+from pyVmomi import vim
+
+from . import transfer
 
 
 def reset_alarm(**kwargs):
@@ -111,8 +113,10 @@ def _send_request(payload=None, session=None):
     logging.debug("Sending %s to %s", payload, url)
     # I opted to ignore invalid ssl here because that happens in pyvmomi.
     # Once pyvmomi validates ssl it wont take much to make it happen here.
-    res = requests.post(url=url, data=payload, headers={
-        'Cookie': stub.cookie,
+    # the transfer session adds the session cookie and reuses its connection
+    transfer_session = transfer.get_transfer_session(
+        vim.ServiceInstance('ServiceInstance', stub))
+    res = transfer_session.post(url=url, data=payload, headers={
         'SOAPAction': 'urn:vim25',
         'Content-Type': 'application/xml'
     }, verify=False)
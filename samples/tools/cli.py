@@ -74,6 +74,16 @@ class Parser:
                                                action='store_true',
                                                help='Disable ssl host certificate verification')
 
+        self._standard_args_group.add_argument('--session-cache',
+                                               required=False,
+                                               nargs='?',
+                                               const=True,
+                                               metavar='FILE',
+                                               help='Reuse the session of an earlier run, cached '
+                                                    'in FILE (default ~/.cache/'
+                                                    'pyvmomi-community-samples/sessions.json), '
+                                                    'instead of logging in every time')
+
     def get_args(self):
         """
         Supports the command-line arguments needed to form a connection to vSphere.
@@ -122,9 +132,10 @@ class Parser:
 
     def _prompt_for_password(self, args):
         """
-        if no password is specified on the command line, prompt for it
+        if no password is specified on the command line, prompt for it,
+        unless a cached session may make it unnecessary
         """
-        if not args.password:
+        if not args.password and not args.session_cache:
             args.password = getpass.getpass(
                 prompt='"--password" not provided! Please enter password for host %s and user %s: '
                        % (args.host, args.user))
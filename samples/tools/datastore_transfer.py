@@ -0,0 +1,445 @@
+# VMware vSphere Python SDK Community Samples Addons
+# Copyright (c) 2014-2021 VMware, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module implements parallel file transfers to and from datastores
+through the /folder HTTP interface
+"""
+import collections
+import concurrent.futures
+import json
+import os
+import posixpath
+import threading
+import time
+
+import requests
+from pyVmomi import vim
+
+from . import transfer
+
+__author__ = "VMware, Inc."
+
+# Outcome of one file transfer. 'seconds' covers the successful attempt only.
+TransferResult = collections.namedtuple('TransferResult', ['local_path', 'remote_path', 'size',
+                                                           'seconds', 'attempts', 'error'])
+
+
+class TransferFailed(Exception):
+    """
+    Raised for an HTTP error status from the datastore
+    """
+
+    def __init__(self, status_code, reason):
+        super().__init__('HTTP %s %s' % (status_code, reason))
+        self.status_code = status_code
+
+
+class _RangesIgnored(Exception):
+    """
+    Raised when the datastore answers a Range request with the whole file
+    """
+
+
+def _is_transient(error):
+    """
+    True for failures worth another attempt: connection problems and
+    server side errors
+    """
+    if isinstance(error, TransferFailed):
+        return error.status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, IOError))
+
+
+def folder_path(remote_path):
+    """
+    The /folder URL path of a path relative to the datastore root
+    """
+    return '/folder/' + remote_path.lstrip('/')
+
+
+class _DatastoreTransfer:
+    """
+    Session, query parameters and aggregate statistics shared by uploads
+    and downloads
+    """
+
+    def __init__(self, si, datacenter, datastore_name, max_workers, retries, retry_delay,
+                 on_progress, transfer_session):
+        self._si = si
+        self._datacenter = datacenter
+        self._datastore_name = datastore_name
+        self._max_workers = max_workers
+        self._retries = retries
+        self._retry_delay = retry_delay
+        self._on_progress = on_progress
+        self._transfer_session = transfer_session or transfer.get_transfer_session(
+            si, pool_size=max(max_workers, transfer.DEFAULT_POOL_SIZE))
+        self._params = {'dsName': datastore_name, 'dcPath': datacenter.name}
+        self._lock = threading.Lock()
+        self._started = None
+        self.bytes_transferred = 0
+
+    @property
+    def elapsed(self):
+        return time.time() - self._started if self._started is not None else 0
+
+    @property
+    def throughput(self):
+        """
+        Aggregate bytes per second since the first transfer started
+        """
+        elapsed = self.elapsed
+        return self.bytes_transferred / elapsed if elapsed else 0
+
+    def _start(self):
+        if self._started is None:
+            self._started = time.time()
+
+    def _url(self, remote_path):
+        return self._transfer_session.url(folder_path(remote_path))
+
+    def _transferred(self, remote_path, count, size):
+        with self._lock:
+            self.bytes_transferred += count
+        if self._on_progress is not None and count > 0:
+            self._on_progress(remote_path, count, size)
+
+
+class DatastoreUploader(_DatastoreTransfer):
+    """
+    Streams local files to one datastore, `max_workers` files at a time,
+    each over its own keep-alive connection of the shared TransferSession.
+    Files that fail with a connection or server error are retried up to
+    `retries` times.
+
+    Per file throughput is in each TransferResult; `bytes_transferred`,
+    `elapsed` and `throughput` cover everything uploaded so far, and
+    `on_progress(remote_path, sent, size)` is called as data goes out.
+
+    Example:
+        uploader = DatastoreUploader(si, datacenter, 'datastore1', max_workers=8)
+        for result in uploader.upload_tree('/srv/isos', 'iso'):
+            print(result.remote_path, result.error or 'ok')
+        print('%.1f MB/s' % (uploader.throughput / 2 ** 20))
+    """
+
+    def __init__(self, si, datacenter, datastore_name, max_workers=4, retries=2,
+                 retry_delay=2, on_progress=None, transfer_session=None):
+        super().__init__(si, datacenter, datastore_name, max_workers, retries, retry_delay,
+                         on_progress, transfer_session)
+
+    def upload(self, files):
+        """
+        Upload (local path, remote path) pairs, remote paths being relative
+        to the datastore root, and yield a TransferResult per file as the
+        uploads complete
+        """
+        self._start()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            futures = [executor.submit(self.upload_file, local_path, remote_path)
+                       for local_path, remote_path in files]
+            for future in concurrent.futures.as_completed(futures):
+                yield future.result()
+
+    def upload_tree(self, local_dir, remote_dir):
+        """
+        Upload every file below 'local_dir' to the same relative paths below
+        'remote_dir', creating the remote directories first
+        """
+        files = []
+        directories = set([remote_dir.strip('/')])
+        for root, _, names in os.walk(local_dir):
+            relative = os.path.relpath(root, local_dir)
+            remote_root = remote_dir.strip('/') if relative == '.' else posixpath.join(
+                remote_dir.strip('/'), *relative.split(os.sep))
+            directories.add(remote_root)
+            for name in sorted(names):
+                files.append((os.path.join(root, name), posixpath.join(remote_root, name)))
+        for directory in sorted(directories):
+            self.make_directory(directory)
+        return self.upload(files)
+
+    def make_directory(self, remote_dir):
+        """
+        Create 'remote_dir' and its parents on the datastore, if missing
+        """
+        if not remote_dir:
+            return
+        try:
+            self._si.content.fileManager.MakeDirectory(
+                name='[%s] %s' % (self._datastore_name, remote_dir),
+                datacenter=self._datacenter, createParentDirectories=True)
+        except vim.fault.FileAlreadyExists:
+            pass
+
+    def upload_file(self, local_path, remote_path):
+        """
+        Upload one file, with retries, and return its TransferResult
+        """
+        self._start()
+        size = os.path.getsize(local_path)
+        attempts = 0
+        while True:
+            attempts += 1
+            start = time.time()
+            try:
+                self._put(local_path, remote_path, size)
+            except Exception as error:
+                if attempts > self._retries or not _is_transient(error):
+                    return TransferResult(local_path, remote_path, size, None, attempts, error)
+                time.sleep(self._retry_delay)
+                continue
+            return TransferResult(local_path, remote_path, size, time.time() - start,
+                                  attempts, None)
+
+    def _put(self, local_path, remote_path, size):
+        with open(local_path, 'rb') as file_data:
+            body = _CountingReader(file_data, size,
+                                   lambda count: self._transferred(remote_path, count, size))
+            try:
+                response = self._transfer_session.put(
+                    self._url(remote_path), params=self._params, data=body,
+                    headers={'Content-Type': 'application/octet-stream'})
+                if not response.ok:
+                    raise TransferFailed(response.status_code, response.reason)
+            except Exception:
+                # a retry sends the whole file again
+                self._transferred(remote_path, -body.count, size)
+                raise
+
+
+class DatastoreDownloader(_DatastoreTransfer):
+    """
+    Downloads a datastore file as `max_workers` byte ranges at once, each
+    written at its offset into a preallocated local file. Over links with
+    high latency one stream rarely fills the bandwidth, several do.
+
+    Progress is kept in a manifest next to the local file ('<file>.part.json')
+    and a download that is started again for the same file continues where
+    it stopped, as long as the remote file did not change. A range that fails
+    with a connection or server error is retried from where it broke off,
+    up to `retries` times in a row. If ranges turn out not to be supported
+    the file is downloaded as one stream instead.
+
+    Example:
+        downloader = DatastoreDownloader(si, datacenter, 'datastore1', max_workers=8)
+        result = downloader.download_file('vm/vm-flat.vmdk', '/backup/vm-flat.vmdk')
+    """
+
+    # Ranges smaller than this are not worth a connection of their own
+    MIN_SEGMENT_SIZE = 8 * 2 ** 20
+    CHUNK_SIZE = 2 ** 20
+    # Seconds between manifest writes
+    SAVE_INTERVAL = 2
+
+    def __init__(self, si, datacenter, datastore_name, max_workers=4, retries=3,
+                 retry_delay=2, on_progress=None, transfer_session=None):
+        super().__init__(si, datacenter, datastore_name, max_workers, retries, retry_delay,
+                         on_progress, transfer_session)
+
+    def download_file(self, remote_path, local_path):
+        """
+        Download one file, resuming an earlier attempt, and return its
+        TransferResult
+        """
+        self._start()
+        start = time.time()
+        try:
+            size, error, attempts = self._download(remote_path, local_path)
+        except Exception as error:
+            return TransferResult(local_path, remote_path, None, None, 1, error)
+        seconds = time.time() - start if error is None else None
+        return TransferResult(local_path, remote_path, size, seconds, attempts, error)
+
+    def _download(self, remote_path, local_path):
+        response = self._transfer_session.request('HEAD', self._url(remote_path),
+                                                  params=self._params)
+        if not response.ok:
+            raise TransferFailed(response.status_code, response.reason)
+        size = int(response.headers['Content-Length'])
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        ranged = response.headers.get('Accept-Ranges', 'bytes') == 'bytes'
+
+        manifest = _Manifest(local_path + '.part.json')
+        if not (ranged and manifest.load(size, validator) and os.path.exists(local_path)):
+            manifest.plan(size, validator, self._max_workers if ranged else 1,
+                          self.MIN_SEGMENT_SIZE)
+            with open(local_path, 'wb') as local_file:
+                local_file.truncate(size)
+
+        outcomes = self._fetch_segments(remote_path, local_path, manifest, size, ranged)
+        if ranged and any(isinstance(error, _RangesIgnored) for error, _ in outcomes):
+            # the whole file came back for a range, start over as one stream
+            self._transferred(remote_path, -sum(segment[2] for segment in manifest.segments),
+                              size)
+            manifest.plan(size, validator, 1, self.MIN_SEGMENT_SIZE)
+            outcomes = self._fetch_segments(remote_path, local_path, manifest, size, False)
+        manifest.save()
+
+        errors = [error for error, _ in outcomes if error is not None]
+        attempts = max([attempt for _, attempt in outcomes] or [1])
+        if errors:
+            # the manifest stays for the next try
+            return size, errors[0], attempts
+        manifest.remove()
+        return size, None, attempts
+
+    def _fetch_segments(self, remote_path, local_path, manifest, size, ranged):
+        """
+        Download the unfinished segments of 'manifest' concurrently and
+        return their (error or None, attempts)
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            futures = [executor.submit(self._fetch_segment, remote_path, local_path, manifest,
+                                       segment, size, ranged)
+                       for segment in manifest.segments if segment[2] < segment[1] - segment[0]]
+            return [future.result() for future in futures]
+
+    def _fetch_segment(self, remote_path, local_path, manifest, segment, size, ranged):
+        """
+        Download one [start, end, done] segment, updating 'done' as data is
+        written, and return (error or None, attempts)
+        """
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                self._fetch_range(remote_path, local_path, manifest, segment, size, ranged)
+                return None, attempts
+            except Exception as error:
+                if attempts > self._retries or not _is_transient(error):
+                    return error, attempts
+                if not ranged:
+                    # without ranges a broken stream starts over
+                    self._transferred(remote_path, -segment[2], size)
+                    segment[2] = 0
+                time.sleep(self._retry_delay)
+
+    def _fetch_range(self, remote_path, local_path, manifest, segment, size, ranged):
+        start, end, done = segment
+        headers = {}
+        if ranged:
+            headers['Range'] = 'bytes=%d-%d' % (start + done, end - 1)
+        response = self._transfer_session.get(self._url(remote_path), params=self._params,
+                                              headers=headers, stream=True)
+        try:
+            if ranged and response.status_code == 200:
+                raise _RangesIgnored()
+            if response.status_code != (206 if ranged else 200):
+                raise TransferFailed(response.status_code, response.reason)
+            with open(local_path, 'r+b') as local_file:
+                local_file.seek(start + done)
+                for chunk in response.iter_content(self.CHUNK_SIZE):
+                    chunk = chunk[:end - start - segment[2]]
+                    local_file.write(chunk)
+                    # the manifest must not claim data still in a buffer
+                    local_file.flush()
+                    segment[2] += len(chunk)
+                    self._transferred(remote_path, len(chunk), size)
+                    manifest.save(self.SAVE_INTERVAL)
+                    if segment[2] >= end - start:
+                        break
+        finally:
+            response.close()
+        if segment[2] < end - start:
+            raise IOError('connection closed after %d of %d bytes'
+                          % (segment[2], end - start))
+
+
+class _Manifest:
+    """
+    Segments of a download, as [start, end, bytes done], and the size and
+    ETag of the remote file they belong to, saved as JSON
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.segments = []
+        self._size = None
+        self._validator = None
+        self._saved = 0
+        self._lock = threading.Lock()
+
+    def plan(self, size, validator, count, min_segment_size):
+        """
+        Split 'size' bytes into at most 'count' segments
+        """
+        count = max(1, min(count, -(-size // min_segment_size)))
+        bounds = [size * index // count for index in range(count + 1)]
+        self.segments = [[bounds[index], bounds[index + 1], 0] for index in range(count)]
+        self._size = size
+        self._validator = validator
+
+    def load(self, size, validator):
+        """
+        Read the saved segments, if they are for a remote file of this size
+        and version
+        """
+        try:
+            with open(self.path) as manifest_file:
+                saved = json.load(manifest_file)
+        except (IOError, ValueError):
+            return False
+        if saved.get('size') != size or saved.get('validator') != validator:
+            return False
+        self.segments = saved['segments']
+        self._size = size
+        self._validator = validator
+        return True
+
+    def save(self, interval=0):
+        """
+        Write the segments, unless they were written less than 'interval'
+        seconds ago
+        """
+        with self._lock:
+            if time.time() - self._saved < interval:
+                return
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w') as manifest_file:
+                json.dump({'size': self._size, 'validator': self._validator,
+                           'segments': self.segments}, manifest_file)
+            os.replace(temp_path, self.path)
+            self._saved = time.time()
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class _CountingReader:
+    """
+    File wrapper reporting how much of it has been read. Having a length
+    makes requests send a Content-Length instead of a chunked body.
+    """
+
+    def __init__(self, fileobj, size, on_read):
+        self._fileobj = fileobj
+        self._size = size
+        self._on_read = on_read
+        self.count = 0
+
+    def __len__(self):
+        return self._size
+
+    def read(self, size=-1):
+        data = self._fileobj.read(size)
+        if data:
+            self.count += len(data)
+            self._on_read(len(data))
+        return data
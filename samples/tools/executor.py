@@ -0,0 +1,225 @@
+# VMware vSphere Python SDK Community Samples Addons
+# Copyright (c) 2014-2021 VMware, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module implements a bounded concurrency executor for bulk operations
+that produce vim tasks
+"""
+import collections
+import queue
+import time
+
+from pyVmomi import vim, vmodl
+
+from . import tasks
+
+__author__ = "VMware, Inc."
+
+# Faults after which an operation is worth submitting again
+TRANSIENT_FAULTS = (
+    vim.fault.TaskInProgress,
+    vim.fault.ConcurrentAccess,
+    vmodl.fault.HostCommunication,
+)
+
+# A task producing callable and the host and datastores it places load on
+Operation = collections.namedtuple('Operation', ['submit', 'host', 'datastores'])
+Operation.__new__.__defaults__ = (None, ())
+
+
+class TaskExecutor:
+    """
+    Runs task producing operations with at most `max_tasks` tasks in flight,
+    and optionally at most `max_per_host` per host and `max_per_datastore`
+    per datastore. A slot is refilled as soon as a task finishes, which the
+    shared TaskMonitor reports from a single PropertyCollector filter.
+
+    Operations are callables returning a vim.Task, or Operation tuples that
+    also name the host and datastores they load. Results come back in
+    submission order as tasks.TaskOutcome tuples; a failed operation yields
+    its error rather than raising, after `retries` further attempts if the
+    fault is transient.
+
+    Example:
+        executor = TaskExecutor(si, max_tasks=8, max_per_host=2)
+        operations = (Operation(partial(vm.PowerOnVM_Task), host=vm.runtime.host)
+                      for vm in vms)
+        for outcome in executor.map(operations):
+            print(outcome.task, outcome.state, outcome.error)
+    """
+
+    def __init__(self, si, max_tasks=8, max_per_host=None, max_per_datastore=None,
+                 retries=2, retry_delay=5, transient_faults=TRANSIENT_FAULTS):
+        self._si = si
+        self._max_tasks = max_tasks
+        self._max_per_host = max_per_host
+        self._max_per_datastore = max_per_datastore
+        self._retries = retries
+        self._retry_delay = retry_delay
+        self._transient_faults = transient_faults
+
+    def map(self, operations):
+        """
+        Run 'operations', an iterable that is consumed lazily, and yield one
+        TaskOutcome per operation in the same order.
+
+        At most 4 * max_tasks operations are read ahead of the oldest one
+        not yet yielded, so memory stays bounded on endless streams.
+        """
+        return _Run(self, iter(operations)).results()
+
+
+class _Entry:
+    """
+    One operation and its attempts
+    """
+    __slots__ = ('index', 'operation', 'attempts', 'not_before')
+
+    def __init__(self, index, operation):
+        if not isinstance(operation, Operation):
+            operation = Operation(operation)
+        self.index = index
+        self.operation = operation
+        self.attempts = 0
+        self.not_before = 0
+
+    @property
+    def keys(self):
+        host = self.operation.host
+        return ([('host', host._moId)] if host is not None else []) + \
+            [('datastore', datastore._moId) for datastore in self.operation.datastores]
+
+
+class _Run:
+    """
+    State of one TaskExecutor.map call
+    """
+
+    def __init__(self, executor, operations):
+        self._executor = executor
+        self._operations = operations
+        self._exhausted = False
+        self._next_index = 0
+        self._next_result = 0
+        self._waiting = []
+        self._results = {}
+        self._in_flight = 0
+        self._load = collections.Counter()
+        self._done = queue.Queue()
+        self._monitor = tasks.get_task_monitor(executor._si)
+
+    def results(self):
+        while True:
+            self._fill()
+            while self._next_result in self._results:
+                yield self._results.pop(self._next_result)
+                self._next_result += 1
+            if self._exhausted and not self._in_flight and not self._waiting:
+                return
+            try:
+                entry, task, future = self._done.get(timeout=self._retry_wait())
+            except queue.Empty:
+                continue
+            self._release(entry)
+            error = future.exception()
+            if error is None:
+                self._finish(entry, tasks.TaskOutcome(task, vim.TaskInfo.State.success,
+                                                      future.result(), None))
+            else:
+                self._failed(entry, task, error)
+
+    def _retry_wait(self):
+        """
+        Seconds until the first retry is due, None to wait for a task
+        """
+        now = time.time()
+        due = [entry.not_before for entry in self._waiting if entry.not_before > now]
+        return min(due) - now if due else None
+
+    def _fill(self):
+        executor = self._executor
+        while self._in_flight < executor._max_tasks:
+            entry = self._next_entry()
+            if entry is None:
+                return
+            self._acquire(entry)
+            entry.attempts += 1
+            try:
+                task = entry.operation.submit()
+            except vmodl.MethodFault as error:
+                self._release(entry)
+                self._failed(entry, None, error)
+                continue
+            try:
+                self._monitor.watch(task, on_complete=lambda future, entry=entry, task=task:
+                                    self._done.put((entry, task, future)))
+            except Exception as error:
+                # the task runs on, but its outcome cannot be followed
+                self._release(entry)
+                self._failed(entry, task, error)
+
+    def _next_entry(self):
+        """
+        Take the oldest due operation that fits its host and datastore
+        limits, reading more operations while the read ahead allows it
+        """
+        now = time.time()
+        for position, entry in enumerate(self._waiting):
+            if entry.not_before <= now and self._fits(entry):
+                return self._waiting.pop(position)
+        window = 4 * self._executor._max_tasks
+        while not self._exhausted and self._next_index - self._next_result < window:
+            try:
+                operation = next(self._operations)
+            except StopIteration:
+                self._exhausted = True
+                break
+            entry = _Entry(self._next_index, operation)
+            self._next_index += 1
+            if self._fits(entry):
+                return entry
+            self._waiting.append(entry)
+        return None
+
+    def _fits(self, entry):
+        for kind, moid in entry.keys:
+            limit = (self._executor._max_per_host if kind == 'host'
+                     else self._executor._max_per_datastore)
+            if limit is not None and self._load[kind, moid] >= limit:
+                return False
+        return True
+
+    def _acquire(self, entry):
+        self._in_flight += 1
+        for key in entry.keys:
+            self._load[key] += 1
+
+    def _release(self, entry):
+        self._in_flight -= 1
+        for key in entry.keys:
+            self._load[key] -= 1
+
+    def _failed(self, entry, task, error):
+        executor = self._executor
+        if isinstance(error, executor._transient_faults) and \
+                entry.attempts <= executor._retries:
+            entry.not_before = time.time() + executor._retry_delay
+            self._waiting.append(entry)
+            self._waiting.sort(key=lambda waiting: waiting.index)
+            return
+        self._finish(entry, tasks.TaskOutcome(task, vim.TaskInfo.State.error, None, error))
+
+    def _finish(self, entry, outcome):
+        self._results[entry.index] = outcome
@@ -0,0 +1,239 @@
+# VMware vSphere Python SDK Community Samples Addons
+# Copyright (c) 2014-2021 VMware, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module implements a locally mirrored inventory that is kept current
+with WaitForUpdatesEx
+"""
+import threading
+
+from . import pchelper
+
+__author__ = "VMware, Inc."
+
+
+class InventoryMirror:
+    """
+    In-memory copy of selected properties of the inventory.
+
+    The initial load and every later change come from WaitForUpdatesEx on a
+    dedicated PropertyCollector, so lookups and scans never go to the server.
+    All public methods are safe to call from any thread.
+
+    If the background thread fails, e.g. because the session expired, the
+    error is kept in `error` and lookups raise RuntimeError instead of
+    returning data that is no longer kept current. start() loads again.
+
+    Example:
+        mirror = InventoryMirror(si, [(vim.VirtualMachine, ['name', 'runtime.powerState'])])
+        mirror.start()
+        for vm, props in mirror.scan(vim.VirtualMachine):
+            print(props['name'], props.get('runtime.powerState'))
+        mirror.stop()
+    """
+
+    def __init__(self, si, propspec, container=None, max_wait_seconds=30,
+                 max_object_updates=pchelper.DEFAULT_PAGE_SIZE):
+        """
+        - `propspec` is a sequence of (managed object type, [property paths]).
+        - `container` is where the inventory traversal starts, the root folder
+          by default.
+        """
+        self._si = si
+        self._propspec = propspec
+        self._container = container or si.content.rootFolder
+        self._wait_options = pchelper.make_wait_options(max_wait_seconds, max_object_updates)
+        self._objects = {}
+        self._lock = threading.RLock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._collector = None
+        self.version = None
+        self.error = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def __len__(self):
+        self._check_current()
+        with self._lock:
+            return len(self._objects)
+
+    def __contains__(self, obj):
+        self._check_current()
+        with self._lock:
+            return obj in self._objects
+
+    @property
+    def loaded(self):
+        return self.version is not None
+
+    def load(self):
+        """
+        Create the filter and apply the initial update sets, which hold every
+        matching object as an 'enter' change. They replace whatever was
+        mirrored before, so objects deleted in the meantime are dropped.
+        The PropertyCollector of an earlier load is destroyed.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError('inventory mirror is running, stop() it before loading')
+        self._destroy_collector()
+        collector = self._si.content.propertyCollector.CreatePropertyCollector()
+        try:
+            pchelper.make_property_collector(collector, self._container, self._propspec,
+                                             destroy_at_exit=False)
+        except Exception:
+            collector.DestroyPropertyCollector()
+            raise
+        self._collector = collector
+        version = ''
+        updates = []
+        while True:
+            update = self._collector.WaitForUpdatesEx(version, self._wait_options)
+            if update is None:
+                break
+            updates.append(update)
+            version = update.version
+            if not update.truncated:
+                break
+        with self._lock:
+            self._objects = {}
+            for update in updates:
+                self.apply(update)
+        self.version = version
+        self.error = None
+
+    def poll(self):
+        """
+        Wait for and apply one update set. Returns it, or None on timeout.
+        """
+        if not self.loaded:
+            self.load()
+        update = self._collector.WaitForUpdatesEx(self.version, self._wait_options)
+        if update is not None:
+            self.apply(update)
+            self.version = update.version
+        return update
+
+    def start(self):
+        """
+        Load the inventory and keep it current from a background thread
+        """
+        if self.error is not None:
+            # load() again, destroying the collector of the failed thread
+            self._thread = None
+            self.version = None
+        if not self.loaded:
+            self.load()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='inventory-mirror')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread and destroy the PropertyCollector
+        """
+        self._stopping.set()
+        if self._collector is not None and self._thread is not None:
+            if self._thread.is_alive():
+                self._collector.CancelWaitForUpdates()
+            self._thread.join()
+            self._thread = None
+        self._destroy_collector()
+
+    def _destroy_collector(self):
+        collector, self._collector = self._collector, None
+        if collector is not None:
+            try:
+                # destroying the collector also destroys its filter
+                collector.DestroyPropertyCollector()
+            except Exception:
+                if self.error is None:
+                    raise
+        self.version = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.poll()
+            except Exception as ex:
+                # CancelWaitForUpdates from stop() surfaces as RequestCanceled
+                if not self._stopping.is_set():
+                    self.error = ex
+                return
+
+    def _check_current(self):
+        if self.error is not None:
+            message = 'inventory mirror stopped updating: %s' % self.error
+            raise RuntimeError(message) from self.error
+
+    def apply(self, update):
+        """
+        Apply the enter/modify/leave object sets of an UpdateSet
+        """
+        with self._lock:
+            for filter_set in update.filterSet:
+                for object_set in filter_set.objectSet:
+                    obj = object_set.obj
+                    if object_set.kind == 'leave':
+                        self._objects.pop(obj, None)
+                        continue
+                    if object_set.kind == 'enter':
+                        self._objects[obj] = {}
+                    props = self._objects.setdefault(obj, {})
+                    for change in object_set.changeSet:
+                        if change.op in ('remove', 'indirectRemove'):
+                            props.pop(change.name, None)
+                        else:
+                            props[change.name] = change.val
+
+    def get(self, obj, path=None, default=None):
+        """
+        Return a copy of the mirrored properties of 'obj', or the value of
+        a single property path if one is given.
+        """
+        self._check_current()
+        with self._lock:
+            props = self._objects.get(obj)
+            if props is None:
+                return default
+            if path is None:
+                return dict(props)
+            return props.get(path, default)
+
+    def find(self, obj_type, path, value):
+        """
+        Return the first mirrored object of 'obj_type' whose 'path' property
+        equals 'value', e.g. find(vim.VirtualMachine, 'name', 'vm-01')
+        """
+        for obj, _ in self.scan(obj_type, lambda props: props.get(path) == value):
+            return obj
+        return None
+
+    def scan(self, obj_type=None, predicate=None):
+        """
+        Return a list of (object, properties) pairs, optionally restricted to
+        instances of 'obj_type' and to properties accepted by 'predicate'.
+        """
+        self._check_current()
+        with self._lock:
+            return [(obj, dict(props)) for obj, props in self._objects.items()
+                    if (obj_type is None or isinstance(obj, obj_type))
+                    and (predicate is None or predicate(props))]
@@ -14,10 +14,13 @@ VMware Storage Policy (pbm) API
 from pyVmomi import pbm, VmomiSupport
 
 
-def create_pbm_session(stub):
+def create_pbm_session(stub, pool_size=0):
     """
     Creates a session with the VMware Storage Policy API
 
+    The session cookie travels with the stub, so with a pool_size above 0
+    the returned service instance can be shared by several threads.
+
     Sample Usage:
 
     create_pbm_session(service_instance._stub)
@@ -45,8 +48,10 @@ def create_pbm_session(stub):
         host=hostname,
         version="pbm.version.version1",
         path="/pbm/sdk",
-        poolSize=0,
-        sslContext=context)
+        poolSize=pool_size,
+        sslContext=context,
+        requestContext={"vcSessionCookie": session_cookie})
+    pbm_stub.cookie = stub.cookie
     pbm_si = pbm.ServiceInstance("ServiceInstance", pbm_stub)
 
     return pbm_si
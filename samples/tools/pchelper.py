@@ -2,8 +2,27 @@
 Property Collector helper module.
 """
 
+import atexit
+import collections
+import concurrent.futures
+import sys
+import threading
+import time
+
 import pyVmomi
 
+from . import service_instance, serviceutil
+from .proptable import PropertyTable
+
+# Default number of objects per RetrievePropertiesEx page
+DEFAULT_PAGE_SIZE = 1000
+
+# Seconds a cached name index is trusted before it is rebuilt
+DEFAULT_NAME_INDEX_TTL = 300
+
+_name_index_cache = {}
+_name_index_lock = threading.Lock()
+
 
 # Shamelessly borrowed from:
 # https://github.com/dnaeon/py-vconnector/blob/master/src/vconnector/core.py
@@ -29,8 +48,189 @@ def collect_properties(si, view_ref, obj_type, path_set=None,
         A list of properties for the managed objects
 
     """
+    return list(iter_collect_properties(si, view_ref, obj_type,
+                                        path_set=path_set,
+                                        include_mors=include_mors))
+
+
+def iter_collect_properties(si, view_ref, obj_type, path_set=None,
+                            include_mors=False, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Generator variant of collect_properties
+
+    Properties are retrieved with RetrievePropertiesEx in pages of at most
+    'page_size' objects and each row is yielded as soon as its page arrives,
+    so the whole inventory is never held in memory at once. If the consumer
+    stops iterating early the outstanding retrieval token is cancelled.
+
+    Args:
+        si          (ServiceInstance): ServiceInstance connection
+        view_ref (pyVmomi.vim.view.*): Starting point of inventory navigation
+        obj_type      (pyVmomi.vim.*): Type of managed object
+        path_set               (list): List of properties to retrieve
+        include_mors           (bool): If True include the managed objects
+                                       refs in the result
+        page_size               (int): Maximum number of objects per page
+
+    Yields:
+        A dict of properties for each managed object
+
+    """
+    collector = si.content.propertyCollector
+    filter_spec = _make_view_filter_spec(view_ref, obj_type, path_set)
+
+    for obj in retrieve_paged(collector, [filter_spec], page_size):
+        yield _object_content_to_dict(obj, include_mors)
+
+
+def collect_property_table(si, view_ref, obj_type, path_set=None,
+                           include_mors=False, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Variant of collect_properties returning a column oriented PropertyTable
+
+    Rows of the table behave like the dicts collect_properties returns, but
+    each property path is stored once as a column instead of once per
+    object, which keeps large inventories small in memory.
+
+    Returns:
+        A PropertyTable with one row per managed object
+    """
     collector = si.content.propertyCollector
+    filter_spec = _make_view_filter_spec(view_ref, obj_type, path_set)
+    return PropertyTable.from_object_contents(
+        retrieve_paged(collector, [filter_spec], page_size), include_mors)
+
+
+def collect_properties_sharded(si, obj_type, path_set=None, include_mors=False,
+                               shard_by='datacenter', max_workers=4,
+                               session_factory=None, page_size=DEFAULT_PAGE_SIZE, pool=None):
+    """
+    Collect properties for every 'obj_type' object in the inventory, split
+    into shards that are retrieved concurrently
 
+    Serializing one huge result is slow on the server side, so the inventory
+    is split and each shard is collected by a worker thread on its own
+    session. Rows are yielded shard by shard as the shards complete.
+
+    Args:
+        si          (ServiceInstance): ServiceInstance connection, used to
+                                       plan the shards
+        obj_type      (pyVmomi.vim.*): Type of managed object
+        path_set               (list): List of properties to retrieve
+        include_mors           (bool): If True include the managed objects
+                                       refs in the result
+        shard_by      (str, int): 'datacenter' or 'cluster' for one shard per
+                                  container, or a number of managed object
+                                  partitions. In 'cluster' mode objects that
+                                  are not below any compute resource are
+                                  not collected.
+        max_workers             (int): Number of shards collected at once
+        session_factory    (callable): Returns a ServiceInstance for a worker,
+                                       e.g. lambda: service_instance.connect(args).
+                                       By default the workers share 'si'.
+        page_size               (int): Maximum number of objects per page
+        pool    (ServiceInstancePool): Pool to take the workers' sessions
+                                       from instead of 'session_factory'
+
+    Yields:
+        A dict of properties for each managed object
+    """
+    content = si.content
+    if shard_by == 'datacenter':
+        shards = [[container] for container in get_all_obj(content, [pyVmomi.vim.Datacenter])]
+    elif shard_by == 'cluster':
+        shards = [[container] for container in
+                  get_all_obj(content, [pyVmomi.vim.ComputeResource])]
+    elif isinstance(shard_by, int) and shard_by > 0:
+        view = content.viewManager.CreateContainerView(content.rootFolder, [obj_type], True)
+        try:
+            objects = list(view.view)
+        finally:
+            view.Destroy()
+        shards = [objects[start::shard_by] for start in range(shard_by)]
+        shards = [shard for shard in shards if shard]
+    else:
+        raise ValueError("shard_by must be 'datacenter', 'cluster' or a positive int")
+
+    if pool is None:
+        pool = service_instance.ServiceInstancePool(session_factory or (lambda: si),
+                                                    size=max_workers)
+
+    def collect_shard(shard):
+        return pool.call(_collect_shard, shard, obj_type, path_set, include_mors,
+                         shard_by, page_size)
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    futures = [executor.submit(collect_shard, shard) for shard in shards]
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            for row in future.result():
+                yield row
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _collect_shard(si, shard, obj_type, path_set, include_mors, shard_by, page_size):
+    """
+    Collect one shard of collect_properties_sharded on the session 'si'
+    """
+    stub = si._stub
+    # managed object refs are bound to the session they were read with
+    shard = [obj.__class__(obj._moId, stub) for obj in shard]
+    content = si.content
+    if isinstance(shard_by, int):
+        property_collector = pyVmomi.vmodl.query.PropertyCollector
+        filter_spec = property_collector.FilterSpec()
+        filter_spec.objectSet = [property_collector.ObjectSpec(obj=obj, skip=False)
+                                 for obj in shard]
+        filter_spec.propSet = [property_collector.PropertySpec(type=obj_type,
+                                                               all=not path_set,
+                                                               pathSet=path_set or [])]
+        return [_object_content_to_dict(obj, include_mors)
+                for obj in retrieve_paged(content.propertyCollector, [filter_spec], page_size)]
+
+    view = content.viewManager.CreateContainerView(shard[0], [obj_type], True)
+    try:
+        return list(iter_collect_properties(si, view, obj_type, path_set, include_mors,
+                                            page_size))
+    finally:
+        view.Destroy()
+
+
+def retrieve_paged(collector, filter_specs, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Yield ObjectContent items for the filter specs one page at a time
+
+    Uses RetrievePropertiesEx/ContinueRetrievePropertiesEx and cancels the
+    continuation token if the generator is closed before the last page.
+    """
+    options = pyVmomi.vmodl.query.PropertyCollector.RetrieveOptions(
+        maxObjects=page_size)
+    result = collector.RetrievePropertiesEx(filter_specs, options)
+
+    pending_token = None
+    try:
+        while result is not None:
+            pending_token = result.token
+            for obj in result.objects:
+                yield obj
+            if not pending_token:
+                break
+            token, pending_token = pending_token, None
+            result = collector.ContinueRetrievePropertiesEx(token)
+    finally:
+        if pending_token:
+            collector.CancelRetrievePropertiesEx(pending_token)
+
+
+def _make_view_filter_spec(view_ref, obj_type, path_set=None):
+    """
+    Build a filter spec collecting 'path_set' for every 'obj_type' in a view
+
+    'obj_type' is a managed object type or a list of them.
+    """
     # Create object specification to define the starting point of
     # inventory navigation
     obj_spec = pyVmomi.vmodl.query.PropertyCollector.ObjectSpec()
@@ -45,43 +245,45 @@ def collect_properties(si, view_ref, obj_type, path_set=None,
     traversal_spec.type = view_ref.__class__
     obj_spec.selectSet = [traversal_spec]
 
-    # Identify the properties to the retrieved
-    property_spec = pyVmomi.vmodl.query.PropertyCollector.PropertySpec()
-    property_spec.type = obj_type
+    # Identify the properties to the retrieved, one spec per type
+    property_specs = []
+    for vim_type in obj_type if isinstance(obj_type, (list, tuple)) else [obj_type]:
+        property_spec = pyVmomi.vmodl.query.PropertyCollector.PropertySpec()
+        property_spec.type = vim_type
 
-    if not path_set:
-        property_spec.all = True
+        if not path_set:
+            property_spec.all = True
 
-    property_spec.pathSet = path_set
+        property_spec.pathSet = path_set
+        property_specs.append(property_spec)
 
     # Add the object and property specification to the
     # property filter specification
     filter_spec = pyVmomi.vmodl.query.PropertyCollector.FilterSpec()
     filter_spec.objectSet = [obj_spec]
-    filter_spec.propSet = [property_spec]
-
-    # Retrieve properties
-    props = collector.RetrieveContents([filter_spec])
+    filter_spec.propSet = property_specs
+    return filter_spec
 
-    data = []
-    for obj in props:
-        properties = {}
-        for prop in obj.propSet:
-            properties[prop.name] = prop.val
 
-        if include_mors:
-            properties['obj'] = obj.obj
+def _object_content_to_dict(obj, include_mors=False):
+    """
+    Flatten an ObjectContent into a dict keyed by property path
+    """
+    properties = {}
+    for prop in obj.propSet:
+        properties[prop.name] = prop.val
 
-        data.append(properties)
-    return data
+    if include_mors:
+        properties['obj'] = obj.obj
+    return properties
 
 
-def get_container_view(si, obj_type, container=None):
+def get_container_view(si, obj_type, container=None, view_cache=None):
     """
     Get a vSphere Container View reference to all objects of type 'obj_type'
 
     It is up to the caller to take care of destroying the View when no longer
-    needed.
+    needed, unless it comes from 'view_cache' (see ViewCache).
 
     Args:
         obj_type (list): A list of managed object types
@@ -92,6 +294,9 @@ def get_container_view(si, obj_type, container=None):
     if not container:
         container = si.content.rootFolder
 
+    if view_cache is not None:
+        return view_cache.get(obj_type, container)
+
     view_ref = si.content.viewManager.CreateContainerView(
         container=container,
         type=obj_type,
@@ -100,10 +305,99 @@ def get_container_view(si, obj_type, container=None):
     return view_ref
 
 
-def search_for_obj(content, vim_type, name, folder=None, recurse=True):
+def _open_view(content, vim_type, folder, recurse, view_cache):
+    """
+    Get a container view from 'view_cache', or create a new one
+    """
+    if view_cache is not None:
+        return view_cache.get(vim_type, folder, recurse)
+    return content.viewManager.CreateContainerView(folder, vim_type, recurse)
+
+
+def _close_view(view, view_cache):
+    """
+    Destroy a view created by _open_view, cached views stay alive
+    """
+    if view_cache is None:
+        view.Destroy()
+
+
+class ViewCache:
+    """
+    Keeps container views alive for reuse across helper calls and destroys
+    them on exit, or when more than 'max_views' are live (least recently
+    used first). Views are keyed by (container, types, recursive).
+
+    Example:
+        with pchelper.ViewCache(si) as views:
+            vm = pchelper.get_obj(content, [vim.VirtualMachine], "vm1", view_cache=views)
+            names = pchelper.get_all_obj(content, [vim.VirtualMachine], view_cache=views)
+            print(views.live_views)
+    """
+
+    def __init__(self, si, max_views=16):
+        self._content = si.content
+        self._max_views = max_views
+        self._views = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.destroy_all()
+
+    @property
+    def live_views(self):
+        """
+        Number of views currently alive on the server
+        """
+        with self._lock:
+            return len(self._views)
+
+    def get(self, obj_type, container=None, recursive=True):
+        """
+        Return a live view of 'obj_type' objects below 'container', creating
+        it if needed
+        """
+        if container is None:
+            container = self._content.rootFolder
+        key = (container, tuple(obj_type), recursive)
+        evicted = []
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                return view
+            view = self._content.viewManager.CreateContainerView(container, obj_type,
+                                                                 recursive)
+            self._views[key] = view
+            while len(self._views) > self._max_views:
+                evicted.append(self._views.popitem(last=False)[1])
+        for old_view in evicted:
+            old_view.Destroy()
+        return view
+
+    def destroy_all(self):
+        """
+        Destroy every cached view
+        """
+        with self._lock:
+            views = list(self._views.values())
+            self._views.clear()
+        for view in views:
+            view.Destroy()
+
+
+def search_for_obj(content, vim_type, name, folder=None, recurse=True,
+                   use_index=False, view_cache=None):
     """
     Search the managed object for the name and type specified
 
+    With use_index=True the lookup is served from the cached name index
+    (see get_name_index) instead of reading the name of every object.
+    With a 'view_cache' (see ViewCache) its container views are reused.
+
     Sample Usage:
 
     get_obj(content, [vim.Datastore], "Datastore Name")
@@ -111,39 +405,65 @@ def search_for_obj(content, vim_type, name, folder=None, recurse=True):
     if folder is None:
         folder = content.rootFolder
 
+    if use_index:
+        obj = get_name_index(content, vim_type, folder, recurse).lookup(name)
+        if obj is None:
+            # the object may have been created after the index was built
+            obj = get_name_index(content, vim_type, folder, recurse,
+                                 refresh=True).lookup(name)
+        return obj
+
     obj = None
-    container = content.viewManager.CreateContainerView(folder, vim_type, recurse)
+    container = _open_view(content, vim_type, folder, recurse, view_cache)
 
     for managed_object_ref in container.view:
         if managed_object_ref.name == name:
             obj = managed_object_ref
             break
-    container.Destroy()
+    _close_view(container, view_cache)
     return obj
 
 
-def get_all_obj(content, vim_type, folder=None, recurse=True):
+def get_all_obj(content, vim_type, folder=None, recurse=True, use_index=False,
+                properties=None, page_size=DEFAULT_PAGE_SIZE, view_cache=None):
     """
-    Search the managed object for the name and type specified
+    Return a {managed object: name} dict of every object of the types given
+
+    The names are fetched through the PropertyCollector in pages of
+    'page_size' objects instead of one round trip per object. With
+    use_index=True the result is served from the cached name index.
+
+    'properties' is an optional list of extra property paths. When given,
+    each value is a dict of those properties plus 'name' instead of the
+    bare name. With a 'view_cache' (see ViewCache) its container views are
+    reused.
 
     Sample Usage:
 
-    get_obj(content, [vim.Datastore], "Datastore Name")
+    get_all_obj(content, [vim.VirtualMachine], properties=["runtime.powerState"])
     """
     if not folder:
         folder = content.rootFolder
 
-    obj = {}
-    container = content.viewManager.CreateContainerView(folder, vim_type, recurse)
-
-    for managed_object_ref in container.view:
-        obj[managed_object_ref] = managed_object_ref.name
+    if use_index and not properties:
+        return get_name_index(content, vim_type, folder, recurse).names()
 
-    container.Destroy()
+    path_set = ['name'] + [path for path in properties or () if path != 'name']
+    obj = {}
+    container = _open_view(content, vim_type, folder, recurse, view_cache)
+    try:
+        filter_spec = _make_view_filter_spec(container, vim_type, path_set)
+        for object_content in retrieve_paged(content.propertyCollector, [filter_spec],
+                                             page_size):
+            props = _object_content_to_dict(object_content)
+            obj[object_content.obj] = props if properties else props.get('name')
+    finally:
+        _close_view(container, view_cache)
     return obj
 
 
-def get_obj(content, vim_type, name, folder=None, recurse=True):
+def get_obj(content, vim_type, name, folder=None, recurse=True, use_index=False,
+            view_cache=None):
     """
     Retrieves the managed object for the name and type specified
     Throws an exception if of not found.
@@ -152,7 +472,256 @@ def get_obj(content, vim_type, name, folder=None, recurse=True):
 
     get_obj(content, [vim.Datastore], "Datastore Name")
     """
-    obj = search_for_obj(content, vim_type, name, folder, recurse)
+    obj = search_for_obj(content, vim_type, name, folder, recurse, use_index, view_cache)
     if not obj:
         raise RuntimeError("Managed Object " + name + " not found.")
     return obj
+
+
+def resolve_many(content, names_by_type, folder=None, recurse=True,
+                 raise_on_missing=True):
+    """
+    Resolve many (type, name) pairs with one multi-type container view and a
+    single PropertyCollector retrieval of 'name'.
+
+    None names are ignored so optional arguments can be passed straight
+    through. Misses are reported together once every name has been looked
+    at; with raise_on_missing=False they are simply left out of the result.
+
+    Sample Usage:
+
+    found = resolve_many(content, {vim.Datacenter: ["DC1"],
+                                   vim.Datastore: ["ds1", "ds2"]})
+    datastore = found[vim.Datastore]["ds1"]
+
+    Returns:
+        A {type: {name: managed object}} dict
+    """
+    if folder is None:
+        folder = content.rootFolder
+
+    wanted = {}
+    for vim_type, names in names_by_type.items():
+        names = set(name for name in names if name is not None)
+        if names:
+            wanted[vim_type] = names
+    found = dict((vim_type, {}) for vim_type in names_by_type)
+    if not wanted:
+        return found
+
+    view = content.viewManager.CreateContainerView(folder, list(wanted), recurse)
+    try:
+        filter_spec = _make_view_filter_spec(view, pyVmomi.vim.ManagedEntity, ['name'])
+        for obj in retrieve_paged(content.propertyCollector, [filter_spec]):
+            if not obj.propSet:
+                continue
+            name = obj.propSet[0].val
+            for vim_type, names in wanted.items():
+                if name in names and isinstance(obj.obj, vim_type):
+                    # first match wins, like search_for_obj
+                    found[vim_type].setdefault(name, obj.obj)
+    finally:
+        view.Destroy()
+
+    missing = ["%s '%s'" % (vim_type.__name__, name)
+               for vim_type, names in wanted.items()
+               for name in sorted(names) if name not in found[vim_type]]
+    if missing and raise_on_missing:
+        raise RuntimeError("Managed Objects not found: " + ", ".join(missing))
+    return found
+
+
+class NameIndex:
+    """
+    Maps names to managed object refs for all objects of a container view.
+
+    Names are not unique across a vCenter (e.g. two VMs with the same name in
+    different datacenters), so every name maps to a list of objects in the
+    order the server returned them.
+    """
+
+    def __init__(self, pairs, ttl=DEFAULT_NAME_INDEX_TTL):
+        self._by_name = {}
+        self._names = {}
+        for obj, name in pairs:
+            self._by_name.setdefault(name, []).append(obj)
+            self._names[obj] = name
+        self.created = time.time()
+        self.ttl = ttl
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    @property
+    def expired(self):
+        """
+        True once the index is older than its ttl (a ttl of None never expires)
+        """
+        return self.ttl is not None and time.time() - self.created >= self.ttl
+
+    def lookup(self, name):
+        """
+        Return the first managed object called 'name' or None
+        """
+        objs = self._by_name.get(name)
+        return objs[0] if objs else None
+
+    def lookup_all(self, name):
+        """
+        Return all managed objects called 'name'
+        """
+        return list(self._by_name.get(name, ()))
+
+    def names(self):
+        """
+        Return a {managed object: name} dict like get_all_obj
+        """
+        return dict(self._names)
+
+
+def build_name_index(content, vim_type, folder=None, recurse=True,
+                     ttl=DEFAULT_NAME_INDEX_TTL):
+    """
+    Build a NameIndex with one PropertyCollector retrieval of 'name' over a
+    container view instead of one round trip per object.
+    """
+    if folder is None:
+        folder = content.rootFolder
+
+    view = content.viewManager.CreateContainerView(folder, vim_type, recurse)
+    try:
+        filter_spec = _make_view_filter_spec(view, pyVmomi.vim.ManagedEntity, ['name'])
+        pairs = [(obj.obj, obj.propSet[0].val)
+                 for obj in retrieve_paged(content.propertyCollector, [filter_spec])
+                 if obj.propSet]
+    finally:
+        view.Destroy()
+    return NameIndex(pairs, ttl)
+
+
+def get_name_index(content, vim_type, folder=None, recurse=True,
+                   ttl=DEFAULT_NAME_INDEX_TTL, refresh=False):
+    """
+    Return the cached NameIndex for (session, vim_type, folder, recurse),
+    building it when missing, expired or when refresh is True.
+
+    Sample Usage:
+
+    index = get_name_index(content, [vim.VirtualMachine])
+    vm = index.lookup("VM Name")
+    """
+    if folder is None:
+        folder = content.rootFolder
+
+    key = (_session_key(content), tuple(vim_type), folder, recurse)
+    with _name_index_lock:
+        index = _name_index_cache.get(key)
+    if index is None or index.expired or refresh:
+        index = build_name_index(content, vim_type, folder, recurse, ttl)
+        with _name_index_lock:
+            _name_index_cache[key] = index
+    return index
+
+
+def invalidate_name_index(content=None, vim_type=None):
+    """
+    Drop cached name indexes.
+
+    Without arguments every index is dropped, otherwise only those of the
+    session of 'content' and, if given, of the 'vim_type' type list.
+    """
+    session = _session_key(content) if content is not None else None
+    types = tuple(vim_type) if vim_type is not None else None
+    with _name_index_lock:
+        for key in list(_name_index_cache):
+            if session is not None and key[0] != session:
+                continue
+            if types is not None and key[1] != types:
+                continue
+            del _name_index_cache[key]
+
+
+def _session_key(content):
+    """
+    Identify the session behind a ServiceContent: the SOAP stub and its cookie
+    """
+    stub = content.rootFolder._stub
+    return id(stub), getattr(stub, 'cookie', None)
+
+
+def make_wait_options(max_wait_seconds=None, max_object_updates=None):
+    """
+    Build WaitOptions for WaitForUpdatesEx
+    """
+    waitopts = pyVmomi.vmodl.query.PropertyCollector.WaitOptions()
+
+    if max_object_updates is not None:
+        waitopts.maxObjectUpdates = max_object_updates
+
+    if max_wait_seconds is not None:
+        waitopts.maxWaitSeconds = max_wait_seconds
+
+    return waitopts
+
+
+def make_property_collector(prop_collector, from_node, props, destroy_at_exit=True,
+                            traversal=None):
+    """
+    Create a filter on 'prop_collector' for the (type, [properties]) pairs in
+    'props' over the inventory below 'from_node'.
+
+    Unless a 'traversal' is given, only the inventory branches leading to the
+    requested types are walked when starting at a folder or datacenter, and
+    the full traversal is used otherwise.
+
+    Unless destroy_at_exit is False the filter is destroyed when the
+    interpreter exits; otherwise that is up to the caller.
+
+    :type prop_collector: pyVmomi.VmomiSupport.vmodl.query.PropertyCollector
+    :type from_node: pyVmomi.VmomiSupport.ManagedObject
+    :type props: collections.Sequence
+    :rtype: pyVmomi.VmomiSupport.vmodl.query.PropertyCollector.Filter
+    """
+
+    # Make the filter spec
+    filter_spec = pyVmomi.vmodl.query.PropertyCollector.FilterSpec()
+
+    # Make the object spec
+    if traversal is None:
+        if isinstance(from_node, (pyVmomi.vim.Folder, pyVmomi.vim.Datacenter)):
+            traversal = serviceutil.build_traversal([motype for motype, _ in props])
+        else:
+            traversal = serviceutil.build_full_traversal()
+
+    obj_spec = pyVmomi.vmodl.query.PropertyCollector.ObjectSpec(obj=from_node,
+                                                                selectSet=traversal)
+    obj_specs = [obj_spec]
+
+    filter_spec.objectSet = obj_specs
+
+    # Add the property specs
+    prop_set = []
+    for motype, proplist in props:
+        prop_spec = \
+            pyVmomi.vmodl.query.PropertyCollector.PropertySpec(type=motype, all=False)
+        prop_spec.pathSet.extend(proplist)
+        prop_set.append(prop_spec)
+
+    filter_spec.propSet = prop_set
+
+    try:
+        pc_filter = prop_collector.CreateFilter(filter_spec, True)
+        if destroy_at_exit:
+            atexit.register(pc_filter.Destroy)
+        return pc_filter
+    except pyVmomi.vmodl.MethodFault as ex:
+        if ex._wsdlName == 'InvalidProperty':
+            print("InvalidProperty fault while creating PropertyCollector filter : %s"
+                  % ex.name, file=sys.stderr)
+        else:
+            print("Problem creating PropertyCollector filter : %s"
+                  % str(ex.faultMessage), file=sys.stderr)
+        raise
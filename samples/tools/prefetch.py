@@ -0,0 +1,225 @@
+# VMware vSphere Python SDK Community Samples Addons
+# Copyright (c) 2014-2021 VMware, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module implements a list of managed objects whose attribute reads are
+served from one batched PropertyCollector retrieval
+"""
+from collections.abc import Sequence
+
+from pyVmomi import vmodl, VmomiSupport
+
+from . import pchelper
+
+__author__ = "VMware, Inc."
+
+
+class PrefetchList(Sequence):
+    """
+    Wraps a list of managed objects of one type so that loops reading the
+    same properties on every object, e.g. vm.summary.config.name, cost one
+    PropertyCollector round trip instead of one per object and property.
+
+    The property paths to fetch are either declared up front or recorded
+    while the first element is used: that element is read live and every
+    property path touched on it is remembered. Accessing any other element
+    then prefetches the recorded paths for the whole list at once.
+
+    Prefetched elements are proxies. Properties that were not prefetched,
+    methods and private attributes (_moId, ...) are still read live from the
+    wrapped object, available as `managed_object`. Because the server omits
+    unset properties, a data object whose prefetched sub-properties are all
+    unset reads as None.
+
+    Example:
+        for vm in PrefetchList(si, container_view.view):
+            print(vm.summary.config.name, vm.summary.runtime.powerState)
+    """
+
+    def __init__(self, si, objects, paths=None, page_size=pchelper.DEFAULT_PAGE_SIZE):
+        self._si = si
+        self._objects = list(objects)
+        self._paths = set(paths) if paths else None
+        self._page_size = page_size
+        self._recorded = set()
+        self._recording_index = None
+        self._prefixes = None
+        self._cache = None
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self._objects)
+        obj = self._objects[index]
+        if self._cache is None:
+            if self._paths is None and self._recording_index in (None, index):
+                self._recording_index = index
+                return _Recorder(obj, '', self._recorded)
+            self.prefetch()
+        if obj not in self._cache:
+            return obj
+        return _Prefetched(obj, '', self._cache[obj], self._paths, self._prefixes)
+
+    @property
+    def paths(self):
+        """
+        The declared, or so far recorded, property paths
+        """
+        return set(self._paths if self._paths is not None else self._recorded)
+
+    def prefetch(self):
+        """
+        Retrieve the property paths for every object in one PropertyCollector
+        call.
+
+        Only the deepest recorded paths are fetched: reading
+        summary.config.name records summary, summary.config and
+        summary.config.name, of which only the last is needed. Optional data
+        objects on the way are fetched whole (summary.guest rather than
+        summary.guest.ipAddress) so that reading them as None stays exact.
+        """
+        paths = self._paths if self._paths is not None else self._recorded
+        paths = [path for path in paths
+                 if not any(other.startswith(path + '.') for other in paths)]
+        obj_type = self._objects[0].__class__ if self._objects else None
+        paths = set(_fetch_path(obj_type, path) for path in paths)
+        self._paths = set(path for path in paths
+                          if not any(path.startswith(other + '.') for other in paths))
+        self._prefixes = set()
+        for path in self._paths:
+            parts = path.split('.')
+            for end in range(1, len(parts)):
+                self._prefixes.add('.'.join(parts[:end]))
+
+        self._cache = {}
+        if not self._paths or not self._objects:
+            return
+
+        property_collector = vmodl.query.PropertyCollector
+        filter_spec = property_collector.FilterSpec()
+        filter_spec.objectSet = [property_collector.ObjectSpec(obj=obj, skip=False)
+                                 for obj in self._objects]
+        filter_spec.propSet = [property_collector.PropertySpec(type=obj_type,
+                                                               pathSet=sorted(self._paths))
+                               for obj_type in set(obj.__class__ for obj in self._objects)]
+        for obj in self._objects:
+            self._cache[obj] = {}
+        for object_content in pchelper.retrieve_paged(self._si.content.propertyCollector,
+                                                      [filter_spec], self._page_size):
+            props = self._cache[object_content.obj]
+            for prop in object_content.propSet:
+                props[prop.name] = prop.val
+
+
+def _fetch_path(obj_type, path):
+    """
+    Shorten 'path' to its first optional data object, if it has one
+    """
+    parts = path.split('.')
+    for end, part in enumerate(parts[:-1], 1):
+        try:
+            info = obj_type._GetPropertyInfo(part)
+        except AttributeError:
+            break
+        if info.flags & VmomiSupport.F_OPTIONAL:
+            return '.'.join(parts[:end])
+        obj_type = info.type
+    return path
+
+
+def _is_property(value, name):
+    """
+    True if 'name' is a (collectable) property of a pyVmomi object
+    """
+    if name.startswith('_'):
+        return False
+    try:
+        value._GetPropertyInfo(name)
+    except AttributeError:
+        return False
+    return True
+
+
+class _Recorder:
+    """
+    Reads attributes live and records the property paths that were touched
+    """
+    __slots__ = ('_value', '_prefix', '_recorded')
+
+    def __init__(self, value, prefix, recorded):
+        self._value = value
+        self._prefix = prefix
+        self._recorded = recorded
+
+    def __getattr__(self, name):
+        value = getattr(self._value, name)
+        if not _is_property(self._value, name):
+            return value
+        path = self._prefix + name
+        self._recorded.add(path)
+        if isinstance(value, VmomiSupport.DataObject):
+            return _Recorder(value, path + '.', self._recorded)
+        return value
+
+    def __repr__(self):
+        return repr(self._value)
+
+    @property
+    def managed_object(self):
+        return self._value
+
+
+class _Prefetched:
+    """
+    Serves property paths of one managed object from prefetched values
+    """
+    __slots__ = ('_obj', '_prefix', '_props', '_paths', '_prefixes')
+
+    def __init__(self, obj, prefix, props, paths, prefixes):
+        self._obj = obj
+        self._prefix = prefix
+        self._props = props
+        self._paths = paths
+        self._prefixes = prefixes
+
+    def __getattr__(self, name):
+        path = self._prefix + name
+        if path in self._props:
+            return self._props[path]
+        if path in self._paths:
+            # requested but not returned by the server: the property is unset
+            return None
+        if path in self._prefixes:
+            # a mandatory data object, only parts of which were fetched
+            return _Prefetched(self._obj, path + '.', self._props, self._paths,
+                               self._prefixes)
+        # not prefetched, read it live
+        value = self._obj
+        for part in path.split('.'):
+            value = getattr(value, part)
+        return value
+
+    def __repr__(self):
+        if self._prefix:
+            return '<prefetched %s of %r>' % (self._prefix.rstrip('.'), self._obj)
+        return repr(self._obj)
+
+    @property
+    def managed_object(self):
+        return self._obj
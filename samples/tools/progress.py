@@ -0,0 +1,298 @@
+# VMware vSphere Python SDK Community Samples Addons
+# Copyright (c) 2014-2021 VMware, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module implements progress events with throughput and ETA estimates
+for tasks and transfers, and a compact terminal renderer for them
+"""
+import collections
+import queue
+import sys
+import time
+
+from pyVmomi import vim
+
+from . import tasks
+
+__author__ = "VMware, Inc."
+
+# Progress of one task or transfer:
+# - percent: 0 to 100
+# - rate: bytes per second when the total size is known, else percent per
+#   second; None until two samples were seen
+# - eta: estimated seconds left, None while unknown
+# - state: a vim.TaskInfo.State value
+# - idle: seconds since the percentage last changed
+# - total: size in bytes, if known
+ProgressEvent = collections.namedtuple('ProgressEvent', ['task', 'percent', 'rate', 'eta',
+                                                         'state', 'idle', 'total'])
+
+# Weight of the latest sample in the smoothed rate
+_RATE_SMOOTHING = 0.3
+
+
+class ProgressTracker:
+    """
+    Turns percentage samples into ProgressEvents with a smoothed rate and
+    an ETA. Anything hashable can be tracked, tasks, leases or file names.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._tracks = {}
+
+    def update(self, key, percent, total=None, state=vim.TaskInfo.State.running):
+        """
+        Record that 'key' reached 'percent' of 'total' bytes and return the
+        new ProgressEvent
+        """
+        now = self._clock()
+        track = self._tracks.get(key)
+        if track is None:
+            track = self._tracks[key] = _Track(percent, now)
+        elif percent != track.percent:
+            elapsed = now - track.changed
+            if elapsed > 0:
+                sample = (percent - track.percent) / elapsed
+                track.rate = sample if track.rate is None else \
+                    _RATE_SMOOTHING * sample + (1 - _RATE_SMOOTHING) * track.rate
+            track.percent = percent
+            track.changed = now
+        if total is not None:
+            track.total = total
+        track.state = state
+        return self._event(key, track, now)
+
+    def finish(self, key, state=vim.TaskInfo.State.success):
+        """
+        Record the final state of 'key' and return its last ProgressEvent
+        """
+        track = self._tracks.get(key)
+        if track is None:
+            track = self._tracks[key] = _Track(0, self._clock())
+        if state == vim.TaskInfo.State.success:
+            track.percent = 100
+        track.state = state
+        return self._event(key, track, self._clock())
+
+    def events(self):
+        """
+        Current ProgressEvent of every tracked key, with up to date idle times
+        """
+        now = self._clock()
+        return [self._event(key, track, now) for key, track in self._tracks.items()]
+
+    def _event(self, key, track, now):
+        rate = track.rate
+        eta = None
+        if track.state == vim.TaskInfo.State.success:
+            eta = 0
+        elif rate:
+            eta = (100 - track.percent) / rate
+        if rate is not None and track.total is not None:
+            rate = rate * track.total / 100
+        return ProgressEvent(key, track.percent, rate, eta, track.state, now - track.changed,
+                             track.total)
+
+
+class _Track:
+    __slots__ = ('percent', 'changed', 'rate', 'total', 'state')
+
+    def __init__(self, percent, now):
+        self.percent = percent
+        self.changed = now
+        self.rate = None
+        self.total = None
+        self.state = vim.TaskInfo.State.running
+
+
+def stream(si, task_list, refresh=1.0, tracker=None):
+    """
+    Follow 'task_list' with the shared TaskMonitor and yield a ProgressEvent
+    whenever a task reports progress or finishes. When nothing happened for
+    'refresh' seconds the events of all running tasks are yielded again, so
+    idle times (and stalls) stay visible. Returns once every task finished.
+    """
+    tracker = tracker or ProgressTracker()
+    updates = queue.Queue()
+    monitor = tasks.get_task_monitor(si)
+    percents = {}
+    for task in task_list:
+        percents[task] = 0
+        # the first update from the monitor tells the actual state
+        tracker.update(task, 0, state=vim.TaskInfo.State.queued)
+        monitor.watch(task,
+                      on_complete=lambda future, task=task: updates.put((task, None, None, future)),
+                      on_progress=lambda task, percent: updates.put((task, percent, None, None)),
+                      on_state=lambda task, state: updates.put((task, None, state, None)))
+    states = dict.fromkeys(task_list, vim.TaskInfo.State.queued)
+    pending = len(task_list)
+    while pending:
+        try:
+            task, percent, state, future = updates.get(timeout=refresh)
+        except queue.Empty:
+            for event in tracker.events():
+                if event.state not in (vim.TaskInfo.State.success, vim.TaskInfo.State.error):
+                    yield event
+            continue
+        if future is None:
+            if percent is not None:
+                # a task reporting progress is running
+                percents[task] = percent
+                states[task] = vim.TaskInfo.State.running
+            if state is not None:
+                states[task] = state
+            yield tracker.update(task, percents[task], state=states[task])
+            continue
+        pending -= 1
+        state = vim.TaskInfo.State.error if future.exception() else \
+            vim.TaskInfo.State.success
+        yield tracker.finish(task, state)
+
+
+class ProgressRenderer:
+    """
+    Draws the progress of any number of tasks in a few terminal lines: one
+    summary line with counts, overall percentage and the longest ETA, then
+    the `max_rows` tasks most likely to need attention (stalled first, then
+    longest ETA). On a terminal the lines are redrawn in place, otherwise a
+    snapshot is written at most every `interval` seconds.
+
+    Example:
+        renderer = ProgressRenderer(labels={task: vm.name for vm, task in clones})
+        for event in progress.stream(si, [task for _, task in clones]):
+            renderer.update(event)
+        renderer.close()
+    """
+
+    def __init__(self, out=None, max_rows=5, stall_after=120, interval=5, labels=None,
+                 width=20):
+        self._out = out or sys.stderr
+        self._max_rows = max_rows
+        self._stall_after = stall_after
+        self._interval = interval
+        self._labels = labels or {}
+        self._width = width
+        self._events = collections.OrderedDict()
+        self._drawn_lines = 0
+        self._last_draw = None
+        self._tty = hasattr(self._out, 'isatty') and self._out.isatty()
+
+    def update(self, event):
+        """
+        Take a ProgressEvent into account and redraw if it is time to
+        """
+        self._events[event.task] = event
+        now = time.time()
+        # in place redraws are cheap, but not for every event of hundreds of tasks
+        interval = min(self._interval, 0.2) if self._tty else self._interval
+        if self._last_draw is None or now - self._last_draw >= interval:
+            self.draw()
+            self._last_draw = now
+
+    def close(self):
+        """
+        Draw the final state
+        """
+        self.draw()
+
+    def lines(self):
+        """
+        The lines that would be drawn now
+        """
+        events = list(self._events.values())
+        done = [e for e in events if e.state == vim.TaskInfo.State.success]
+        failed = [e for e in events if e.state == vim.TaskInfo.State.error]
+        queued = [e for e in events if e.state == vim.TaskInfo.State.queued]
+        running = [e for e in events if e.state == vim.TaskInfo.State.running]
+        stalled = [e for e in running if e.idle >= self._stall_after]
+        percent = sum(e.percent for e in events) / len(events) if events else 100
+        etas = [e.eta for e in running if e.eta is not None]
+
+        summary = '%d running, %d queued, %d done, %d failed' % (
+            len(running), len(queued), len(done), len(failed))
+        if stalled:
+            summary += ', %d stalled' % len(stalled)
+        summary += ' | %3d%%' % percent
+        if etas:
+            summary += ' | ETA %s' % format_duration(max(etas))
+
+        rows = sorted(running, key=lambda e: (e.idle < self._stall_after,
+                                              -(e.eta if e.eta is not None else float('inf'))))
+        lines = [summary]
+        for event in rows[:self._max_rows]:
+            lines.append(self._row(event))
+        if len(rows) > self._max_rows:
+            lines.append('  ... %d more running' % (len(rows) - self._max_rows))
+        return lines
+
+    def _row(self, event):
+        filled = int(self._width * event.percent / 100)
+        row = '  %-24s [%s%s] %3d%%' % (self._label(event.task)[:24], '#' * filled,
+                                        '-' * (self._width - filled), event.percent)
+        if event.rate is not None:
+            row += '  %s' % format_rate(event)
+        if event.eta is not None:
+            row += '  ETA %s' % format_duration(event.eta)
+        if event.idle >= self._stall_after:
+            row += '  STALLED %s' % format_duration(event.idle)
+        return row
+
+    def _label(self, task):
+        if task in self._labels:
+            return str(self._labels[task])
+        return getattr(task, '_moId', None) or str(task)
+
+    def draw(self):
+        lines = self.lines()
+        if self._tty:
+            # move up over the previous drawing and clear it line by line
+            if self._drawn_lines:
+                self._out.write('\x1b[%dF' % self._drawn_lines)
+            self._out.write(''.join('\x1b[2K%s\n' % line for line in lines))
+            if len(lines) < self._drawn_lines:
+                self._out.write('\x1b[J')
+            self._drawn_lines = len(lines)
+        else:
+            self._out.write('\n'.join(lines) + '\n')
+        self._out.flush()
+
+
+def format_duration(seconds):
+    """
+    Compact duration, e.g. 45s, 4m05s or 2h10m
+    """
+    seconds = int(seconds)
+    if seconds < 60:
+        return '%ds' % seconds
+    if seconds < 3600:
+        return '%dm%02ds' % divmod(seconds, 60)
+    return '%dh%02dm' % (seconds // 3600, seconds % 3600 // 60)
+
+
+def format_rate(event):
+    """
+    The rate of a ProgressEvent as bytes or percent per second
+    """
+    if event.rate is None:
+        return ''
+    if event.total is None:
+        return '%.1f%%/s' % event.rate
+    rate = float(event.rate)
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if rate < 1024:
+            break
+        rate /= 1024
+    return '%.1f %s/s' % (rate, unit)
@@ -0,0 +1,200 @@
+# VMware vSphere Python SDK Community Samples Addons
+# Copyright (c) 2014-2021 VMware, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module implements a compact, column oriented container for the results
+of property collection
+"""
+import csv
+import json
+import sys
+from collections.abc import Mapping
+
+__author__ = "VMware, Inc."
+
+# Marks a property that was not returned for an object
+_MISSING = object()
+
+
+class PropertyTable:
+    """
+    Stores collected properties as one list per property path instead of one
+    dict per object. Property paths are interned once in a shared key table,
+    so 50k objects with 10 properties cost 10 lists rather than 50k dicts.
+
+    Rows are exposed as read-only Row views that behave like the dicts
+    returned by pchelper.collect_properties.
+
+    Example:
+        table = pchelper.collect_property_table(si, view, vim.VirtualMachine, ['name'])
+        for row in table:
+            print(row['name'])
+        table.select('name').to_csv(sys.stdout)
+    """
+
+    def __init__(self, keys=()):
+        self._keys = []
+        self._index = {}
+        self._columns = []
+        self._length = 0
+        for key in keys:
+            self._add_column(key)
+
+    @classmethod
+    def from_object_contents(cls, object_contents, include_mors=False):
+        """
+        Build a table from an iterable of PropertyCollector ObjectContent
+        """
+        table = cls()
+        for object_content in object_contents:
+            table.append_object_content(object_content, include_mors)
+        return table
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield Row(self, index)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('row index out of range')
+        return Row(self, index)
+
+    @property
+    def keys(self):
+        """
+        The property paths, in column order
+        """
+        return list(self._keys)
+
+    def _add_column(self, key):
+        key = sys.intern(key)
+        self._index[key] = len(self._keys)
+        self._keys.append(key)
+        self._columns.append([_MISSING] * self._length)
+        return self._index[key]
+
+    def _set(self, key, value):
+        column = self._index.get(key)
+        if column is None:
+            column = self._add_column(key)
+        if type(value) is str:
+            # enum like values (powerState, guestId, ...) repeat a lot
+            value = sys.intern(value)
+        self._columns[column][-1] = value
+
+    def _new_row(self):
+        self._length += 1
+        for column in self._columns:
+            column.append(_MISSING)
+
+    def append(self, properties):
+        """
+        Append a row from a {property path: value} mapping
+        """
+        self._new_row()
+        for key, value in properties.items():
+            self._set(key, value)
+
+    def append_object_content(self, object_content, include_mors=False):
+        """
+        Append a row from a PropertyCollector ObjectContent
+        """
+        self._new_row()
+        for prop in object_content.propSet:
+            self._set(prop.name, prop.val)
+        if include_mors:
+            self._set('obj', object_content.obj)
+
+    def column(self, key, default=None):
+        """
+        Return the values of one property path, 'default' where missing
+        """
+        column = self._columns[self._index[key]]
+        return [default if value is _MISSING else value for value in column]
+
+    def select(self, *keys):
+        """
+        Project the table onto the given property paths
+        """
+        table = PropertyTable()
+        for key in keys:
+            table._keys.append(key)
+            table._index[key] = len(table._columns)
+            if key in self._index:
+                table._columns.append(list(self._columns[self._index[key]]))
+            else:
+                table._columns.append([_MISSING] * self._length)
+        table._length = self._length
+        return table
+
+    def to_csv(self, fileobj, keys=None):
+        """
+        Write the table as CSV with a header row. Missing values are empty.
+        """
+        keys = list(keys or self._keys)
+        columns = [self._columns[self._index[key]] if key in self._index else None
+                   for key in keys]
+        writer = csv.writer(fileobj)
+        writer.writerow(keys)
+        for index in range(self._length):
+            writer.writerow(['' if column is None or column[index] is _MISSING
+                             else column[index] for column in columns])
+
+    def to_ndjson(self, fileobj, keys=None):
+        """
+        Write one JSON object per row. Values JSON cannot represent, such as
+        managed object refs, are written as their string form.
+        """
+        for row in self:
+            if keys is not None:
+                row = dict((key, row[key]) for key in keys if key in row)
+            fileobj.write(json.dumps(dict(row), default=str))
+            fileobj.write('\n')
+
+
+class Row(Mapping):
+    """
+    Read-only, dict compatible view of one row of a PropertyTable
+    """
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key):
+        column = self._table._index.get(key)
+        if column is None:
+            raise KeyError(key)
+        value = self._table._columns[column][self._index]
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        for key, column in zip(self._table._keys, self._table._columns):
+            if column[self._index] is not _MISSING:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return 'Row(%r)' % dict(self)
@@ -0,0 +1,287 @@
+# VMware vSphere Python SDK Community Samples Addons
+# Copyright (c) 2014-2021 VMware, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module implements a seekable, buffered file object for files on an
+HTTP server that supports Range requests
+"""
+import http.client
+import threading
+import urllib.request
+from concurrent import futures
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+__author__ = "VMware, Inc."
+
+MIN_WINDOW_SIZE = 64 * 2 ** 10
+DEFAULT_WINDOW_SIZE = 16 * 2 ** 20
+# Redirects followed before giving up
+MAX_REDIRECTS = 5
+
+
+class RemoteFile:
+    """
+    Reads a file over HTTP through one persistent connection, in windows
+    fetched with Range requests instead of one request per read() call.
+    Redirects are followed and the http(s)_proxy environment is honoured,
+    like urlopen() does.
+
+    The window starts at `MIN_WINDOW_SIZE`, so scattered small reads such as
+    tar headers stay cheap, and doubles up to `window_size` while reads are
+    sequential. Sequential windows are prefetched in the background while the
+    current one is consumed, and after `stream_after` of them the rest of the
+    file is read from a single streaming GET. Seeking elsewhere goes back to
+    windows.
+
+    A RemoteFile must not be read from several threads at once; open one per
+    thread instead.
+
+    Example:
+        with RemoteFile('https://example.com/appliance.ova') as remote:
+            with tarfile.open(fileobj=remote) as ova:
+                print(ova.getnames())
+    """
+
+    def __init__(self, url, window_size=DEFAULT_WINDOW_SIZE, stream_after=2, context=None,
+                 timeout=60):
+        self.url = url
+        self._set_location(url)
+        self._window_size = max(window_size, MIN_WINDOW_SIZE)
+        self._stream_after = stream_after
+        self._context = context
+        self._timeout = timeout
+        self._connection = None
+        # one request at a time on the connection, the prefetch included
+        self._lock = threading.Lock()
+        self._executor = futures.ThreadPoolExecutor(max_workers=1)
+        self._window_start = 0
+        self._window = b''
+        self._next_window_size = MIN_WINDOW_SIZE
+        self._sequential = 0
+        self._prefetch = None
+        self._stream = None
+        self._stream_position = None
+        self.offset = 0
+        self.requests = 0
+
+        # a one byte range tells both the size and whether ranges work
+        with self._lock:
+            response = self._request(0, 0)
+            response.read()
+        if response.status == 404:
+            raise FileNotFoundError(url)
+        if response.status != 206:
+            raise IOError("Site does not accept ranges: HTTP %d %s"
+                          % (response.status, response.reason))
+        self.headers = {name.lower(): value.strip() for name, value in response.getheaders()}
+        self.size = int(self.headers['content-range'].rsplit('/', 1)[1])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def tell(self):
+        return self.offset
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            self.offset = offset
+        elif whence == 1:
+            self.offset += offset
+        elif whence == 2:
+            self.offset = self.size + offset
+        return self.offset
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def read(self, amount=-1):
+        remaining = self.size - self.offset
+        if amount is None or amount < 0 or amount > remaining:
+            amount = remaining
+        chunks = []
+        while amount > 0:
+            data = self._read_some(amount)
+            if not data:
+                raise IOError('%s ended at %d of %d bytes' % (self.url, self.offset, self.size))
+            chunks.append(data)
+            amount -= len(data)
+            self.offset += len(data)
+        return b''.join(chunks)
+
+    def close(self):
+        self._prefetch = None
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._close_stream()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _read_some(self, amount):
+        """
+        Up to 'amount' bytes at the current offset
+        """
+        if self._window_start <= self.offset < self._window_start + len(self._window):
+            index = self.offset - self._window_start
+            return self._window[index:index + amount]
+        if self._stream is not None and self._stream_position == self.offset:
+            try:
+                data = self._stream.read(amount)
+            except (http.client.HTTPException, OSError):
+                # carry on with windows on a new connection
+                data = b''
+            if data:
+                self._stream_position += len(data)
+                return data
+            self._sequential = 0
+
+        if self.offset == self._window_start + len(self._window):
+            self._sequential += 1
+            self._next_window_size = min(self._next_window_size * 2, self._window_size)
+        else:
+            self._sequential = 0
+            self._next_window_size = MIN_WINDOW_SIZE
+
+        streaming = self._stream_after is not None and self._sequential >= self._stream_after
+        window = self._take_prefetch()
+        if window is None and streaming and self._sequential > self._stream_after:
+            self._open_stream()
+            return self._read_some(amount)
+
+        self._window_start = self.offset
+        self._window = window or self._fetch(self.offset, self._next_window_size)
+        # once streaming is due, the next miss opens the stream instead
+        if self._sequential and not streaming:
+            self._start_prefetch(self._window_start + len(self._window))
+        return self._window[:amount]
+
+    def _take_prefetch(self):
+        """
+        The prefetched window if it starts at the current offset. Any other
+        prefetch is waited for, so that it does not end a stream opened next.
+        """
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch is None:
+            return None
+        if prefetch[0] != self.offset:
+            prefetch[1].exception()
+            return None
+        return prefetch[1].result()
+
+    def _start_prefetch(self, start):
+        if start < self.size:
+            self._prefetch = (start, self._executor.submit(self._fetch, start,
+                                                           self._next_window_size))
+
+    def _fetch(self, start, size):
+        with self._lock:
+            self._close_stream()
+            last = min(start + size, self.size) - 1
+            response = self._request(start, last)
+            data = response.read()
+        if response.status != 206:
+            raise IOError('HTTP %d %s' % (response.status, response.reason))
+        if len(data) != last - start + 1:
+            raise IOError('short read of %s at %d' % (self.url, start))
+        return data
+
+    def _open_stream(self):
+        self._window = b''
+        with self._lock:
+            self._close_stream()
+            response = self._request(self.offset, None)
+        if response.status != 206:
+            response.close()
+            raise IOError('HTTP %d %s' % (response.status, response.reason))
+        self._stream = response
+        self._stream_position = self.offset
+
+    def _close_stream(self):
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.close()
+            # an unfinished response leaves the connection unusable
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _set_location(self, url):
+        """
+        Send the next requests to 'url', through the proxy configured for it
+        """
+        parts = urlsplit(url)
+        self._location = url
+        self._https = parts.scheme == 'https'
+        self._netloc = parts.netloc
+        self._path = urlunsplit(('', '', parts.path or '/', parts.query, ''))
+        self._proxy = None
+        if not urllib.request.proxy_bypass(parts.hostname or ''):
+            proxy = urllib.request.getproxies().get(parts.scheme)
+            if proxy:
+                self._proxy = urlsplit(proxy if '//' in proxy else '//' + proxy).netloc
+
+    def _connect(self):
+        if self._https:
+            self._connection = http.client.HTTPSConnection(
+                self._proxy or self._netloc, timeout=self._timeout, context=self._context)
+            if self._proxy:
+                self._connection.set_tunnel(self._netloc)
+        else:
+            self._connection = http.client.HTTPConnection(self._proxy or self._netloc,
+                                                          timeout=self._timeout)
+
+    def _request(self, first, last):
+        """
+        GET bytes first..last, or first..end if 'last' is None, following
+        redirects. Called with the lock held.
+        """
+        headers = {'Range': 'bytes=%d-%s' % (first, '' if last is None else last)}
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._send(headers)
+            location = response.getheader('Location')
+            if response.status not in (301, 302, 303, 307, 308) or not location:
+                return response
+            response.read()
+            location = urljoin(self._location, location)
+            if urlsplit(location).netloc != self._netloc:
+                self._connection.close()
+                self._connection = None
+            self._set_location(location)
+        raise IOError('Too many redirects for %s' % self.url)
+
+    def _send(self, headers):
+        """
+        Send one GET, reconnecting once if the kept-alive connection went away
+        """
+        # a plain HTTP proxy takes the whole URL
+        path = self._location if self._proxy and not self._https else self._path
+        for attempt in range(2):
+            if self._connection is None:
+                self._connect()
+            try:
+                self.requests += 1
+                self._connection.request('GET', path, headers=headers)
+                return self._connection.getresponse()
+            except (http.client.HTTPException, OSError):
+                self._connection.close()
+                self._connection = None
+                if attempt:
+                    raise
@@ -4,7 +4,20 @@ This module implements simple helper functions for managing service instance obj
 __author__ = "VMware, Inc."
 
 import atexit
+import contextlib
+import getpass
+import json
+import os
+import ssl
+import tempfile
+import threading
+import time
 from pyVim.connect import SmartConnect, Disconnect
+from pyVmomi import vim, vmodl, SoapStubAdapter
+
+# Where --session-cache stores sessions when no file is given
+DEFAULT_SESSION_CACHE = os.path.join(os.path.expanduser('~'), '.cache',
+                                     'pyvmomi-community-samples', 'sessions.json')
 
 
 def connect(args):
@@ -12,7 +25,23 @@ def connect(args):
     Determine the most preferred API version supported by the specified server,
     then connect to the specified server using that API version, login and return
     the service instance object.
+
+    With args.session_cache set, a session cached by an earlier run for the
+    same host, port and user is reused without logging in, as long as the
+    server still knows it. A fresh login is cached in turn and is not logged
+    out at exit, so that the next run can reuse it.
     """
+    session_cache = getattr(args, 'session_cache', None)
+    if session_cache is True:
+        session_cache = DEFAULT_SESSION_CACHE
+    if session_cache:
+        service_instance = _reattach(args, session_cache)
+        if service_instance:
+            return service_instance
+        if not args.password:
+            args.password = getpass.getpass(
+                prompt='No cached session! Please enter password for host %s and user %s: '
+                       % (args.host, args.user))
 
     service_instance = None
 
@@ -30,8 +59,10 @@ def connect(args):
                                             pwd=args.password,
                                             port=args.port)
 
-        # doing this means you don't need to remember to disconnect your script/objects
-        atexit.register(Disconnect, service_instance)
+        # a session that could not be cached is not reused, so log it out
+        if not (session_cache and _save_session(args, session_cache, service_instance)):
+            # doing this means you don't need to remember to disconnect your script/objects
+            atexit.register(Disconnect, service_instance)
     except IOError as io_error:
         print(io_error)
 
@@ -39,3 +70,236 @@ def connect(args):
         raise SystemExit("Unable to connect to host with supplied credentials.")
 
     return service_instance
+
+
+def _session_key(args):
+    return '%s@%s:%s' % (args.user, args.host, args.port)
+
+
+def _load_sessions(path):
+    try:
+        with open(path) as cache_file:
+            return json.load(cache_file)
+    except (IOError, ValueError):
+        return {}
+
+
+def _save_session(args, path, service_instance):
+    """
+    Store the session cookie and API version of 'service_instance' in the
+    cache file, which only the current user can read. Returns False if the
+    file could not be written.
+    """
+    sessions = _load_sessions(path)
+    sessions[_session_key(args)] = {
+        'cookie': service_instance._stub.cookie,
+        'version': service_instance._stub.version,
+    }
+    try:
+        _write_sessions(path, sessions)
+    except (IOError, OSError):
+        # the cache is only an optimization
+        return False
+    return True
+
+
+def _write_sessions(path, sessions):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, 0o700, exist_ok=True)
+    # unique per writer, so concurrent runs (e.g. from cron) do not clash,
+    # and created readable by the current user only
+    fd, temp_path = tempfile.mkstemp(dir=directory or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as cache_file:
+            json.dump(sessions, cache_file)
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+def _reattach(args, path):
+    """
+    Return a service instance for the cached session of args' host and user,
+    or None if there is none or the server no longer knows it
+    """
+    session = _load_sessions(path).get(_session_key(args))
+    if not session:
+        return None
+    ssl_context = None
+    if args.disable_ssl_verification:
+        ssl_context = ssl._create_unverified_context()
+    stub = SoapStubAdapter(host=args.host, port=args.port, version=session['version'],
+                           sslContext=ssl_context)
+    stub.cookie = session['cookie']
+    service_instance = vim.ServiceInstance('ServiceInstance', stub)
+    try:
+        if service_instance.content.sessionManager.currentSession is None:
+            return None
+    except (vmodl.MethodFault, IOError):
+        return None
+    return service_instance
+
+
+def is_healthy(service_instance):
+    """
+    True if the session of 'service_instance' is still authenticated
+    """
+    try:
+        return service_instance.content.sessionManager.currentSession is not None
+    except (vmodl.MethodFault, IOError):
+        return False
+
+
+def clone_session(service_instance, pool_size=5):
+    """
+    Return a new service instance that uses the session of
+    'service_instance' over its own HTTP connections
+    """
+    stub = service_instance._stub
+    # stub.host includes the port, IPv6 addresses in brackets
+    host = stub.host.rsplit(':', 1)[0].strip('[]')
+    clone_stub = SoapStubAdapter(host=host, port=stub.port, version=stub.version,
+                                 path=stub.path, poolSize=pool_size,
+                                 sslContext=stub.schemeArgs.get('context'),
+                                 thumbprint=stub.thumbprint)
+    clone_stub.cookie = stub.cookie
+    return vim.ServiceInstance('ServiceInstance', clone_stub)
+
+
+class ServiceInstancePool:
+    """
+    Hands out up to `size` service instances to worker threads, one thread
+    at a time each.
+
+    Service instances come from `factory`, e.g. lambda: connect(args) for
+    independent sessions, or see sharing_session to spread one session over
+    several connections. They are created when first needed, checked with
+    currentSession when they sat idle for more than `health_check_interval`
+    seconds, and replaced when a check or a call finds them logged out.
+
+    Example:
+        pool = ServiceInstancePool(lambda: service_instance.connect(args), size=8)
+        with pool.session() as si:
+            print(si.CurrentTime())
+        pool.call(lambda si: si.content.rootFolder.childEntity)
+    """
+
+    def __init__(self, factory, size=4, health_check_interval=60):
+        self._factory = factory
+        self._size = size
+        self._health_check_interval = health_check_interval
+        self._idle = []
+        self._created = 0
+        self._condition = threading.Condition()
+        # whether the idle service instances all go when one is logged out
+        self._shared = False
+
+    @classmethod
+    def sharing_session(cls, service_instance, size=4, relogin=None, **kwargs):
+        """
+        A pool whose service instances all use the session of
+        'service_instance', each over its own connections. If that session
+        expires 'relogin', e.g. lambda: connect(args), provides a new one.
+        """
+        pool = cls(_SharedSession(service_instance, relogin), size, **kwargs)
+        pool._shared = True
+        return pool
+
+    def checkout(self, timeout=None):
+        """
+        Take a service instance out of the pool, waiting up to 'timeout'
+        seconds for one to be checked in when all `size` are in use
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._condition:
+            while not self._idle and self._created >= self._size:
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise RuntimeError('no service instance available in the pool')
+                self._condition.wait(remaining)
+            if self._idle:
+                service_instance, idle_since = self._idle.pop()
+            else:
+                service_instance, idle_since = None, None
+                self._created += 1
+        try:
+            if service_instance is None:
+                return self._factory()
+            if time.time() - idle_since > self._health_check_interval and \
+                    not is_healthy(service_instance):
+                return self._factory()
+            return service_instance
+        except Exception:
+            self._forget()
+            raise
+
+    def checkin(self, service_instance, discard=False):
+        """
+        Return a service instance to the pool. A discarded one, e.g. after
+        NotAuthenticated, is replaced by a new one on a later checkout. In a
+        pool sharing one session the idle ones are discarded with it.
+        """
+        if discard:
+            with self._condition:
+                if self._shared:
+                    self._created -= len(self._idle)
+                    del self._idle[:]
+                self._created -= 1
+                self._condition.notify_all()
+            return
+        with self._condition:
+            self._idle.append((service_instance, time.time()))
+            self._condition.notify()
+
+    def _forget(self):
+        with self._condition:
+            self._created -= 1
+            self._condition.notify()
+
+    @contextlib.contextmanager
+    def session(self, timeout=None):
+        """
+        Check a service instance out for the duration of a with block. It is
+        discarded if the block raises NotAuthenticated.
+        """
+        service_instance = self.checkout(timeout)
+        try:
+            yield service_instance
+        except vim.fault.NotAuthenticated:
+            self.checkin(service_instance, discard=True)
+            raise
+        except BaseException:
+            self.checkin(service_instance)
+            raise
+        self.checkin(service_instance)
+
+    def call(self, function, *args, **kwargs):
+        """
+        Call function(service_instance, *args, **kwargs) with a pooled
+        service instance, once more with a new one on NotAuthenticated
+        """
+        try:
+            with self.session() as service_instance:
+                return function(service_instance, *args, **kwargs)
+        except vim.fault.NotAuthenticated:
+            with self.session() as service_instance:
+                return function(service_instance, *args, **kwargs)
+
+
+class _SharedSession:
+    """
+    ServiceInstancePool factory cloning one session, renewed when it expires
+    """
+
+    def __init__(self, service_instance, relogin):
+        self._service_instance = service_instance
+        self._relogin = relogin
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            if self._relogin is not None and not is_healthy(self._service_instance):
+                self._service_instance = self._relogin()
+            return clone_session(self._service_instance)
@@ -19,8 +19,56 @@ Utility functions for the vSphere API
 See com.vmware.apputils.vim25.ServiceUtil in the java API.
 """
 
+import functools
+
 from pyVmomi import vim, vmodl
 
+# Every traversal spec of the full traversal:
+# name -> (type, path, names of the specs selected from there)
+_TRAVERSAL_SPECS = {
+    # Recurse through all resourcepools
+    'rpToRp': (vim.ResourcePool, 'resourcePool', ('rpToRp', 'rpToVm')),
+    'rpToVm': (vim.ResourcePool, 'vm', ()),
+    # Traversal through resourcepool branch
+    'crToRp': (vim.ComputeResource, 'resourcePool', ('rpToRp', 'rpToVm')),
+    # Traversal through host branch
+    'crToH': (vim.ComputeResource, 'host', ()),
+    # Traversal through hostFolder branch
+    'dcToHf': (vim.Datacenter, 'hostFolder', ('visitFolders',)),
+    # Traversal through vmFolder branch
+    'dcToVmf': (vim.Datacenter, 'vmFolder', ('visitFolders',)),
+    # Traversal through network folder branch
+    'dcToNet': (vim.Datacenter, 'networkFolder', ('visitFolders',)),
+    # Traversal through datastore branch
+    'dcToDs': (vim.Datacenter, 'datastore', ('visitFolders',)),
+    # Recurse through all hosts
+    'hToVm': (vim.HostSystem, 'vm', ('visitFolders',)),
+    # Recurse through the folders
+    # (and into the child pools of vApps in VM folders, for nested vApps)
+    'visitFolders': (vim.Folder, 'childEntity',
+                     ('visitFolders', 'dcToHf', 'dcToVmf', 'dcToNet', 'crToH', 'crToRp',
+                      'dcToDs', 'hToVm', 'rpToRp', 'rpToVm')),
+}
+
+_FULL_TRAVERSAL = ('visitFolders', 'dcToHf', 'dcToVmf', 'dcToNet', 'crToH', 'crToRp',
+                   'dcToDs', 'rpToRp', 'hToVm', 'rpToVm')
+
+# The specs needed to reach each type from a folder or datacenter. The first
+# matching entry wins; types not listed get the full traversal.
+_TARGET_SPECS = (
+    # rpToRp for VMs in vApps nested in other vApps. Without dcToHf the host
+    # branch is not entered from a datacenter, but crToRp still finds the VMs
+    # through the resource pools when the traversal starts in a host folder.
+    (vim.VirtualMachine, ('visitFolders', 'dcToVmf', 'crToRp', 'rpToRp', 'rpToVm')),
+    (vim.HostSystem, ('visitFolders', 'dcToHf', 'crToH')),
+    (vim.ComputeResource, ('visitFolders', 'dcToHf')),
+    (vim.ResourcePool, ('visitFolders', 'dcToHf', 'dcToVmf', 'crToRp', 'rpToRp')),
+    (vim.Network, ('visitFolders', 'dcToNet')),
+    (vim.DistributedVirtualSwitch, ('visitFolders', 'dcToNet')),
+    (vim.Datastore, ('visitFolders', 'dcToDs')),
+    (vim.Datacenter, ('visitFolders',)),
+)
+
 
 def build_full_traversal():
     """
@@ -30,99 +78,50 @@ def build_full_traversal():
     See com.vmware.apputils.vim25.ServiceUtil.buildFullTraversal in the java
     API. Extended by Sebastian Tello's examples from pysphere to reach networks
     and datastores.
-    """
-
-    traversal_spec = vmodl.query.PropertyCollector.TraversalSpec
-    selection_spec = vmodl.query.PropertyCollector.SelectionSpec
-
-    # Recurse through all resourcepools
-    rp_to_rp = traversal_spec(name='rpToRp', type=vim.ResourcePool, path="resourcePool", skip=False)
-
-    rp_to_rp.selectSet.extend(
-        (
-            selection_spec(name="rpToRp"),
-            selection_spec(name="rpToVm"),
-        )
-    )
 
-    rp_to_vm = traversal_spec(name='rpToVm', type=vim.ResourcePool, path="vm", skip=False)
+    The specs are built once and shared between callers, do not modify them.
+    """
+    return _build_traversal(_FULL_TRAVERSAL)
 
-    # Traversal through resourcepool branch
-    cr_to_rp = traversal_spec(
-        name='crToRp', type=vim.ComputeResource, path='resourcePool', skip=False)
-    cr_to_rp.selectSet.extend(
-        (
-            selection_spec(name='rpToRp'),
-            selection_spec(name='rpToVm'),
-        )
-    )
 
-    # Traversal through host branch
-    cr_to_h = traversal_spec(name='crToH', type=vim.ComputeResource, path='host', skip=False)
-
-    # Traversal through hostFolder branch
-    dc_to_hf = traversal_spec(name='dcToHf', type=vim.Datacenter, path='hostFolder', skip=False)
-    dc_to_hf.selectSet.extend(
-        (
-            selection_spec(name='visitFolders'),
-        )
-    )
-
-    # Traversal through vmFolder branch
-    dc_to_vmf = traversal_spec(name='dcToVmf', type=vim.Datacenter, path='vmFolder', skip=False)
-    dc_to_vmf.selectSet.extend(
-        (
-            selection_spec(name='visitFolders'),
-        )
-    )
+def build_traversal(target_types):
+    """
+    Builds the smallest traversal spec, starting at a folder or datacenter,
+    that reaches every type in 'target_types'. For example
+    [vim.VirtualMachine] only walks Datacenter->vmFolder->Folder->VirtualMachine
+    (and vApps), skipping the host, network and datastore branches.
 
-    # Traversal through network folder branch
-    dc_to_net = traversal_spec(
-        name='dcToNet', type=vim.Datacenter, path='networkFolder', skip=False)
-    dc_to_net.selectSet.extend(
-        (
-            selection_spec(name='visitFolders'),
-        )
-    )
+    Like build_full_traversal the specs are shared, do not modify them.
+    """
+    names = set()
+    for target_type in target_types:
+        for vim_type, spec_names in _TARGET_SPECS:
+            if issubclass(target_type, vim_type):
+                names.update(spec_names)
+                break
+        else:
+            return build_full_traversal()
+    return _build_traversal(tuple(name for name in _FULL_TRAVERSAL if name in names))
+
+
+@functools.lru_cache(maxsize=None)
+def _build_traversal(names):
+    """
+    Builds the named traversal specs, each selecting only specs of the set
+    """
 
-    # Traversal through datastore branch
-    dc_to_ds = traversal_spec(name='dcToDs', type=vim.Datacenter, path='datastore', skip=False)
-    dc_to_ds.selectSet.extend(
-        (
-            selection_spec(name='visitFolders'),
-        )
-    )
+    traversal_spec = vmodl.query.PropertyCollector.TraversalSpec
+    selection_spec = vmodl.query.PropertyCollector.SelectionSpec
 
-    # Recurse through all hosts
-    h_to_vm = traversal_spec(name='hToVm', type=vim.HostSystem, path='vm', skip=False)
-    h_to_vm.selectSet.extend(
-        (
-            selection_spec(name='visitFolders'),
-        )
-    )
+    specs = []
+    for name in names:
+        spec_type, path, select = _TRAVERSAL_SPECS[name]
+        spec = traversal_spec(name=name, type=spec_type, path=path, skip=False)
+        spec.selectSet.extend(selection_spec(name=selected)
+                              for selected in select if selected in names)
+        specs.append(spec)
 
-    # Recurse through the folders
-    visit_folders = traversal_spec(
-        name='visitFolders', type=vim.Folder, path='childEntity', skip=False)
-    visit_folders.selectSet.extend(
-        (
-            selection_spec(name='visitFolders'),
-            selection_spec(name='dcToHf'),
-            selection_spec(name='dcToVmf'),
-            selection_spec(name='dcToNet'),
-            selection_spec(name='crToH'),
-            selection_spec(name='crToRp'),
-            selection_spec(name='dcToDs'),
-            selection_spec(name='hToVm'),
-            selection_spec(name='rpToVm'),
-        )
-    )
-
-    full_traversal = selection_spec.Array(
-        (visit_folders, dc_to_hf, dc_to_vmf, dc_to_net, cr_to_h, cr_to_rp, dc_to_ds, rp_to_rp,
-         h_to_vm, rp_to_vm,))
-
-    return full_traversal
+    return selection_spec.Array(specs)
 
 
 # vim: set ts=4 sw=4 expandtab filetype=python:
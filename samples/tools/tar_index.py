@@ -0,0 +1,89 @@
+# VMware vSphere Python SDK Community Samples Addons
+# Copyright (c) 2014-2021 VMware, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module implements an index of the members of a tar file, e.g. an OVA,
+that is kept across runs
+"""
+import json
+import os
+import tarfile
+
+__author__ = "VMware, Inc."
+
+# Where indexes are kept when no file is given
+DEFAULT_INDEX_CACHE = os.path.join(os.path.expanduser('~'), '.cache',
+                                   'pyvmomi-community-samples', 'tar-index.json')
+# Indexes kept in the cache, the least recently built ones are dropped
+MAX_CACHED_INDEXES = 64
+
+
+def build_index(fileobj):
+    """
+    Return {member name: (data offset, size)} for the regular files in the
+    tar file 'fileobj', reading every header once
+    """
+    with tarfile.open(fileobj=fileobj) as archive:
+        return {member.name: (member.offset_data, member.size)
+                for member in archive.getmembers() if member.isfile()}
+
+
+def load_index(fileobj, key=None, cache_path=DEFAULT_INDEX_CACHE):
+    """
+    Return the index of 'fileobj', from the cache if one was stored under
+    'key', otherwise built and stored under it.
+
+    'key' must change whenever the file does, e.g. URL and ETag or path and
+    modification time; without one the index is built but not cached.
+    """
+    if key is None or cache_path is None:
+        return build_index(fileobj)
+    indexes = _load_indexes(cache_path)
+    index = indexes.get(key)
+    if index is not None:
+        return {name: tuple(entry) for name, entry in index.items()}
+    index = build_index(fileobj)
+    indexes[key] = index
+    while len(indexes) > MAX_CACHED_INDEXES:
+        del indexes[next(iter(indexes))]
+    try:
+        _save_indexes(cache_path, indexes)
+    except (IOError, OSError):
+        # the index is only an optimization
+        pass
+    return index
+
+
+def _load_indexes(path):
+    try:
+        with open(path) as cache_file:
+            return json.load(cache_file)
+    except (IOError, ValueError):
+        return {}
+
+
+def _save_indexes(path, indexes):
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory, 0o700)
+    temp_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        with open(temp_path, 'w') as cache_file:
+            json.dump(indexes, cache_file)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
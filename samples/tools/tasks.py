@@ -9,9 +9,34 @@ http://www.apache.org/licenses/LICENSE-2.0.html
 
 Helper module for task operations.
 """
+import atexit
+import collections
+import math
+import threading
+import time
+from concurrent import futures
+
 from pyVmomi import vim
 from pyVmomi import vmodl
 
+# Final outcome, or last known state, of a task from wait_for_tasks_results
+TaskOutcome = collections.namedtuple('TaskOutcome', ['task', 'state', 'result', 'error'])
+
+# Task properties watched by wait_for_tasks_results and the TaskOutcome
+# fields they fill
+_OUTCOME_FIELDS = {
+    'info.state': 'state',
+    'info.result': 'result',
+    'info.error': 'error',
+}
+
+# Task properties watched by TaskMonitor
+_MONITOR_PATHS = ['info.state', 'info.progress', 'info.result', 'info.error']
+
+# One TaskMonitor per connection, see get_task_monitor
+_monitors = {}
+_monitors_lock = threading.Lock()
+
 
 def wait_for_tasks(si, tasks):
     """Given the service instance and tasks, it returns after all the
@@ -58,3 +83,292 @@ def wait_for_tasks(si, tasks):
     finally:
         if pcfilter:
             pcfilter.Destroy()
+
+
+def wait_for_tasks_results(si, tasks, timeout=None):
+    """Given the service instance and tasks, wait until every task has
+    completed, or until 'timeout' seconds have passed, and return a
+    {task moId: TaskOutcome} dict.
+
+    Unlike wait_for_tasks a failed task does not stop the wait: its error
+    is reported in its outcome. Tasks still queued or running when the
+    timeout expires keep their last known state. Only info.state,
+    info.result and info.error are watched, on a dedicated
+    PropertyCollector, and pending tasks are tracked in a dict so large
+    batches stay cheap.
+    """
+    outcomes = dict((task._moId, TaskOutcome(task, None, None, None)) for task in tasks)
+    pending = set(outcomes)
+    if not pending:
+        return outcomes
+
+    deadline = time.time() + timeout if timeout is not None else None
+    property_collector = si.content.propertyCollector.CreatePropertyCollector()
+    try:
+        filter_spec = vmodl.query.PropertyCollector.FilterSpec()
+        filter_spec.objectSet = [vmodl.query.PropertyCollector.ObjectSpec(obj=outcome.task)
+                                 for outcome in outcomes.values()]
+        filter_spec.propSet = [vmodl.query.PropertyCollector.PropertySpec(
+            type=vim.Task, pathSet=list(_OUTCOME_FIELDS), all=False)]
+        property_collector.CreateFilter(filter_spec, True)
+
+        version = ''
+        while pending:
+            wait_options = vmodl.query.PropertyCollector.WaitOptions()
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                wait_options.maxWaitSeconds = int(math.ceil(remaining))
+            update = property_collector.WaitForUpdatesEx(version, wait_options)
+            if update is None:
+                continue
+            version = update.version
+            for filter_set in update.filterSet:
+                for obj_set in filter_set.objectSet:
+                    moid = obj_set.obj._moId
+                    changes = dict((_OUTCOME_FIELDS[change.name], change.val)
+                                   for change in obj_set.changeSet
+                                   if change.name in _OUTCOME_FIELDS)
+                    outcome = outcomes[moid]._replace(**changes)
+                    outcomes[moid] = outcome
+                    if outcome.state in (vim.TaskInfo.State.success,
+                                         vim.TaskInfo.State.error):
+                        pending.discard(moid)
+    finally:
+        property_collector.DestroyPropertyCollector()
+    return outcomes
+
+
+class TaskMonitor:
+    """
+    Follows tasks with one long lived PropertyCollector filter instead of
+    polling task.info.
+
+    The filter selects every task in a ListView; watching a task adds it to
+    the view with ModifyListView and a finished task is removed again, so
+    the filter is created once no matter how many tasks go through it. A
+    background thread waits in WaitForUpdatesEx and settles a
+    concurrent.futures.Future per task: its result is the task result and
+    its exception the task error.
+
+    Use get_task_monitor to share one monitor per connection.
+
+    Example:
+        monitor = get_task_monitor(si)
+        future = monitor.watch(vm.PowerOnVM_Task(),
+                               on_progress=lambda task, percent: print(percent))
+        future.result()
+    """
+
+    def __init__(self, si, max_wait_seconds=30):
+        self._si = si
+        self._max_wait_seconds = max_wait_seconds
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._collector = None
+        self._list_view = None
+        self.error = None
+
+    def _start(self):
+        content = self._si.content
+        self._collector = content.propertyCollector.CreatePropertyCollector()
+        self._list_view = content.viewManager.CreateListView()
+        traversal_spec = vmodl.query.PropertyCollector.TraversalSpec(
+            name='traverseTasks', path='view', skip=False, type=vim.view.ListView)
+        filter_spec = vmodl.query.PropertyCollector.FilterSpec()
+        filter_spec.objectSet = [vmodl.query.PropertyCollector.ObjectSpec(
+            obj=self._list_view, skip=True, selectSet=[traversal_spec])]
+        filter_spec.propSet = [vmodl.query.PropertyCollector.PropertySpec(
+            type=vim.Task, pathSet=_MONITOR_PATHS, all=False)]
+        self._collector.CreateFilter(filter_spec, True)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='task-monitor')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def watch(self, task, on_complete=None, on_progress=None, on_state=None):
+        """
+        Start following 'task' and return a Future for its result.
+
+        - `on_complete(future)` is called once the task has finished.
+        - `on_progress(task, percent)` is called whenever info.progress
+          changes.
+        - `on_state(task, state)` is called when the task is first seen and
+          whenever it changes between queued and running.
+
+        Callbacks run on the monitor thread and must not block it.
+
+        A task the server does not know (anymore) fails at once with
+        ManagedObjectNotFound.
+        """
+        future = futures.Future()
+        if on_complete is not None:
+            future.add_done_callback(on_complete)
+        with self._lock:
+            if self.error is not None:
+                raise self.error
+            if self._thread is None:
+                self._start()
+            watched = self._watched.get(task._moId)
+            if watched is None:
+                # returns the objects it could not add, which never update
+                unresolved = self._list_view.ModifyListView(add=[task])
+                if not unresolved:
+                    watched = self._watched[task._moId] = _WatchedTask(task)
+            if watched is not None:
+                watched.futures.append(future)
+                if on_progress is not None:
+                    watched.on_progress.append(on_progress)
+                if on_state is not None:
+                    watched.on_state.append(on_state)
+        if watched is None:
+            # outside the lock, on_complete may watch another task
+            future.set_exception(vmodl.fault.ManagedObjectNotFound(obj=task))
+        return future
+
+    def wait(self, task, timeout=None, on_progress=None):
+        """
+        Wait for 'task' and return its result, or raise its error
+        """
+        return self.watch(task, on_progress=on_progress).result(timeout)
+
+    def stop(self):
+        """
+        Stop the monitor thread and destroy the collector and the view.
+        Tasks still watched fail with RuntimeError.
+        """
+        with self._lock:
+            if self._thread is None:
+                return
+            thread, self._thread = self._thread, None
+        self._stopping.set()
+        try:
+            self._collector.CancelWaitForUpdates()
+            thread.join()
+            # destroying the collector also destroys its filter
+            self._collector.DestroyPropertyCollector()
+            self._list_view.DestroyView()
+        finally:
+            self._fail_all(RuntimeError('task monitor stopped'))
+
+    def _run(self):
+        wait_options = vmodl.query.PropertyCollector.WaitOptions(
+            maxWaitSeconds=self._max_wait_seconds)
+        version = ''
+        while not self._stopping.is_set():
+            try:
+                update = self._collector.WaitForUpdatesEx(version, wait_options)
+            except Exception as ex:
+                # CancelWaitForUpdates from stop() surfaces as RequestCanceled
+                if not self._stopping.is_set():
+                    self.error = ex
+                    self._fail_all(ex)
+                return
+            if update is None:
+                continue
+            version = update.version
+            finished = []
+            for filter_set in update.filterSet:
+                for obj_set in filter_set.objectSet:
+                    if obj_set.kind == 'leave':
+                        continue
+                    with self._lock:
+                        watched = self._watched.get(obj_set.obj._moId)
+                    if watched is None:
+                        continue
+                    if watched.apply(obj_set.changeSet):
+                        finished.append(watched)
+            if not finished:
+                continue
+            # the view is updated under the lock so that a task watched
+            # again meanwhile is not removed from it
+            with self._lock:
+                for watched in finished:
+                    del self._watched[watched.task._moId]
+                try:
+                    self._list_view.ModifyListView(
+                        remove=[watched.task for watched in finished])
+                except Exception:
+                    # a task that has expired from the server leaves the
+                    # view on its own
+                    pass
+            for watched in finished:
+                watched.settle()
+
+    def _fail_all(self, error):
+        with self._lock:
+            watched_tasks = list(self._watched.values())
+            self._watched.clear()
+        for watched in watched_tasks:
+            for future in watched.futures:
+                if not future.done():
+                    future.set_exception(error)
+
+
+class _WatchedTask:
+    """
+    Last known info of one task followed by a TaskMonitor
+    """
+    __slots__ = ('task', 'info', 'futures', 'on_progress', 'on_state')
+
+    def __init__(self, task):
+        self.task = task
+        self.info = {}
+        self.futures = []
+        self.on_progress = []
+        self.on_state = []
+
+    def apply(self, changes):
+        """
+        Record 'changes', report state and progress and return True once
+        finished
+        """
+        names = set()
+        for change in changes:
+            self.info[change.name] = change.val
+            names.add(change.name)
+        state = self.info.get('info.state')
+        if 'info.state' in names and state in (vim.TaskInfo.State.queued,
+                                               vim.TaskInfo.State.running):
+            for on_state in self.on_state:
+                on_state(self.task, state)
+        if 'info.progress' in names and self.info['info.progress'] is not None:
+            for on_progress in self.on_progress:
+                on_progress(self.task, self.info['info.progress'])
+        return state in (vim.TaskInfo.State.success, vim.TaskInfo.State.error)
+
+    def settle(self):
+        for future in self.futures:
+            if future.done():
+                continue
+            if self.info.get('info.state') == vim.TaskInfo.State.error:
+                future.set_exception(self.info.get('info.error'))
+            else:
+                future.set_result(self.info.get('info.result'))
+
+
+def get_task_monitor(si):
+    """
+    Return the process wide TaskMonitor of the connection behind 'si',
+    creating it on first use. It is stopped at exit, before the session is
+    logged out.
+    """
+    with _monitors_lock:
+        monitor = _monitors.get(si._stub)
+        if monitor is None or monitor.error is not None:
+            monitor = _monitors[si._stub] = TaskMonitor(si)
+            atexit.register(monitor.stop)
+        return monitor
+
+
+def wait_for_task(task, timeout=None, on_progress=None):
+    """
+    Wait for a single task with the shared TaskMonitor of its connection and
+    return its result, or raise its error. Unlike polling task.info this
+    costs no requests while the task runs.
+    """
+    si = vim.ServiceInstance('ServiceInstance', task._stub)
+    return get_task_monitor(si).wait(task, timeout, on_progress)
@@ -0,0 +1,127 @@
+# VMware vSphere Python SDK Community Samples Addons
+# Copyright (c) 2014-2021 VMware, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module implements a shared keep-alive HTTP session for datastore,
+guest and NFC file transfers
+"""
+import ssl
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+__author__ = "VMware, Inc."
+
+# Connections kept open per host
+DEFAULT_POOL_SIZE = 16
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def session_cookie(stub):
+    """
+    The vmware_soap_session cookie of a pyVmomi stub as a {name: value} dict
+    """
+    name, _, value = stub.cookie.split(';', 1)[0].partition('=')
+    return {name.strip(): value.strip()}
+
+
+class TransferSession:
+    """
+    A pooled requests.Session for HTTP transfers next to a pyVmomi
+    connection. Connections are kept alive and reused, so many small
+    transfers pay for one TCP and TLS handshake per host instead of one each.
+
+    The session cookie is taken from the stub on every request, so it stays
+    current after a new login, and is only sent to the vCenter or ESX host
+    the stub is connected to; guest file and NFC URLs that point to other
+    hosts authenticate with their own tickets. Certificates are verified
+    unless the connection itself skips verification.
+
+    Example:
+        transfers = transfer.get_transfer_session(si)
+        with open('disk.vmdk', 'rb') as data:
+            transfers.put(transfers.url('/folder/vm/disk.vmdk'), data=data,
+                          params={'dsName': 'datastore1', 'dcPath': 'DC'})
+    """
+
+    def __init__(self, si, pool_size=DEFAULT_POOL_SIZE, verify=None):
+        self._stub = si._stub
+        # host names are case insensitive, and urlsplit() lowercases them
+        self.host = self._stub.host.rsplit(':', 1)[0].strip('[]').lower()
+        if verify is None:
+            context = getattr(self._stub, 'schemeArgs', {}).get('context')
+            verify = not (context is not None and context.verify_mode == ssl.CERT_NONE)
+        self.session = requests.Session()
+        self.session.verify = verify
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def url(self, path):
+        """
+        URL of 'path' on the host of the connection, e.g. url('/folder/x')
+        """
+        return 'https://%s%s' % (self._stub.host, path)
+
+    def cookies(self):
+        """
+        The session cookie, for URLs on other hosts that need it
+        """
+        return session_cookie(self._stub)
+
+    def request(self, method, url, **kwargs):
+        """
+        requests.Session.request, with the session cookie for the
+        connection's host
+        """
+        if urlsplit(url).hostname == self.host:
+            cookies = dict(self.cookies())
+            cookies.update(kwargs.get('cookies') or {})
+            kwargs['cookies'] = cookies
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def get_transfer_session(si, **kwargs):
+    """
+    Return the process wide TransferSession of the connection behind 'si',
+    creating it with 'kwargs' on first use
+    """
+    with _sessions_lock:
+        transfer_session = _sessions.get(si._stub)
+        if transfer_session is None:
+            transfer_session = _sessions[si._stub] = TransferSession(si, **kwargs)
+        return transfer_session
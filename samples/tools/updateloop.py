@@ -0,0 +1,180 @@
+# VMware vSphere Python SDK Community Samples Addons
+# Copyright (c) 2014-2021 VMware, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This module implements a WaitForUpdatesEx loop that survives session
+timeouts, connection errors and server restarts
+"""
+import collections
+import http.client
+import threading
+
+from pyVmomi import vim, vmodl
+
+from . import pchelper
+
+__author__ = "VMware, Inc."
+
+# One UpdateSet from ResilientUpdateLoop. 'resync' is True for the update
+# sets of a full dump, after the filter was (re)created; the dump ends with
+# the first of them that is not truncated.
+UpdateEvent = collections.namedtuple('UpdateEvent', ['update', 'resync'])
+
+# Errors after which the connection, and maybe the session, is checked
+_CONNECTION_ERRORS = (IOError, http.client.HTTPException)
+
+
+class ResilientUpdateLoop:
+    """
+    Iterates over the UpdateSets of a filter on `propspec` (a sequence of
+    (managed object type, [property paths])) below `container`, the root
+    folder by default.
+
+    A connection error is retried with growing delays. While the session is
+    alive the same collector resumes from the last version, so no update is
+    lost or repeated. When the session is gone (NotAuthenticated, server
+    restart) `relogin`, e.g. lambda: service_instance.connect(args), gives a
+    new one; collectors do not outlive their session, so the filter is then
+    recreated and a full resync follows, reported through UpdateEvent.resync.
+
+    Example:
+        loop = ResilientUpdateLoop(si, [(vim.VirtualMachine, ['name'])],
+                                   relogin=lambda: service_instance.connect(args))
+        for event in loop:
+            if event.resync:
+                ...  # reconcile: objects not entered again are gone
+            for filter_set in event.update.filterSet:
+                ...
+    """
+
+    def __init__(self, si, propspec, relogin=None, container=None, max_wait_seconds=30,
+                 max_object_updates=pchelper.DEFAULT_PAGE_SIZE, retry_delay=1,
+                 max_retry_delay=60):
+        self.si = si
+        self._propspec = propspec
+        self._relogin = relogin
+        self._container = container
+        self._wait_options = pchelper.make_wait_options(max_wait_seconds, max_object_updates)
+        self._retry_delay = retry_delay
+        self._max_retry_delay = max_retry_delay
+        self._collector = None
+        self._version = ''
+        self._resyncing = False
+        self._stopping = threading.Event()
+        self.resyncs = 0
+        self.relogins = 0
+
+    def __iter__(self):
+        self._stopping.clear()
+        failures = 0
+        check_session = False
+        login = False
+        try:
+            while not self._stopping.is_set():
+                try:
+                    if login:
+                        self._login()
+                        login = False
+                    if check_session:
+                        self._check_session()
+                        check_session = False
+                    if self._collector is None:
+                        self._create_filter()
+                    update = self._collector.WaitForUpdatesEx(self._version, self._wait_options)
+                except vmodl.fault.RequestCanceled:
+                    if self._stopping.is_set():
+                        return
+                    raise
+                except vmodl.query.InvalidCollectorVersion:
+                    self._destroy_filter()
+                    continue
+                except vim.fault.NotAuthenticated:
+                    if self._relogin is None:
+                        raise
+                    login = True
+                    continue
+                except _CONNECTION_ERRORS:
+                    failures += 1
+                    self._stopping.wait(min(self._retry_delay * 2 ** (failures - 1),
+                                            self._max_retry_delay))
+                    check_session = True
+                    continue
+                failures = 0
+                if update is None:
+                    continue
+                self._version = update.version
+                resync = self._resyncing
+                if not update.truncated:
+                    self._resyncing = False
+                yield UpdateEvent(update, resync)
+        finally:
+            self._destroy_filter()
+
+    def stop(self):
+        """
+        Make the iteration return, from any thread
+        """
+        self._stopping.set()
+        collector = self._collector
+        if collector is not None:
+            try:
+                collector.CancelWaitForUpdates()
+            except Exception:
+                # the loop is stopping anyway
+                pass
+
+    def _check_session(self):
+        """
+        After a connection error: log in again if the session did not
+        survive it, e.g. because the server restarted
+        """
+        try:
+            alive = self.si.content.sessionManager.currentSession is not None
+        except vim.fault.NotAuthenticated:
+            alive = False
+        if not alive:
+            self._login()
+
+    def _login(self):
+        """
+        Replace the lost session
+        """
+        if self._relogin is None:
+            raise vim.fault.NotAuthenticated(msg='session lost and no relogin given')
+        # the collector went with the session
+        self._collector = None
+        self.si = self._relogin()
+        self.relogins += 1
+
+    def _create_filter(self):
+        content = self.si.content
+        container = self._container or content.rootFolder
+        # managed object refs are bound to the session they were read with
+        container = container.__class__(container._moId, self.si._stub)
+        self._collector = content.propertyCollector.CreatePropertyCollector()
+        pchelper.make_property_collector(self._collector, container, self._propspec,
+                                         destroy_at_exit=False)
+        self._version = ''
+        self._resyncing = True
+        self.resyncs += 1
+
+    def _destroy_filter(self):
+        collector, self._collector = self._collector, None
+        if collector is not None:
+            try:
+                # destroying the collector also destroys its filter
+                collector.DestroyPropertyCollector()
+            except (vmodl.MethodFault,) + _CONNECTION_ERRORS:
+                pass
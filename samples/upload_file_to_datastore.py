@@ -1,26 +1,33 @@
 #!/usr/bin/env python
 
 """
-Example for file upload to datastore
+Example for file and directory upload to datastore
 """
 
-import ssl
+import os
+
 import requests
 from pyVmomi import vim, vmodl
-from tools import cli, service_instance
+from tools import cli, datastore_transfer, service_instance
 
 
 def main():
     parser = cli.Parser()
     parser.add_required_arguments(cli.Argument.DATASTORE_NAME)
     parser.add_optional_arguments(cli.Argument.LOCAL_FILE_PATH, cli.Argument.REMOTE_FILE_PATH)
+    parser.add_custom_argument('--workers',
+                               type=int,
+                               default=4,
+                               action='store',
+                               help='Number of files to upload concurrently')
+    parser.add_custom_argument('--retries',
+                               type=int,
+                               default=2,
+                               action='store',
+                               help='Attempts to upload a file again after a failure')
     args = parser.get_args()
 
-    verify_cert = None
     if args.disable_ssl_verification:
-        ssl_context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
-        ssl_context.verify_mode = ssl.CERT_NONE
-        verify_cert = False
         # disable urllib3 warnings
         requests.packages.urllib3.disable_warnings(
             requests.packages.urllib3.exceptions.InsecureRequestWarning)
@@ -55,44 +62,31 @@ def main():
         datastores_object_view.Destroy()
         datacenters_object_view.Destroy()
 
-        # Build the url to put the file - https://hostname:port/resource?params
-        if not args.remote_file_path.startswith("/"):
-            remote_file = "/" + args.remote_file_path
+        remote_path = args.remote_file_path.lstrip("/")
+        uploader = datastore_transfer.DatastoreUploader(si, datacenter, datastore.info.name,
+                                                        max_workers=args.workers,
+                                                        retries=args.retries)
+        # A directory is uploaded with all its files, --workers files at a
+        # time, each streamed from disk over a kept-alive connection
+        if os.path.isdir(args.local_file_path):
+            results = uploader.upload_tree(args.local_file_path, remote_path)
         else:
-            remote_file = args.remote_file_path
-        resource = "/folder" + remote_file
-        params = {"dsName": datastore.info.name,
-                  "dcPath": datacenter.name}
-        http_url = "https://" + args.host + ":443" + resource
-
-        # Get the cookie built from the current session
-        client_cookie = si._stub.cookie
-        # Break apart the cookie into it's component parts - This is more than
-        # is needed, but a good example of how to break apart the cookie
-        # anyways. The verbosity makes it clear what is happening.
-        cookie_name = client_cookie.split("=", 1)[0]
-        cookie_value = client_cookie.split("=", 1)[1].split(";", 1)[0]
-        cookie_path = client_cookie.split("=", 1)[1].split(";", 1)[1].split(
-            ";", 1)[0].lstrip()
-        cookie_text = " " + cookie_value + "; $" + cookie_path
-        # Make a cookie
-        cookie = dict()
-        cookie[cookie_name] = cookie_text
-
-        # Get the request headers set up
-        headers = {'Content-Type': 'application/octet-stream'}
-
-        # Get the file to upload ready, extra protection by using with against
-        # leaving open threads
-        with open(args.local_file_path, "rb") as file_data:
-            # Connect and upload the file
-            requests.put(http_url,
-                         params=params,
-                         data=file_data,
-                         headers=headers,
-                         cookies=cookie,
-                         verify=verify_cert)
-        print("uploaded the file")
+            results = uploader.upload([(args.local_file_path, remote_path)])
+
+        failed = 0
+        for result in results:
+            if result.error is not None:
+                failed += 1
+                print("failed to upload %s after %d attempts: %s"
+                      % (result.local_path, result.attempts, result.error))
+            else:
+                print("uploaded %s (%d bytes, %.1f MB/s)"
+                      % (result.remote_path, result.size,
+                         result.size / max(result.seconds, 1e-6) / 2 ** 20))
+        print("uploaded %d bytes in %.1fs, %.1f MB/s"
+              % (uploader.bytes_transferred, uploader.elapsed, uploader.throughput / 2 ** 20))
+        if failed:
+            raise SystemExit(-1)
 
     except vmodl.MethodFault as ex:
         print("Caught vmodl fault : " + ex.msg)
@@ -105,24 +99,6 @@ if __name__ == "__main__":
     main()
 
 
-# This may or may not be useful to the person who writes the download example
-# def download(remote_file_path, local_file_path):
-#    resource = "/folder/%s" % remote_file_path.lstrip("/")
-#    url = self._get_url(resource)
-#
-#    if sys.version_info >= (2, 6):
-#        resp = self._do_request(url)
-#        CHUNK = 16 * 1024
-#        fd = open(local_file_path, "wb")
-#        while True:
-#            chunk = resp.read(CHUNK)
-#            if not chunk: break
-#            fd.write(chunk)
-#        fd.close()
-#    else:
-#        urllib.urlretrieve(url, local_file_path)
-#
-
 # This may or may not be useful to the person who tries to use a service
 # request in the future
 
@@ -10,8 +10,7 @@ Example script to upload a file from host to guest
 
 """
 import re
-import requests
-from tools import cli, service_instance, pchelper
+from tools import cli, service_instance, pchelper, transfer
 from pyVmomi import vim, vmodl
 
 
@@ -70,7 +69,8 @@ def main():
             # Script fails in that case, saying URL has an invalid label.
             # By having hostname in place will take take care of this.
             url = re.sub(r"^https://\*:", "https://"+str(args.host)+":", url)
-            resp = requests.put(url, data=data_to_send, verify=False)
+            resp = transfer.get_transfer_session(si).put(url, data=data_to_send,
+                                                         verify=False)
             if not resp.status_code == 200:
                 print("Error while uploading file")
             else:
@@ -45,6 +45,7 @@ def main():
 
     container_view = content.viewManager.CreateContainerView(container, view_type, recursive)
     children = container_view.view
+    container_view.Destroy()
 
     # Loop through all the VMs
     for child in children:
@@ -43,13 +43,17 @@ si = service_instance.connect(args)
 atexit.register(endit)
 
 root_folder = si.content.rootFolder
-view = pchelper.get_container_view(si, obj_type=[vim.VirtualMachine])
-vm_data = pchelper.collect_properties(si,
-                                      view_ref=view,
-                                      obj_type=vim.VirtualMachine,
-                                      path_set=vm_properties,
-                                      include_mors=True)
+views = pchelper.ViewCache(si)
+atexit.register(views.destroy_all)
+view = pchelper.get_container_view(si, obj_type=[vim.VirtualMachine], view_cache=views)
+vm_data = pchelper.iter_collect_properties(si,
+                                           view_ref=view,
+                                           obj_type=vim.VirtualMachine,
+                                           path_set=vm_properties,
+                                           include_mors=True)
+vm_count = 0
 for vm in vm_data:
+    vm_count += 1
     print("-" * 70)
     print("Name:                    {0}".format(vm["name"]))
     print("BIOS UUID:               {0}".format(vm["config.uuid"]))
@@ -63,4 +67,4 @@ for vm in vm_data:
 
 
 print("")
-print("Found {0} VirtualMachines.".format(len(vm_data)))
+print("Found {0} VirtualMachines.".format(vm_count))
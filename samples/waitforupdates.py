@@ -20,11 +20,10 @@ Sample Python program for monitoring property changes to objects of one
 or more types
 """
 
-import atexit
 import collections
 import sys
 from pyVmomi import vim, vmodl
-from tools import cli, service_instance, serviceutil
+from tools import cli, service_instance, updateloop
 
 
 def parse_propspec(propspec):
@@ -61,85 +60,28 @@ def parse_propspec(propspec):
     return props
 
 
-def make_wait_options(max_wait_seconds=None, max_object_updates=None):
-    waitopts = vmodl.query.PropertyCollector.WaitOptions()
-
-    if max_object_updates is not None:
-        waitopts.maxObjectUpdates = max_object_updates
-
-    if max_wait_seconds is not None:
-        waitopts.maxWaitSeconds = max_wait_seconds
-
-    return waitopts
-
-
-def make_property_collector(prop_collector, from_node, props):
-    """
-    :type prop_collector: pyVmomi.VmomiSupport.vmodl.query.PropertyCollector
-    :type from_node: pyVmomi.VmomiSupport.ManagedObject
-    :type props: collections.Sequence
-    :rtype: pyVmomi.VmomiSupport.vmodl.query.PropertyCollector.Filter
-    """
-
-    # Make the filter spec
-    filter_spec = vmodl.query.PropertyCollector.FilterSpec()
-
-    # Make the object spec
-    traversal = serviceutil.build_full_traversal()
-
-    obj_spec = vmodl.query.PropertyCollector.ObjectSpec(obj=from_node, selectSet=traversal)
-    obj_specs = [obj_spec]
-
-    filter_spec.objectSet = obj_specs
-
-    # Add the property specs
-    prop_set = []
-    for motype, proplist in props:
-        prop_spec = \
-            vmodl.query.PropertyCollector.PropertySpec(type=motype, all=False)
-        prop_spec.pathSet.extend(proplist)
-        prop_set.append(prop_spec)
-
-    filter_spec.propSet = prop_set
-
-    try:
-        pc_filter = prop_collector.CreateFilter(filter_spec, True)
-        atexit.register(pc_filter.Destroy)
-        return pc_filter
-    except vmodl.MethodFault as ex:
-        if ex._wsdlName == 'InvalidProperty':
-            print("InvalidProperty fault while creating PropertyCollector filter : %s"
-                  % ex.name, file=sys.stderr)
-        else:
-            print("Problem creating PropertyCollector filter : %s"
-                  % str(ex.faultMessage), file=sys.stderr)
-        raise
-
-
-def monitor_property_changes(si, propspec, iterations=None):
+def monitor_property_changes(si, propspec, iterations=None, relogin=None):
     """
     :type si: pyVmomi.VmomiSupport.vim.ServiceInstance
     :type propspec: collections.Sequence
     :type iterations: int or None
+    :param relogin: returns a new ServiceInstance when the session is lost
     """
 
-    prop_collector = si.content.propertyCollector
-    make_property_collector(prop_collector, si.content.rootFolder, propspec)
-    waitopts = make_wait_options(30)
+    if iterations is not None and iterations <= 0:
+        print('Iteration limit reached, monitoring stopped')
+        return
 
-    version = ''
+    loop = updateloop.ResilientUpdateLoop(si, propspec, relogin=relogin)
+    resyncing = False
 
-    while True:
-        if iterations is not None:
-            if iterations <= 0:
-                print('Iteration limit reached, monitoring stopped')
-                break
-
-        result = prop_collector.WaitForUpdatesEx(version, waitopts)
+    for event in loop:
+        result = event.update
 
-        # timeout, call again
-        if result is None:
-            continue
+        # the filter had to be recreated, every property is sent again
+        if event.resync and not resyncing and loop.resyncs > 1:
+            print('== full resync after reconnecting ==\n')
+        resyncing = event.resync and result.truncated
 
         # process results
         for filter_set in result.filterSet:
@@ -178,10 +120,11 @@ def monitor_property_changes(si, propspec, iterations=None):
                     print("== %s ==" % moref)
                     print('(removed)\n')
 
-        version = result.version
-
         if iterations is not None:
             iterations -= 1
+            if iterations <= 0:
+                print('Iteration limit reached, monitoring stopped')
+                break
 
 
 def main():
@@ -222,7 +165,8 @@ def main():
         propspec = parse_propspec(args.propspec)
 
         print("Monitoring property changes.  Press ^C to exit")
-        monitor_property_changes(si, propspec, args.iterations)
+        monitor_property_changes(si, propspec, args.iterations,
+                                 relogin=lambda: service_instance.connect(args))
 
     except vmodl.MethodFault as ex:
         print("Caught vmodl fault :\n%s" % str(ex), file=sys.stderr)